@@ -2,6 +2,9 @@
 ASGI config for PrycegasStation project.
 
 It exposes the ASGI callable as a module-level variable named ``application``.
+Serve the site through it for the live update stream at /api/events/ and the async
+read endpoints (``python manage.py runasgi`` runs uvicorn with the production profile);
+under WSGI the pages fall back to polling.
 
 For more information on this file, see
 https://docs.djangoproject.com/en/5.2/howto/deployment/asgi/
@@ -11,6 +14,11 @@ import os
 
 from django.core.asgi import get_asgi_application
 
+from core import db_tuning
+
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'PrycegasStation.settings')
 
 application = get_asgi_application()
+
+# Only servers switch the database file to WAL (see core.db_tuning)
+db_tuning.serve()
@@ -44,11 +44,15 @@ INSTALLED_APPS = [
 MIDDLEWARE = [
     'django.middleware.security.SecurityMiddleware',
     'core.middleware.CacheOptimizationMiddleware',
+    # Outside the session middleware so session writes count toward the lock wait measurement
+    'core.middleware.PollGovernorMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
     'django.contrib.auth.middleware.AuthenticationMiddleware',
+    'core.middleware.RoleMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
+    'core.middleware.WriteContentionMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
     'core.middleware.PerformanceMonitoringMiddleware',
     'core.middleware.MobileOptimizationMiddleware',
@@ -137,14 +141,17 @@ MEDIA_ROOT = BASE_DIR / 'media'
 DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 
 # Caching configuration for performance optimization
+# Host-wide SQLite (WAL) cache shared by every worker process, so cached stats,
+# sessions and invalidations are not duplicated per worker
 CACHES = {
     'default': {
-        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
-        'LOCATION': 'prycegas-cache',
+        'BACKEND': 'core.cache_backends.SQLiteCache',
+        'LOCATION': os.environ.get('PRYCEGAS_CACHE_PATH', str(BASE_DIR / 'cache' / 'prycegas-cache.sqlite3')),
         'TIMEOUT': 300,  # 5 minutes default timeout
         'OPTIONS': {
-            'MAX_ENTRIES': 1000,
+            'MAX_ENTRIES': 10000,
             'CULL_FREQUENCY': 3,
+            'BUSY_TIMEOUT': 5000,
         }
     }
 }
@@ -163,12 +170,42 @@ if not DEBUG:
         ]),
     ]
 
-# Database optimization
+# SQLite tuning applied to every new connection: overrides of core.db_tuning.DEFAULT_PROFILE
+# (WAL, synchronous=NORMAL, 20 s busy timeout, 20 MB page cache, ...), e.g. {'busy_timeout': 5000};
+# None skips a PRAGMA. WAL is only switched on by the servers in wsgi.py / asgi.py
+SQLITE_PROFILE = {}
+
+# Write transactions through core.db_writes.atomic(): BEGIN IMMEDIATE, retried while locked.
+# Overrides of core.db_writes.DEFAULTS (2 s wait per attempt, 4 retries with backoff), e.g. {'serialize': True}
+SQLITE_WRITES = {}
+
+# Database optimization (lock waits come from the profile's busy_timeout PRAGMA)
 DATABASES['default']['OPTIONS'] = {
-    'timeout': 20,
     'check_same_thread': False,
 }
 
+# Read-only copy of the database that report and PDF views read from (core.reporting)
+DATABASES['reporting'] = {
+    'ENGINE': 'django.db.backends.sqlite3',
+    'NAME': f"file:{BASE_DIR / 'reporting.sqlite3'}?mode=ro",
+    'OPTIONS': {'timeout': 5},
+    'TEST': {'MIRROR': 'default'},
+}
+DATABASE_ROUTERS = ['core.reporting.ReportingRouter']
+
+# Overrides of core.reporting.DEFAULTS (refresh every 5 minutes, ignore snapshots older than 15)
+REPORTING_SNAPSHOT = {}
+
+# Hot/cold archival of old orders, stock movements, notifications and cashier transactions (core.archive).
+# Overrides of core.archive.DEFAULTS (rows older than 548 days, 500 rows per write transaction)
+ARCHIVE = {}
+
+# Pruning of expired sessions, archived notifications, change events, reviewed ID documents and large logs
+# (core.retention). Overrides of core.retention.DEFAULTS
+RETENTION = {
+    'interval': 6 * 60 * 60,  # seconds between runs started in-process after a request (0: only the prune command)
+}
+
 # Logging configuration for performance monitoring
 LOGGING = {
     'version': 1,
@@ -11,6 +11,11 @@ import os
 
 from django.core.wsgi import get_wsgi_application
 
+from core import db_tuning
+
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'PrycegasStation.settings')
 
 application = get_wsgi_application()
+
+# Only servers switch the database file to WAL (see core.db_tuning)
+db_tuning.serve()
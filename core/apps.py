@@ -4,3 +4,15 @@ from django.apps import AppConfig
 class CoreConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'core'
+
+    def ready(self):
+        # Connect the catalogue/report/role invalidation, dashboard/notification counter, change event,
+        # SQLite connection tuning and scheduled retention signal handlers
+        from . import caching  # noqa: F401
+        from . import catalogue  # noqa: F401
+        from . import dashboard  # noqa: F401
+        from . import db_tuning  # noqa: F401
+        from . import events  # noqa: F401
+        from . import notifications  # noqa: F401
+        from . import retention  # noqa: F401
+        from . import roles  # noqa: F401
@@ -0,0 +1,308 @@
+"""
+Hot/cold archival of old orders, stock movements, notifications and cashier transactions
+Rows older than the archive horizon are copied into ArchivedRecord (the full row as JSON,
+plus the columns reports total on) and deleted from their tables, so the hot tables and
+their indexes only hold recent data. Work is done in batches, each in its own write
+transaction: an interrupted run leaves every batch either fully moved or untouched, and the
+next run carries on from there (copies are unique per original row).
+
+Orders are archived a whole batch at a time once every item is delivered or cancelled
+before the horizon; their notifications, stock movements and cashier transactions go with
+them. Read notifications, stock movements and cashier transactions without an order that
+are older than the horizon are archived on their own. Rows are deleted with
+QuerySet.delete(), so the usual delete signals keep unread counts, caches and the dashboard
+counters in step; inside dashboard.archiving() archived orders stay in the lifetime order total.
+The archive is the only thing that moves read notifications out of their table; the
+'notifications' retention job later drops their archived copies (core.retention).
+
+archived_order() / archived_batch() restore unsaved model instances for detail pages,
+with_archived_orders() adds archived sales to report totals and transaction_totals() gives
+the archived part of cashier transaction totals.
+"""
+import logging
+from collections import Counter
+from datetime import datetime, timedelta
+from decimal import Decimal
+
+from django.conf import settings
+from django.core import serializers
+from django.db.models import Count, Q, Sum
+from django.utils import timezone
+
+from . import dashboard, date_ranges, db_writes
+from .caching import invalidate_reports
+from .models import ArchivedRecord, CashierTransaction, Notification, Order, StockMovement
+
+logger = logging.getLogger(__name__)
+
+
+DEFAULTS = {
+    # Rows older than this many days are moved to the archive (about 18 months)
+    'horizon_days': 548,
+    # Rows moved per write transaction
+    'batch_size': 500,
+}
+
+KIND_MODELS = {
+    'order': Order,
+    'stock_movement': StockMovement,
+    'notification': Notification,
+    'cashier_transaction': CashierTransaction,
+}
+
+ORDER_TOTAL_FIELDS = ('total_orders', 'total_revenue', 'total_quantity', 'total_cost_of_goods')
+
+
+def get_options():
+    return {**DEFAULTS, **getattr(settings, 'ARCHIVE', {})}
+
+
+def get_cutoff(now=None):
+    """Rows that happened before this datetime are archived"""
+    return (now or timezone.now()) - timedelta(days=get_options()['horizon_days'])
+
+
+def _closed_before(cutoff):
+    return (
+        Q(status='delivered', delivery_date__lt=cutoff)
+        | Q(status='delivered', delivery_date__isnull=True, order_date__lt=cutoff)
+        | Q(status='cancelled', order_date__lt=cutoff)
+    )
+
+
+def archivable_orders(cutoff):
+    """Orders closed before cutoff whose batch has no item that is still open or more recent"""
+    closed = _closed_before(cutoff)
+    kept_batches = Order.objects.exclude(closed).values('batch_id')
+    return Order.objects.filter(closed).exclude(batch_id__in=kept_batches)
+
+
+def old_stock_movements(cutoff):
+    return StockMovement.objects.filter(created_at__lt=cutoff)
+
+
+def old_notifications(cutoff):
+    """Read notifications created before cutoff; unread ones stay until their order is archived"""
+    return Notification.objects.filter(created_at__lt=cutoff, is_read=True)
+
+
+def old_cashier_transactions(cutoff):
+    """Transactions created before cutoff without an order; the others move with their order"""
+    return CashierTransaction.objects.filter(created_at__lt=cutoff, order__isnull=True)
+
+
+def _record(kind, instance, occurred_at, **columns):
+    fields = serializers.serialize('python', [instance])[0]['fields']
+    # Full isoformat: DjangoJSONEncoder would cut datetimes to milliseconds
+    fields = {name: value.isoformat() if isinstance(value, datetime) else value for name, value in fields.items()}
+    return ArchivedRecord(kind=kind, original_id=str(instance.pk), occurred_at=occurred_at,
+                          payload=fields, **columns)
+
+
+def _order_record(order):
+    if order.status == 'delivered':
+        occurred_at = order.delivery_date or order.order_date
+    else:
+        occurred_at = order.cancelled_at or order.order_date
+    cost_of_goods = order.cost_of_goods
+    if cost_of_goods is None:
+        cost_of_goods = order.quantity * (order.product.cost_price or Decimal('0.00'))
+    return _record('order', order, occurred_at, customer_id=order.customer_id, product_id=order.product_id,
+                   batch_id=order.batch_id, status=order.status, quantity=order.quantity,
+                   amount=order.total_amount, cost_of_goods=cost_of_goods)
+
+
+def _movement_record(movement):
+    return _record('stock_movement', movement, movement.created_at, product_id=movement.product_id,
+                   quantity=movement.quantity)
+
+
+def _notification_record(notification):
+    return _record('notification', notification, notification.created_at, customer_id=notification.customer_id)
+
+
+def _transaction_record(transaction):
+    return _record('cashier_transaction', transaction, transaction.created_at, customer_id=transaction.customer_id,
+                   cashier_id=transaction.cashier_id, status=transaction.transaction_type, amount=transaction.amount)
+
+
+def _delete(model, pks):
+    if pks:
+        model.objects.filter(pk__in=pks).delete()
+
+
+def _store(records):
+    ArchivedRecord.objects.bulk_create(records, ignore_conflicts=True)
+
+
+def archive_orders(cutoff, batch_size):
+    """Move one batch of closed order batches with their dependent rows; returns {kind: rows moved}"""
+    with db_writes.atomic():
+        batch_ids = set(archivable_orders(cutoff).order_by('id').values_list('batch_id', flat=True)[:batch_size])
+        if not batch_ids:
+            return Counter()
+        orders = list(Order.objects.filter(batch_id__in=batch_ids).select_related('product'))
+        order_ids = [order.id for order in orders]
+        order_notifications = list(Notification.objects.filter(order_id__in=order_ids))
+        movements = list(StockMovement.objects.filter(order_id__in=order_ids))
+        transactions = list(CashierTransaction.objects.filter(order_id__in=order_ids))
+
+        _store([_order_record(order) for order in orders]
+               + [_notification_record(notification) for notification in order_notifications]
+               + [_movement_record(movement) for movement in movements]
+               + [_transaction_record(transaction) for transaction in transactions])
+        _delete(Notification, [notification.pk for notification in order_notifications])
+        _delete(StockMovement, [movement.pk for movement in movements])
+        _delete(CashierTransaction, [transaction.pk for transaction in transactions])
+        with dashboard.archiving():
+            _delete(Order, order_ids)
+    return Counter(order=len(orders), notification=len(order_notifications), stock_movement=len(movements),
+                   cashier_transaction=len(transactions))
+
+
+def archive_stock_movements(cutoff, batch_size):
+    """Move one batch of stock movements created before cutoff; returns {kind: rows moved}"""
+    with db_writes.atomic():
+        movements = list(old_stock_movements(cutoff).order_by('created_at')[:batch_size])
+        if movements:
+            _store([_movement_record(movement) for movement in movements])
+            _delete(StockMovement, [movement.pk for movement in movements])
+    return Counter(stock_movement=len(movements))
+
+
+def archive_notifications(cutoff, batch_size):
+    """Move one batch of read notifications created before cutoff; returns {kind: rows moved}"""
+    with db_writes.atomic():
+        moved = list(old_notifications(cutoff).order_by('created_at')[:batch_size])
+        if moved:
+            _store([_notification_record(notification) for notification in moved])
+            _delete(Notification, [notification.pk for notification in moved])
+    return Counter(notification=len(moved))
+
+
+def archive_cashier_transactions(cutoff, batch_size):
+    """Move one batch of cashier transactions without an order created before cutoff; returns {kind: rows moved}"""
+    with db_writes.atomic():
+        moved = list(old_cashier_transactions(cutoff).order_by('created_at')[:batch_size])
+        if moved:
+            _store([_transaction_record(transaction) for transaction in moved])
+            _delete(CashierTransaction, [transaction.pk for transaction in moved])
+    return Counter(cashier_transaction=len(moved))
+
+
+ARCHIVERS = (
+    ('order', archive_orders),
+    ('stock_movement', archive_stock_movements),
+    ('notification', archive_notifications),
+    ('cashier_transaction', archive_cashier_transactions),
+)
+
+
+def pending(cutoff=None):
+    """{kind: rows waiting to be archived} for a dry run"""
+    cutoff = cutoff or get_cutoff()
+    return {
+        'order': archivable_orders(cutoff).count(),
+        'stock_movement': old_stock_movements(cutoff).count(),
+        'notification': old_notifications(cutoff).count(),
+        'cashier_transaction': old_cashier_transactions(cutoff).count(),
+    }
+
+
+def run(cutoff=None, batch_size=None, max_batches=None):
+    """
+    Archive everything older than cutoff (default: the configured horizon); returns {kind: rows moved}
+    max_batches limits the batches per kind, leaving the rest for the next run.
+    """
+    cutoff = cutoff or get_cutoff()
+    batch_size = batch_size or get_options()['batch_size']
+    moved = Counter()
+    for kind, archiver in ARCHIVERS:
+        batches = 0
+        while max_batches is None or batches < max_batches:
+            counts = archiver(cutoff, batch_size)
+            if not counts[kind]:
+                break
+            moved.update(counts)
+            batches += 1
+    if moved:
+        invalidate_reports()
+        logger.info("Archived rows older than %s: %s", cutoff.isoformat(), dict(moved))
+    return {kind: moved[kind] for kind, _ in ARCHIVERS}
+
+
+def restore(record):
+    """Unsaved model instance rebuilt from an archived record"""
+    model = KIND_MODELS[record.kind]
+    data = {'model': model._meta.label_lower, 'pk': record.original_id, 'fields': record.payload}
+    return next(serializers.deserialize('python', [data])).object
+
+
+def archived_order(order_id, customer=None):
+    """The archived order with id order_id (of customer, when given) as an unsaved Order, or None"""
+    records = ArchivedRecord.objects.filter(kind='order', original_id=str(order_id))
+    if customer is not None:
+        records = records.filter(customer_id=customer.pk)
+    record = records.first()
+    return restore(record) if record else None
+
+
+def archived_batch(batch_id):
+    """Archived orders of a batch, in the order they were added"""
+    orders = [restore(record) for record in ArchivedRecord.objects.filter(kind='order', batch_id=batch_id)]
+    return sorted(orders, key=lambda order: order.pk)
+
+
+def order_totals(date_from=None, date_to=None, product_id=None, customer_id=None):
+    """Totals of archived delivered orders with delivery dates on the days date_from..date_to"""
+    records = ArchivedRecord.objects.filter(kind='order', status='delivered')
+    records = date_ranges.filter_dates(records, 'occurred_at', date_from, date_to)
+    if product_id:
+        records = records.filter(product_id=product_id)
+    if customer_id:
+        records = records.filter(customer_id=customer_id)
+    return records.aggregate(
+        total_orders=Count('id'),
+        total_revenue=Sum('amount'),
+        total_quantity=Sum('quantity'),
+        total_cost_of_goods=Sum('cost_of_goods'),
+    )
+
+
+def with_archived_orders(totals, date_from=None, date_to=None, product_id=None, customer_id=None):
+    """
+    Delivered order totals (total_orders, total_revenue, total_quantity, total_cost_of_goods)
+    plus the archived orders of the same period; adds archived_orders and recomputes
+    average_order_value
+    """
+    archived = order_totals(date_from, date_to, product_id, customer_id)
+    merged = {**totals, 'archived_orders': archived['total_orders']}
+    if not archived['total_orders']:
+        return merged
+    for field in ORDER_TOTAL_FIELDS:
+        merged[field] = (totals.get(field) or 0) + (archived[field] or 0)
+    merged['average_order_value'] = merged['total_revenue'] / merged['total_orders']
+    return merged
+
+
+def transaction_totals(cashier_id=None):
+    """{'count', 'amount'} of the archived cashier transactions (of cashier_id, when given)"""
+    records = ArchivedRecord.objects.filter(kind='cashier_transaction')
+    if cashier_id:
+        records = records.filter(cashier_id=cashier_id)
+    totals = records.aggregate(count=Count('id'), amount=Sum('amount'))
+    return {'count': totals['count'], 'amount': totals['amount'] or Decimal('0.00')}
+
+
+def transaction_totals_by_cashier():
+    """{cashier_id: {'count', 'amount', 'by_type': {transaction_type: count}}} of the archived cashier transactions"""
+    totals = {}
+    rows = ArchivedRecord.objects.filter(kind='cashier_transaction').values('cashier_id', 'status').annotate(
+        count=Count('id'), amount=Sum('amount')
+    ).order_by()
+    for row in rows:
+        cashier = totals.setdefault(row['cashier_id'], {'count': 0, 'amount': Decimal('0.00'), 'by_type': {}})
+        cashier['count'] += row['count']
+        cashier['amount'] += row['amount'] or 0
+        cashier['by_type'][row['status']] = row['count']
+    return totals
@@ -0,0 +1,170 @@
+"""
+Stampede-safe cache helper for expensive aggregates (reports, dashboards)
+Cached values are stored in an envelope with a soft expiry, the time the value took to
+compute and the data versions it was computed from. After the soft expiry, or once a
+version has moved, exactly one caller (the holder of a cache.add() lock) recomputes. Other
+callers keep getting the previous value until the stale window closes. Each caller may also
+refresh shortly before the soft expiry, with a probability that rises as expiry approaches
+and with the cost of the computation (XFetch), so recomputation rarely lines up on a TTL boundary.
+"""
+import math
+import random
+import time
+import uuid
+
+from django.core.cache import cache
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+from django.utils import timezone
+
+from . import date_ranges, reporting
+from .data_versions import bump_now_and_on_commit, get_versions
+from .models import DeliveryLog, InventoryAdjustment, LPGProduct, Order, StockMovement
+
+
+# Moved by every order, product, delivery and stock write; live dealer pages and polls follow it
+REPORTS_SCOPE = 'reports'
+
+# Moved by writes to days before today; cached reports over past periods depend on it
+REPORT_HISTORY_SCOPE = 'reports:history'
+
+# Per-customer scope ('orders', customer_id) for fragments showing one customer's orders
+ORDERS_SCOPE = 'orders'
+
+# Seconds cached reports over periods reaching today and over past periods are served fresh
+TODAY_TIMEOUT = 60
+HISTORY_TIMEOUT = 60 * 60
+
+# Seconds a waiting caller polls for another worker's result before computing itself
+WAIT_TIMEOUT = 5.0
+WAIT_INTERVAL = 0.05
+
+
+def _lock_key(key):
+    return f'{key}:lock'
+
+
+def _fresh(envelope, versions, beta, now):
+    """XFetch: treat the value as expired early with probability growing near expiry"""
+    if envelope['versions'] != versions:
+        return False
+    early = envelope['delta'] * beta * -math.log(1.0 - random.random())
+    return now + early < envelope['expires_at']
+
+
+def get_or_compute(key, compute, timeout, stale_timeout=None, scopes=(), beta=1.0, lock_timeout=30):
+    """
+    Return the cached value for key, computing it with compute() when needed.
+
+    timeout: seconds a value is served as fresh
+    stale_timeout: further seconds an expired value may be served while one caller recomputes
+                   (defaults to timeout)
+    scopes: data version scopes (tuples) the value depends on; moving any of them expires it
+    beta: XFetch aggressiveness, > 1 refreshes earlier, 0 disables early refresh
+    lock_timeout: upper bound on how long one recomputation holds the lock
+    """
+    stale_timeout = timeout if stale_timeout is None else stale_timeout
+    versions = tuple(get_versions(*scopes)) if scopes else ()
+    envelope = cache.get(key)
+    if envelope is not None and _fresh(envelope, versions, beta, time.time()):
+        return envelope['value']
+
+    token = uuid.uuid4().hex
+    if cache.add(_lock_key(key), token, lock_timeout):
+        try:
+            return _recompute(key, compute, timeout, stale_timeout, versions)
+        finally:
+            if cache.get(_lock_key(key)) == token:
+                cache.delete(_lock_key(key))
+
+    # Someone else is recomputing: serve what we have, or wait briefly for their result
+    if envelope is not None:
+        return envelope['value']
+    deadline = time.monotonic() + WAIT_TIMEOUT
+    while time.monotonic() < deadline:
+        time.sleep(WAIT_INTERVAL)
+        envelope = cache.get(key)
+        if envelope is not None:
+            return envelope['value']
+    return _recompute(key, compute, timeout, stale_timeout, versions)
+
+
+def _recompute(key, compute, timeout, stale_timeout, versions):
+    started = time.monotonic()
+    value = compute()
+    delta = time.monotonic() - started
+    cache.set(key, {
+        'value': value,
+        'expires_at': time.time() + timeout,
+        'delta': delta,
+        'versions': versions,
+    }, timeout + stale_timeout)
+    return value
+
+
+def cached_report(name, compute, *parts, period=None, stale_timeout=300):
+    """
+    get_or_compute for report aggregates over period, a (date_from, date_to) pair of dates
+    Periods reaching today (or without an end) change with every sale, so they are cached for
+    TODAY_TIMEOUT under a key naming today's date rather than expired by each write. Periods
+    that ended before today only change when a write touches a past day, which moves
+    REPORT_HISTORY_SCOPE; they are cached for HISTORY_TIMEOUT.
+    """
+    # Aggregates computed from the reporting snapshot are kept apart from live ones
+    source = reporting.active_snapshot() or 'live'
+    today = timezone.localdate()
+    date_to = period[1] if period else None
+    if date_to is None or date_to >= today:
+        tier, timeout, scopes = today.isoformat(), TODAY_TIMEOUT, ()
+    else:
+        tier, timeout, scopes = 'history', HISTORY_TIMEOUT, [(REPORT_HISTORY_SCOPE,)]
+    key = ':'.join(['report', name, source, tier, *(str(part) for part in parts)])
+    return get_or_compute(key, compute, timeout, stale_timeout=stale_timeout, scopes=scopes)
+
+
+def invalidate_reports():
+    """Expire every cached report, including those over past periods"""
+    bump_now_and_on_commit(REPORT_HISTORY_SCOPE)
+
+
+def _before_today(*values):
+    start = date_ranges.day_start(timezone.localdate())
+    return any(value is not None and value < start for value in values)
+
+
+# Datetime fields of each model that place a row on a report day
+REPORT_DATE_FIELDS = {
+    Order: ('order_date', 'delivery_date', 'cancelled_at'),
+    DeliveryLog: ('delivery_date', 'created_at'),
+    StockMovement: ('created_at',),
+    InventoryAdjustment: ('created_at',),
+}
+
+
+@receiver(post_save, sender=Order)
+@receiver(post_save, sender=LPGProduct)
+@receiver(post_save, sender=DeliveryLog)
+@receiver(post_save, sender=StockMovement)
+@receiver(post_save, sender=InventoryAdjustment)
+@receiver(post_delete, sender=Order)
+@receiver(post_delete, sender=LPGProduct)
+@receiver(post_delete, sender=DeliveryLog)
+@receiver(post_delete, sender=StockMovement)
+@receiver(post_delete, sender=InventoryAdjustment)
+def invalidate_reports_on_write(sender, instance, **kwargs):
+    # Live dealer pages (order lists, dashboard polls) follow every write
+    bump_now_and_on_commit(REPORTS_SCOPE)
+    # Cached past-period reports only when the row falls on a day before today; product
+    # saves change live stock only, product deletes drop rows from past reports
+    if sender is LPGProduct:
+        if kwargs['signal'] is post_delete:
+            invalidate_reports()
+    elif _before_today(*(getattr(instance, field) for field in REPORT_DATE_FIELDS[sender])):
+        invalidate_reports()
+
+
+@receiver(post_save, sender=Order)
+@receiver(post_delete, sender=Order)
+def invalidate_customer_orders_on_write(sender, instance, **kwargs):
+    if instance.customer_id:
+        bump_now_and_on_commit(ORDERS_SCOPE, instance.customer_id)
@@ -9,16 +9,18 @@ from django.db.models import Count, Sum
 from django.utils import timezone
 from datetime import datetime, timedelta, date
 
+from . import date_ranges, reporting, roles
 from .models import Cashier, Order, LPGProduct
 
 
 def is_admin(user):
     """Check if user is admin/superuser"""
-    return user.is_superuser or (user.is_staff and not hasattr(user, 'cashier_profile'))
+    return roles.for_user(user).is_admin
 
 
 @login_required
 @user_passes_test(is_admin, login_url='core:login')
+@reporting.from_snapshot
 def cashier_reports(request):
     """
     Main cashier reports dashboard with daily, monthly, yearly options
@@ -35,11 +37,12 @@ def cashier_reports(request):
 
 @login_required
 @user_passes_test(is_admin, login_url='core:login')
+@reporting.from_snapshot
 def cashier_daily_report(request):
     """
     Detailed daily report: Income and Inventory by Cashier
     """
-    today = timezone.now().date()
+    today = timezone.localdate()
     report_date = request.GET.get('date', str(today))
     
     try:
@@ -48,10 +51,9 @@ def cashier_daily_report(request):
         report_date = today
     
     # Get all delivered orders for the day
-    orders = Order.objects.filter(
-        status='delivered',
-        delivery_date__date=report_date,
-        processed_by__isnull=False
+    orders = date_ranges.filter_day(
+        Order.objects.filter(status='delivered', processed_by__isnull=False),
+        'delivery_date', report_date
     ).select_related('processed_by', 'product', 'customer')
     
     # Income data by cashier
@@ -108,11 +110,12 @@ def cashier_daily_report(request):
 
 @login_required
 @user_passes_test(is_admin, login_url='core:login')
+@reporting.from_snapshot
 def cashier_monthly_report(request):
     """
     Monthly report: Income and Inventory by Cashier
     """
-    today = timezone.now().date()
+    today = timezone.localdate()
     year = request.GET.get('year', str(today.year))
     month = request.GET.get('month', str(today.month))
     
@@ -132,11 +135,9 @@ def cashier_monthly_report(request):
             month_end = date(today.year, today.month + 1, 1) - timedelta(days=1)
     
     # Get all delivered orders for the month
-    orders = Order.objects.filter(
-        status='delivered',
-        delivery_date__date__gte=month_start,
-        delivery_date__date__lte=month_end,
-        processed_by__isnull=False
+    orders = date_ranges.filter_dates(
+        Order.objects.filter(status='delivered', processed_by__isnull=False),
+        'delivery_date', month_start, month_end
     ).select_related('processed_by', 'product', 'customer')
     
     # Income data by cashier
@@ -196,11 +197,12 @@ def cashier_monthly_report(request):
 
 @login_required
 @user_passes_test(is_admin, login_url='core:login')
+@reporting.from_snapshot
 def cashier_yearly_report(request):
     """
     Yearly report: Income and Inventory by Cashier
     """
-    today = timezone.now().date()
+    today = timezone.localdate()
     year = request.GET.get('year', str(today.year))
     
     try:
@@ -212,11 +214,9 @@ def cashier_yearly_report(request):
     year_end = date(year, 12, 31)
     
     # Get all delivered orders for the year
-    orders = Order.objects.filter(
-        status='delivered',
-        delivery_date__date__gte=year_start,
-        delivery_date__date__lte=year_end,
-        processed_by__isnull=False
+    orders = date_ranges.filter_dates(
+        Order.objects.filter(status='delivered', processed_by__isnull=False),
+        'delivery_date', year_start, year_end
     ).select_related('processed_by', 'product', 'customer')
     
     # Income data by cashier
@@ -263,10 +263,7 @@ def cashier_yearly_report(request):
         else:
             month_end = date(year, m + 1, 1) - timedelta(days=1)
         
-        month_orders = orders.filter(
-            delivery_date__date__gte=month_start,
-            delivery_date__date__lte=month_end
-        )
+        month_orders = date_ranges.filter_dates(orders, 'delivery_date', month_start, month_end)
         month_income = month_orders.aggregate(Sum('total_amount'))['total_amount__sum'] or 0
         month_qty = month_orders.aggregate(Sum('quantity'))['quantity__sum'] or 0
         
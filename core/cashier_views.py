@@ -10,7 +10,6 @@ from django.contrib import messages
 from django.http import JsonResponse, HttpResponse
 from django.views.decorators.http import require_http_methods
 from django.db.models import Count, Sum, Q, F
-from django.db import transaction as db_transaction
 from django.utils import timezone
 from django.core.paginator import Paginator
 from datetime import datetime, timedelta, date
@@ -22,6 +21,7 @@ from reportlab.lib import colors
 from reportlab.lib.enums import TA_CENTER, TA_LEFT, TA_RIGHT
 from io import BytesIO
 
+from . import archive, date_ranges, db_writes, reporting, roles
 from .models import Cashier, CashierTransaction, Order, LPGProduct
 from .forms import (
     CashierCreationForm, CashierUpdateForm, CashierOrderForm,
@@ -31,12 +31,12 @@ from .forms import (
 
 def is_admin(user):
     """Check if user is admin/superuser"""
-    return user.is_superuser or (user.is_staff and not hasattr(user, 'cashier_profile'))
+    return roles.for_user(user).is_admin
 
 
 def is_cashier(user):
     """Check if user is a cashier (has cashier profile)"""
-    return hasattr(user, 'cashier_profile') and user.cashier_profile.is_active
+    return roles.for_user(user).is_cashier
 
 
 @login_required
@@ -148,7 +148,7 @@ def cashier_order_list(request):
     Cashiers process customer orders (NOT their own orders)
     Batch orders are grouped together and shown as single entries
     """
-    if not hasattr(request.user, 'cashier_profile'):
+    if not request.roles.has_cashier_profile:
         return redirect('core:login')
     
     cashier = request.user.cashier_profile
@@ -236,19 +236,19 @@ def cashier_personal_dashboard(request):
     """
     Cashier's personal dashboard - shows their own transactions
     """
-    if not hasattr(request.user, 'cashier_profile'):
+    if not request.roles.has_cashier_profile:
         return redirect('core:login')
     
     cashier = request.user.cashier_profile
-    today = timezone.now().date()
+    today = timezone.localdate()
     
     # Get this cashier's transactions
     cashier_transactions = CashierTransaction.objects.filter(cashier=cashier)
-    today_transactions = cashier_transactions.filter(created_at__date=today)
+    today_transactions = date_ranges.filter_day(cashier_transactions, 'created_at', today)
     today_total = today_transactions.aggregate(Sum('amount'))['amount__sum'] or 0
     
     # Transaction breakdown
-    transaction_breakdown = cashier_transactions.filter(created_at__date=today).values('transaction_type').annotate(
+    transaction_breakdown = today_transactions.values('transaction_type').annotate(
         count=Count('id'),
         total=Sum('amount')
     ).order_by('-count')
@@ -256,9 +256,10 @@ def cashier_personal_dashboard(request):
     # Recent transactions - filter by today only
     recent_transactions = today_transactions.select_related('order', 'customer').order_by('-created_at')[:10]
     
-    # Performance metrics
-    total_transactions = cashier_transactions.count()
-    total_amount = cashier_transactions.aggregate(Sum('amount'))['amount__sum'] or 0
+    # Performance metrics, including transactions moved to the archive
+    archived = archive.transaction_totals(cashier.pk)
+    total_transactions = cashier_transactions.count() + archived['count']
+    total_amount = (cashier_transactions.aggregate(Sum('amount'))['amount__sum'] or 0) + archived['amount']
     avg_transaction = total_amount / total_transactions if total_transactions > 0 else 0
     
     context = {
@@ -282,13 +283,13 @@ def cashier_dashboard(request):
     Cashier dashboard with transaction summary - Admin only
     """
     # Get all transactions
-    today = timezone.now().date()
+    today = timezone.localdate()
     
-    today_transactions = CashierTransaction.objects.filter(created_at__date=today)
+    today_transactions = date_ranges.filter_day(CashierTransaction.objects.all(), 'created_at', today)
     today_total = today_transactions.aggregate(Sum('amount'))['amount__sum'] or 0
     
     # Get cashier statistics
-    total_transactions = CashierTransaction.objects.count()
+    total_transactions = CashierTransaction.objects.count() + archive.transaction_totals()['count']
     cashiers_count = Cashier.objects.filter(is_active=True).count()
     
     # Transaction breakdown by type
@@ -324,7 +325,7 @@ def manage_customer_order(request):
         form = CashierOrderForm(request.POST)
         if form.is_valid():
             try:
-                with db_transaction.atomic():
+                with db_writes.atomic():
                     order = form.save(commit=False)
                     order.status = 'pending'
                     order.total_amount = order.product.price * order.quantity
@@ -335,7 +336,7 @@ def manage_customer_order(request):
                     product.reserve_stock(order.quantity)
                     
                     # Record transaction
-                    if hasattr(request.user, 'cashier_profile'):
+                    if request.roles.has_cashier_profile:
                         cashier = request.user.cashier_profile
                     else:
                         cashier, _ = Cashier.objects.get_or_create(
@@ -380,10 +381,9 @@ def cashier_transactions(request):
         transactions = transactions.filter(cashier_id=cashier_id)
     if transaction_type:
         transactions = transactions.filter(transaction_type=transaction_type)
-    if date_from:
-        transactions = transactions.filter(created_at__date__gte=date_from)
-    if date_to:
-        transactions = transactions.filter(created_at__date__lte=date_to)
+    transactions = date_ranges.filter_dates(
+        transactions, 'created_at', date_ranges.parse_date(date_from), date_ranges.parse_date(date_to)
+    )
     
     # Sorting
     sort_by = request.GET.get('sort', '-created_at')
@@ -422,7 +422,7 @@ def record_payment(request):
             try:
                 transaction_obj = form.save(commit=False)
                 # Get admin user's cashier profile
-                if hasattr(request.user, 'cashier_profile'):
+                if request.roles.has_cashier_profile:
                     transaction_obj.cashier = request.user.cashier_profile
                 else:
                     # Create a temporary cashier profile for admin if needed
@@ -451,20 +451,22 @@ def cashier_performance(request):
     """
     # Get performance metrics for each cashier
     cashiers = Cashier.objects.filter(is_active=True)
+    archived_totals = archive.transaction_totals_by_cashier()
     
     performance_data = []
     for cashier in cashiers:
         transactions = CashierTransaction.objects.filter(cashier=cashier)
-        total_amount = transactions.aggregate(Sum('amount'))['amount__sum'] or 0
-        transaction_count = transactions.count()
+        archived = archived_totals.get(cashier.pk, {'count': 0, 'amount': 0, 'by_type': {}})
+        total_amount = (transactions.aggregate(Sum('amount'))['amount__sum'] or 0) + archived['amount']
+        transaction_count = transactions.count() + archived['count']
         
         performance_data.append({
             'cashier': cashier,
             'total_amount': total_amount,
             'transaction_count': transaction_count,
             'avg_transaction': total_amount / transaction_count if transaction_count > 0 else 0,
-            'orders': transactions.filter(transaction_type='order').count(),
-            'payments': transactions.filter(transaction_type='payment').count(),
+            'orders': transactions.filter(transaction_type='order').count() + archived['by_type'].get('order', 0),
+            'payments': transactions.filter(transaction_type='payment').count() + archived['by_type'].get('payment', 0),
         })
     
     # Sort by total amount
@@ -481,31 +483,19 @@ def cashier_performance(request):
 
 @login_required
 @user_passes_test(is_admin, login_url='core:login')
+@reporting.from_snapshot
 def cashier_daily_income_report(request):
     """
     Admin view to monitor daily income by cashier
     Shows breakdown of orders processed by each cashier
     """
-    today = timezone.now().date()
-    
-    # Date range filter
-    date_from = request.GET.get('date_from', str(today))
-    date_to = request.GET.get('date_to', str(today))
-    
-    try:
-        from datetime import datetime
-        date_from = datetime.strptime(date_from, '%Y-%m-%d').date()
-        date_to = datetime.strptime(date_to, '%Y-%m-%d').date()
-    except:
-        date_from = today
-        date_to = today
+    # Date range filter (defaults to today)
+    date_from, date_to = date_ranges.report_period(request.GET, days=0)
     
     # Get all orders delivered in date range by cashiers
-    orders = Order.objects.filter(
-        status='delivered',
-        delivery_date__date__gte=date_from,
-        delivery_date__date__lte=date_to,
-        processed_by__isnull=False
+    orders = date_ranges.filter_dates(
+        Order.objects.filter(status='delivered', processed_by__isnull=False),
+        'delivery_date', date_from, date_to
     ).select_related('processed_by', 'product', 'customer')
     
     # Group by product and cashier
@@ -573,7 +563,7 @@ def export_daily_report_pdf(request):
     """
     Export cashier's daily revenue report as PDF
     """
-    today = timezone.now().date()
+    today = timezone.localdate()
     report_date = request.GET.get('date', str(today))
     
     try:
@@ -585,10 +575,9 @@ def export_daily_report_pdf(request):
     cashier = request.user.cashier_profile
     
     # Get delivered orders for this cashier on the selected date
-    orders = Order.objects.filter(
-       status='delivered',
-       order_date__date=report_date,
-       processed_by=cashier
+    orders = date_ranges.filter_day(
+        Order.objects.filter(status='delivered', processed_by=cashier),
+        'order_date', report_date
     ).select_related('product', 'customer')
     
     # Income summary
@@ -789,7 +778,7 @@ def export_monthly_report_pdf(request):
     """
     Export cashier's monthly revenue report as PDF
     """
-    today = timezone.now().date()
+    today = timezone.localdate()
     date_str = request.GET.get('date', str(today))
     
     try:
@@ -807,11 +796,9 @@ def export_monthly_report_pdf(request):
     else:
         to_date = report_date.replace(month=report_date.month + 1, day=1) - timedelta(days=1)
     
-    orders = Order.objects.filter(
-        status='delivered',
-        order_date__date__gte=from_date,
-        order_date__date__lte=to_date,
-        processed_by=cashier
+    orders = date_ranges.filter_dates(
+        Order.objects.filter(status='delivered', processed_by=cashier),
+        'order_date', from_date, to_date
     ).select_related('product', 'customer')
     
     # Income summary
@@ -841,7 +828,7 @@ def export_monthly_report_pdf(request):
     daily_data = []
     current_date = from_date
     while current_date <= to_date:
-        day_orders = orders.filter(order_date__date=current_date)
+        day_orders = date_ranges.filter_day(orders, 'order_date', current_date)
         day_income = day_orders.aggregate(Sum('total_amount'))['total_amount__sum'] or 0
         day_count = day_orders.count()
         
@@ -1038,11 +1025,12 @@ def cashier_reports(request):
 
 @login_required
 @user_passes_test(is_admin, login_url='core:login')
+@reporting.from_snapshot
 def cashier_daily_report(request):
     """
     Detailed daily report: Income and Inventory by Cashier
     """
-    today = timezone.now().date()
+    today = timezone.localdate()
     report_date = request.GET.get('date', str(today))
     
     try:
@@ -1051,10 +1039,9 @@ def cashier_daily_report(request):
         report_date = today
     
     # Get all delivered orders for the day
-    orders = Order.objects.filter(
-        status='delivered',
-        delivery_date__date=report_date,
-        processed_by__isnull=False
+    orders = date_ranges.filter_day(
+        Order.objects.filter(status='delivered', processed_by__isnull=False),
+        'delivery_date', report_date
     ).select_related('processed_by', 'product', 'customer')
     
     # Income data by cashier
@@ -1111,11 +1098,12 @@ def cashier_daily_report(request):
 
 @login_required
 @user_passes_test(is_admin, login_url='core:login')
+@reporting.from_snapshot
 def cashier_monthly_report(request):
     """
     Monthly report: Income and Inventory by Cashier
     """
-    today = timezone.now().date()
+    today = timezone.localdate()
     year = request.GET.get('year', str(today.year))
     month = request.GET.get('month', str(today.month))
     
@@ -1135,11 +1123,9 @@ def cashier_monthly_report(request):
             month_end = date(today.year, today.month + 1, 1) - timedelta(days=1)
     
     # Get all delivered orders for the month
-    orders = Order.objects.filter(
-        status='delivered',
-        delivery_date__date__gte=month_start,
-        delivery_date__date__lte=month_end,
-        processed_by__isnull=False
+    orders = date_ranges.filter_dates(
+        Order.objects.filter(status='delivered', processed_by__isnull=False),
+        'delivery_date', month_start, month_end
     ).select_related('processed_by', 'product', 'customer')
     
     # Income data by cashier
@@ -1199,11 +1185,12 @@ def cashier_monthly_report(request):
 
 @login_required
 @user_passes_test(is_admin, login_url='core:login')
+@reporting.from_snapshot
 def cashier_yearly_report(request):
     """
     Yearly report: Income and Inventory by Cashier
     """
-    today = timezone.now().date()
+    today = timezone.localdate()
     year = request.GET.get('year', str(today.year))
     
     try:
@@ -1215,11 +1202,9 @@ def cashier_yearly_report(request):
     year_end = date(year, 12, 31)
     
     # Get all delivered orders for the year
-    orders = Order.objects.filter(
-        status='delivered',
-        delivery_date__date__gte=year_start,
-        delivery_date__date__lte=year_end,
-        processed_by__isnull=False
+    orders = date_ranges.filter_dates(
+        Order.objects.filter(status='delivered', processed_by__isnull=False),
+        'delivery_date', year_start, year_end
     ).select_related('processed_by', 'product', 'customer')
     
     # Income data by cashier
@@ -1266,10 +1251,7 @@ def cashier_yearly_report(request):
         else:
             month_end = date(year, m + 1, 1) - timedelta(days=1)
         
-        month_orders = orders.filter(
-            delivery_date__date__gte=month_start,
-            delivery_date__date__lte=month_end
-        )
+        month_orders = date_ranges.filter_dates(orders, 'delivery_date', month_start, month_end)
         month_income = month_orders.aggregate(Sum('total_amount'))['total_amount__sum'] or 0
         month_qty = month_orders.aggregate(Sum('quantity'))['quantity__sum'] or 0
         
@@ -1305,7 +1287,7 @@ def cashier_personal_reports_daily(request):
     """
     Cashier's personal daily revenue report
     """
-    today = timezone.now().date()
+    today = timezone.localdate()
     report_date = request.GET.get('date', str(today))
     
     try:
@@ -1317,10 +1299,9 @@ def cashier_personal_reports_daily(request):
     cashier = request.user.cashier_profile
     
     # Get delivered orders for this cashier on the selected date
-    orders = Order.objects.filter(
-        status='delivered',
-        order_date__date=report_date,
-        processed_by=cashier
+    orders = date_ranges.filter_day(
+        Order.objects.filter(status='delivered', processed_by=cashier),
+        'order_date', report_date
     ).select_related('product', 'customer')
     
     # Income summary
@@ -1366,7 +1347,7 @@ def cashier_personal_reports_monthly(request):
     """
     Cashier's personal monthly revenue report
     """
-    today = timezone.now().date()
+    today = timezone.localdate()
     year = request.GET.get('year', str(today.year))
     month = request.GET.get('month', str(today.month))
     
@@ -1391,11 +1372,9 @@ def cashier_personal_reports_monthly(request):
     cashier = request.user.cashier_profile
     
     # Get delivered orders for this cashier in the selected month
-    orders = Order.objects.filter(
-        status='delivered',
-        order_date__date__gte=month_start,
-        order_date__date__lte=month_end,
-        processed_by=cashier
+    orders = date_ranges.filter_dates(
+        Order.objects.filter(status='delivered', processed_by=cashier),
+        'order_date', month_start, month_end
     ).select_related('product', 'customer')
     
     # Income summary
@@ -1431,7 +1410,7 @@ def cashier_personal_reports_monthly(request):
         except ValueError:
             break
         
-        day_orders = orders.filter(order_date__date=day_date)
+        day_orders = date_ranges.filter_day(orders, 'order_date', day_date)
         if day_orders.exists():
             day_revenue = day_orders.aggregate(Sum('total_amount'))['total_amount__sum'] or 0
             daily_data.append({
@@ -1461,31 +1440,19 @@ def cashier_personal_reports_monthly(request):
 
 @login_required
 @user_passes_test(is_admin, login_url='core:login')
+@reporting.from_snapshot
 def cashier_inventory_impact_report(request):
     """
     Admin view to monitor inventory impact by cashier
     Shows breakdown of stock movements processed by each cashier
     """
-    today = timezone.now().date()
-    
-    # Date range filter
-    date_from = request.GET.get('date_from', str(today))
-    date_to = request.GET.get('date_to', str(today))
-    
-    try:
-        from datetime import datetime
-        date_from = datetime.strptime(date_from, '%Y-%m-%d').date()
-        date_to = datetime.strptime(date_to, '%Y-%m-%d').date()
-    except:
-        date_from = today
-        date_to = today
+    # Date range filter (defaults to today)
+    date_from, date_to = date_ranges.report_period(request.GET, days=0)
     
     # Get all orders delivered in date range by cashiers
-    orders = Order.objects.filter(
-        status='delivered',
-        delivery_date__date__gte=date_from,
-        delivery_date__date__lte=date_to,
-        processed_by__isnull=False
+    orders = date_ranges.filter_dates(
+        Order.objects.filter(status='delivered', processed_by__isnull=False),
+        'delivery_date', date_from, date_to
     ).select_related('processed_by', 'product', 'customer')
     
     # Group by product and cashier
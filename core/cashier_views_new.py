@@ -15,6 +15,7 @@ from django.utils import timezone
 from django.core.paginator import Paginator
 from datetime import datetime, timedelta, date
 
+from . import roles
 from .models import Cashier, CashierTransaction, Order, LPGProduct
 from .forms import (
     CashierCreationForm, CashierUpdateForm, CashierOrderForm,
@@ -24,12 +25,12 @@ from .forms import (
 
 def is_admin(user):
     """Check if user is admin/superuser"""
-    return user.is_superuser or (user.is_staff and not hasattr(user, 'cashier_profile'))
+    return roles.for_user(user).is_admin
 
 
 def is_cashier(user):
     """Check if user is a cashier (has cashier profile)"""
-    return hasattr(user, 'cashier_profile') and user.cashier_profile.is_active
+    return roles.for_user(user).is_cashier
 
 
 @login_required
@@ -141,7 +142,7 @@ def cashier_order_list(request):
     Cashiers process customer orders (NOT their own orders)
     Similar to admin order_management but for cashier role
     """
-    if not hasattr(request.user, 'cashier_profile'):
+    if not request.roles.has_cashier_profile:
         return redirect('core:login')
     
     cashier = request.user.cashier_profile
@@ -227,7 +228,7 @@ def cashier_personal_dashboard(request):
     """
     Cashier's personal dashboard - shows their own transactions
     """
-    if not hasattr(request.user, 'cashier_profile'):
+    if not request.roles.has_cashier_profile:
         return redirect('core:login')
     
     cashier = request.user.cashier_profile
@@ -326,7 +327,7 @@ def manage_customer_order(request):
                     product.reserve_stock(order.quantity)
                     
                     # Record transaction
-                    if hasattr(request.user, 'cashier_profile'):
+                    if request.roles.has_cashier_profile:
                         cashier = request.user.cashier_profile
                     else:
                         cashier, _ = Cashier.objects.get_or_create(
@@ -413,7 +414,7 @@ def record_payment(request):
             try:
                 transaction_obj = form.save(commit=False)
                 # Get admin user's cashier profile
-                if hasattr(request.user, 'cashier_profile'):
+                if request.roles.has_cashier_profile:
                     transaction_obj.cashier = request.user.cashier_profile
                 else:
                     # Create a temporary cashier profile for admin if needed
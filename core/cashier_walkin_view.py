@@ -7,7 +7,7 @@ from django.shortcuts import render, redirect
 from django.contrib.auth.decorators import login_required, user_passes_test
 from django.contrib import messages
 from django.http import JsonResponse
-from django.db import transaction
+from django.views.decorators.http import require_http_methods
 from django.utils import timezone
 from decimal import Decimal
 import json
@@ -15,6 +15,11 @@ import uuid
 
 from .models import Order, LPGProduct, CashierTransaction
 from .cashier_views import is_cashier
+from . import catalogue, db_writes
+
+
+# Upper bound on codes resolved in one scan request
+MAX_SCAN_CODES = 50
 
 
 @login_required
@@ -25,7 +30,7 @@ def cashier_walkin_order(request):
     Cashiers can create orders for customers who walk into the store
     Similar to customer place_order but for cashier use
     """
-    if not hasattr(request.user, 'cashier_profile'):
+    if not request.roles.has_cashier_profile:
         messages.error(request, 'You must be a cashier to access this page.')
         return redirect('core:login')
     
@@ -56,7 +61,7 @@ def cashier_walkin_order(request):
             if delivery_type == 'delivery' and not delivery_address:
                 raise ValueError('Delivery address is required for delivery orders')
             
-            with transaction.atomic():
+            with db_writes.atomic():
                 orders = []
                 total_amount = Decimal('0.00')
                 batch_id = uuid.uuid4()
@@ -89,9 +94,7 @@ def cashier_walkin_order(request):
                         processed_by=cashier
                     )
                     order.save()
-                    
-                    product.current_stock -= quantity
-                    product.save()
+                    order.deduct_stock(created_by=request.user)
                     
                     CashierTransaction.objects.create(
                         cashier=cashier,
@@ -149,7 +152,7 @@ def cashier_walkin_order(request):
             messages.error(request, error_msg)
     
     # GET request - show the form
-    products = LPGProduct.objects.filter(is_active=True).order_by('name', 'size')
+    products = catalogue.active_products_with_stock()
     
     # Define payment methods
     payment_methods = [
@@ -168,3 +171,37 @@ def cashier_walkin_order(request):
         'payment_methods': payment_methods,
     }
     return render(request, 'dealer/cashier_walkin_order.html', context)
+
+
+@login_required
+@user_passes_test(is_cashier, login_url='core:login')
+@require_http_methods(["GET", "POST"])
+def cashier_scan_lookup(request):
+    """
+    Resolve a batch of scanned barcodes/SKUs for the walk-in POS
+    Accepts ?codes=A,B,C (or repeated ?code=) or a JSON body {"codes": [...]}
+    and returns price and live availability for every code in one response
+    """
+    if request.method == 'POST':
+        try:
+            codes = json.loads(request.body or '{}').get('codes', [])
+        except (json.JSONDecodeError, AttributeError):
+            return JsonResponse({'success': False, 'message': 'Invalid request format'}, status=400)
+    else:
+        codes = request.GET.getlist('code') or request.GET.get('codes', '').split(',')
+
+    codes = [str(code).strip() for code in codes if str(code).strip()]
+    if not codes:
+        return JsonResponse({'success': False, 'message': 'No codes provided'}, status=400)
+    if len(codes) > MAX_SCAN_CODES:
+        return JsonResponse({
+            'success': False,
+            'message': f'At most {MAX_SCAN_CODES} codes can be looked up at once'
+        }, status=400)
+
+    items = catalogue.lookup_codes(codes)
+    return JsonResponse({
+        'success': True,
+        'items': items,
+        'not_found': [item['code'] for item in items if not item['found']],
+    })
@@ -0,0 +1,245 @@
+"""
+Versioned in-process product catalogue
+Each process keeps compact, immutable snapshots of the active products, keyed by the
+shared 'catalogue' data version that product edits bump. Prices and metadata are served
+from the snapshots; stock is never cached and is read live with a stock-columns-only query.
+"""
+import threading
+
+from asgiref.sync import sync_to_async
+from django.db import DEFAULT_DB_ALIAS
+from django.db.models.signals import post_save, post_delete
+from django.dispatch import receiver
+
+from .data_versions import aget_version, get_version, bump_on_commit
+from .models import LPGProduct
+
+
+CATALOGUE_SCOPE = 'catalogue'
+
+# Saves that only touch these fields do not change what the catalogue holds
+STOCK_ONLY_FIELDS = frozenset({'current_stock', 'reserved_stock', 'average_cost', 'updated_at'})
+
+SNAPSHOT_FIELDS = ('id', 'name', 'size', 'sku', 'barcode', 'price', 'minimum_stock', 'reorder_point')
+
+
+class ProductSnapshot:
+    """
+    Read-only view of an active product's catalogue data
+    Mirrors the LPGProduct attributes templates and views read; stock fields are only
+    populated on copies made by with_stock()
+    """
+    __slots__ = SNAPSHOT_FIELDS + ('current_stock', 'reserved_stock')
+
+    def __init__(self, id, name, size, sku, barcode, price, minimum_stock, reorder_point,
+                 current_stock=None, reserved_stock=None):
+        for field, value in zip(self.__slots__, (id, name, size, sku or '', barcode, price, minimum_stock,
+                                                 reorder_point, current_stock, reserved_stock)):
+            object.__setattr__(self, field, value)
+
+    def __setattr__(self, name, value):
+        raise AttributeError(f"{type(self).__name__} is immutable")
+
+    def __str__(self):
+        return f"{self.name} - {self.size}"
+
+    def __repr__(self):
+        return f"<ProductSnapshot {self.id}: {self}>"
+
+    @property
+    def pk(self):
+        return self.id
+
+    def with_stock(self, current_stock, reserved_stock=0):
+        """Copy of this snapshot carrying live stock levels"""
+        return ProductSnapshot(*(getattr(self, field) for field in SNAPSHOT_FIELDS),
+                               current_stock=current_stock, reserved_stock=reserved_stock)
+
+    @property
+    def available_stock(self):
+        return max(0, (self.current_stock or 0) - (self.reserved_stock or 0))
+
+    @property
+    def is_low_stock(self):
+        return self.current_stock is not None and self.current_stock <= self.minimum_stock
+
+    @property
+    def is_reorder_needed(self):
+        return self.current_stock is not None and self.current_stock <= self.reorder_point
+
+    def can_fulfill_order(self, quantity):
+        return self.available_stock >= quantity
+
+
+class _Catalogue:
+    """Snapshots for one catalogue version: ordered list, id index and barcode/SKU index"""
+    __slots__ = ('version', 'products', 'by_id', 'by_code')
+
+    def __init__(self, version, products):
+        self.version = version
+        self.products = products
+        self.by_id = {product.id: product for product in products}
+        self.by_code = {}
+        for product in products:
+            for code in (product.sku, product.barcode):
+                if code:
+                    self.by_code[normalize_code(code)] = product
+
+
+_lock = threading.Lock()
+_catalogue = None
+
+
+def normalize_code(code):
+    """Scanned codes are matched case-insensitively and without surrounding whitespace"""
+    return (code or '').strip().upper()
+
+
+def _load(version):
+    # Always live: the catalogue is shared by the whole process, including snapshot report views
+    rows = LPGProduct.objects.using(DEFAULT_DB_ALIAS).filter(is_active=True).order_by('name', 'size').values_list(*SNAPSHOT_FIELDS)
+    return _Catalogue(version, [ProductSnapshot(*row) for row in rows])
+
+
+def _reload(version):
+    global _catalogue
+    with _lock:
+        if _catalogue is None or _catalogue.version != version:
+            _catalogue = _load(version)
+        return _catalogue
+
+
+def get_catalogue():
+    """Return this process's catalogue, reloading it when the shared version has moved"""
+    version = get_version(CATALOGUE_SCOPE)
+    catalogue = _catalogue
+    if catalogue is None or catalogue.version != version:
+        catalogue = _reload(version)
+    return catalogue
+
+
+async def aget_catalogue():
+    """get_catalogue for async views; only a reload leaves the event loop"""
+    version = await aget_version(CATALOGUE_SCOPE)
+    catalogue = _catalogue
+    if catalogue is None or catalogue.version != version:
+        catalogue = await sync_to_async(_reload)(version)
+    return catalogue
+
+
+def invalidate():
+    """Drop this process's snapshots now and move every process to a new version on commit"""
+    global _catalogue
+    with _lock:
+        _catalogue = None
+    bump_on_commit(CATALOGUE_SCOPE)
+
+
+def active_products():
+    """Active product snapshots ordered by name and size (no stock)"""
+    return get_catalogue().products
+
+
+def get_product(product_id):
+    """Snapshot for an active product id, or None"""
+    try:
+        return get_catalogue().by_id.get(int(product_id))
+    except (TypeError, ValueError):
+        return None
+
+
+def live_stock(product_ids=None):
+    """{product_id: (current_stock, reserved_stock)} read straight from the stock columns"""
+    rows = LPGProduct.objects.filter(is_active=True)
+    if product_ids is not None:
+        rows = rows.filter(id__in=product_ids)
+    return {
+        product_id: (current_stock, reserved_stock)
+        for product_id, current_stock, reserved_stock in rows.values_list('id', 'current_stock', 'reserved_stock')
+    }
+
+
+def get_product_with_stock(product_id):
+    """Snapshot for an active product with its live stock, or None"""
+    product = get_product(product_id)
+    if product is None:
+        return None
+    stock = LPGProduct.objects.filter(id=product.id, is_active=True).values_list(
+        'current_stock', 'reserved_stock'
+    ).first()
+    if stock is None:
+        return None
+    return product.with_stock(*stock)
+
+
+async def aget_product_with_stock(product_id):
+    """get_product_with_stock for async views"""
+    try:
+        product = (await aget_catalogue()).by_id.get(int(product_id))
+    except (TypeError, ValueError):
+        return None
+    if product is None:
+        return None
+    stock = await LPGProduct.objects.filter(id=product.id, is_active=True).values_list(
+        'current_stock', 'reserved_stock'
+    ).afirst()
+    if stock is None:
+        return None
+    return product.with_stock(*stock)
+
+
+def active_products_with_stock():
+    """All active product snapshots carrying live stock, from one stock query"""
+    stock = live_stock()
+    return [product.with_stock(*stock[product.id]) for product in active_products() if product.id in stock]
+
+
+def product_choices(empty_label="Select a product"):
+    """Form choices for active products that are in stock"""
+    return [('', empty_label)] + [
+        (product.id, str(product)) for product in active_products_with_stock() if product.current_stock > 0
+    ]
+
+
+def lookup_codes(codes):
+    """
+    Resolve a batch of scanned barcodes/SKUs to catalogue entries with live availability.
+    Returns one result per code in scan order; stock for every match comes from a single query.
+    """
+    by_code = get_catalogue().by_code
+    matches = [(code, by_code.get(normalize_code(code))) for code in codes]
+
+    product_ids = {product.id for _, product in matches if product}
+    stock = live_stock(product_ids) if product_ids else {}
+
+    results = []
+    for code, product in matches:
+        if product is None or product.id not in stock:
+            results.append({'code': code, 'found': False})
+            continue
+        product = product.with_stock(*stock[product.id])
+        results.append({
+            'code': code,
+            'found': True,
+            'id': product.id,
+            'name': product.name,
+            'size': product.size,
+            'sku': product.sku,
+            'price': float(product.price),
+            'current_stock': product.current_stock,
+            'available_stock': product.available_stock,
+        })
+    return results
+
+
+@receiver(post_save, sender=LPGProduct)
+def invalidate_on_product_save(sender, instance, update_fields=None, **kwargs):
+    """Product edits invalidate the catalogue; stock-only saves from sales and deliveries do not"""
+    if update_fields and set(update_fields) <= STOCK_ONLY_FIELDS:
+        return
+    invalidate()
+
+
+@receiver(post_delete, sender=LPGProduct)
+def invalidate_on_product_delete(sender, instance, **kwargs):
+    invalidate()
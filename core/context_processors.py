@@ -1,30 +1,16 @@
 """
 Context processors for passing global template data
 """
-from django.contrib.auth.decorators import login_required
-from .models import Notification
+from . import notifications
 
 
 def customer_notifications(request):
     """
     Add unread notifications to template context for authenticated customers
+    Served from the per-user notification summary cache; non-customers get nothing and cost nothing
     """
-    context = {
-        'unread_notifications': [],
-        'unread_notification_count': 0,
+    summary = notifications.get_summary(request.user, getattr(request, 'roles', None))
+    return {
+        'unread_notifications': summary['latest'],
+        'unread_notification_count': summary['unread_count'],
     }
-    
-    if request.user.is_authenticated:
-        # Get unread notifications
-        unread = Notification.objects.filter(
-            customer=request.user,
-            is_read=False
-        ).order_by('-created_at')
-        
-        context['unread_notifications'] = unread[:5]  # Show latest 5
-        context['unread_notification_count'] = Notification.objects.filter(
-            customer=request.user,
-            is_read=False
-        ).count()
-    
-    return context
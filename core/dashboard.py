@@ -0,0 +1,254 @@
+"""
+Incrementally maintained dealer dashboard counters
+Every order and active product contributes fixed amounts to the DashboardCounters row and to
+the DailyOrderCounters row of its day. When one is saved or deleted, the difference between
+its contribution before and after is applied with F() updates, so the dashboard reads a
+handful of rows instead of aggregating the whole order history. The "before" is re-read from
+the stored row just before each save: inside the write transaction (core.db_writes.atomic,
+which status changes use) two requests moving the same order cannot both apply the transition.
+"""
+import contextvars
+from collections import defaultdict
+from contextlib import contextmanager
+from datetime import timedelta
+from decimal import Decimal
+
+from django.db import DEFAULT_DB_ALIAS, transaction
+from django.db.models import Count, F, Q, Sum
+from django.db.models.functions import TruncDate
+from django.db.models.signals import post_delete, post_init, post_save, pre_save
+from django.dispatch import receiver
+from django.utils import timezone
+
+from .models import ArchivedRecord, DashboardCounters, DailyOrderCounters, LPGProduct, Order
+
+
+# Days before today included in the weekly figures (matches the old order_date >= today - 7 filter)
+WEEK_DAYS = 7
+
+STATE_ATTR = '_dashboard_state'
+
+# Set while core.archive deletes the orders it has copied to the archive
+_archiving = contextvars.ContextVar('dashboard_archiving', default=False)
+
+ORDER_STATE_FIELDS = ('status', 'order_date', 'delivery_date', 'total_amount')
+PRODUCT_STATE_FIELDS = ('is_active', 'current_stock', 'minimum_stock', 'price')
+
+
+def _day(value):
+    if timezone.is_naive(value):
+        return value.date()
+    return timezone.localdate(value)
+
+
+def _order_contribution(state):
+    """(totals, {day: amounts}) one order adds to the counters"""
+    status, order_date, delivery_date, total_amount = state
+    totals = {
+        'total_orders': 1,
+        'pending_orders': int(status == 'pending'),
+        'out_for_delivery': int(status == 'out_for_delivery'),
+    }
+    daily = defaultdict(dict)
+    day = _day(order_date)
+    daily[day]['orders_placed'] = 1
+    if status == 'delivered':
+        daily[day]['delivered_revenue'] = Decimal(str(total_amount or 0))
+        if delivery_date:
+            daily[_day(delivery_date)]['delivered_orders'] = 1
+    return totals, daily
+
+
+def _product_contribution(state):
+    """(totals, {}) one product adds to the counters; inactive products add nothing"""
+    is_active, current_stock, minimum_stock, price = state
+    if not is_active:
+        return {}, {}
+    return {
+        'total_products': 1,
+        'low_stock_products': int(current_stock <= minimum_stock),
+        'out_of_stock': int(current_stock == 0),
+        'total_stock_value': current_stock * Decimal(str(price or 0)),
+    }, {}
+
+
+TRACKED = {
+    Order: (ORDER_STATE_FIELDS, _order_contribution),
+    LPGProduct: (PRODUCT_STATE_FIELDS, _product_contribution),
+}
+
+
+def _subtract(new, old):
+    delta = dict(new)
+    for field, amount in old.items():
+        delta[field] = delta.get(field, 0) - amount
+    return {field: amount for field, amount in delta.items() if amount}
+
+
+def _delta(contribution, old_state, new_state):
+    """Counter changes between two states of an instance; None states contribute nothing"""
+    old_totals, old_daily = contribution(old_state) if old_state else ({}, {})
+    new_totals, new_daily = contribution(new_state) if new_state else ({}, {})
+    daily = {}
+    for day in set(old_daily) | set(new_daily):
+        amounts = _subtract(new_daily.get(day, {}), old_daily.get(day, {}))
+        if amounts:
+            daily[day] = amounts
+    return _subtract(new_totals, old_totals), daily
+
+
+def _apply(totals, daily):
+    if totals:
+        updated = DashboardCounters.objects.filter(pk=DashboardCounters.SINGLETON_ID).update(
+            **{field: F(field) + amount for field, amount in totals.items()}
+        )
+        if not updated:
+            # No counters yet: build them from the tables, which already include this change
+            rebuild()
+            return
+    for day, amounts in daily.items():
+        DailyOrderCounters.objects.get_or_create(date=day)
+        DailyOrderCounters.objects.filter(date=day).update(
+            **{field: F(field) + amount for field, amount in amounts.items()}
+        )
+
+
+def _loaded_state(instance, fields):
+    # Read from __dict__ so deferred fields are not fetched just to take the snapshot
+    values = instance.__dict__
+    if any(field not in values for field in fields):
+        return None
+    return tuple(values[field] for field in fields)
+
+
+@receiver(post_init, sender=Order)
+@receiver(post_init, sender=LPGProduct)
+def remember_loaded_state(sender, instance, **kwargs):
+    setattr(instance, STATE_ATTR, _loaded_state(instance, TRACKED[sender][0]))
+
+
+@receiver(pre_save, sender=Order)
+@receiver(pre_save, sender=LPGProduct)
+def load_stored_state(sender, instance, **kwargs):
+    """Snapshot the stored state just before saving; the one taken at load may be out of date"""
+    if not instance._state.adding:
+        fields = TRACKED[sender][0]
+        stored = sender.objects.using(DEFAULT_DB_ALIAS).filter(pk=instance.pk).values_list(*fields)
+        setattr(instance, STATE_ATTR, stored.first())
+
+
+@receiver(post_save, sender=Order)
+@receiver(post_save, sender=LPGProduct)
+def update_counters_on_save(sender, instance, created, **kwargs):
+    fields, contribution = TRACKED[sender]
+    old_state = None if created else getattr(instance, STATE_ATTR, None)
+    # Fields still deferred were not written, so they keep their stored values
+    new_state = tuple(
+        instance.__dict__[field] if field in instance.__dict__ else old_state[index]
+        for index, field in enumerate(fields)
+    ) if old_state else _loaded_state(instance, fields)
+    _apply(*_delta(contribution, old_state, new_state))
+    setattr(instance, STATE_ATTR, new_state)
+
+
+@contextmanager
+def archiving():
+    """
+    Orders deleted inside this block were moved to the archive: they leave the status and
+    daily counters but keep counting towards the lifetime order total (rebuild() adds them back)
+    """
+    token = _archiving.set(True)
+    try:
+        yield
+    finally:
+        _archiving.reset(token)
+
+
+@receiver(post_delete, sender=Order)
+@receiver(post_delete, sender=LPGProduct)
+def update_counters_on_delete(sender, instance, **kwargs):
+    fields, contribution = TRACKED[sender]
+    old_state = getattr(instance, STATE_ATTR, None)
+    if old_state is None:
+        old_state = _loaded_state(instance, fields)
+    totals, daily = _delta(contribution, old_state, None)
+    if sender is Order and _archiving.get():
+        totals.pop('total_orders', None)
+    _apply(totals, daily)
+
+
+@transaction.atomic
+def rebuild():
+    """Recompute every counter from the order and product tables; returns the counters row"""
+    order_totals = Order.objects.aggregate(
+        total_orders=Count('id'),
+        pending_orders=Count('id', filter=Q(status='pending')),
+        out_for_delivery=Count('id', filter=Q(status='out_for_delivery')),
+    )
+    # Archived orders still count towards the lifetime total
+    order_totals['total_orders'] += ArchivedRecord.objects.filter(kind='order').count()
+    inventory_totals = LPGProduct.objects.filter(is_active=True).aggregate(
+        total_products=Count('id'),
+        low_stock_products=Count('id', filter=Q(current_stock__lte=F('minimum_stock'))),
+        out_of_stock=Count('id', filter=Q(current_stock=0)),
+        total_stock_value=Sum(F('current_stock') * F('price')),
+    )
+    inventory_totals['total_stock_value'] = Decimal(inventory_totals['total_stock_value'] or 0).quantize(Decimal('0.01'))
+    counters, _ = DashboardCounters.objects.update_or_create(
+        pk=DashboardCounters.SINGLETON_ID,
+        defaults={**order_totals, **inventory_totals, 'rebuilt_at': timezone.now()}
+    )
+
+    days = defaultdict(dict)
+    placed = Order.objects.annotate(day=TruncDate('order_date')).values('day').annotate(
+        orders_placed=Count('id'),
+        delivered_revenue=Sum('total_amount', filter=Q(status='delivered')),
+    )
+    for row in placed:
+        days[row['day']]['orders_placed'] = row['orders_placed']
+        days[row['day']]['delivered_revenue'] = row['delivered_revenue'] or Decimal('0.00')
+    delivered = Order.objects.filter(status='delivered', delivery_date__isnull=False).annotate(
+        day=TruncDate('delivery_date')
+    ).values('day').annotate(delivered_orders=Count('id'))
+    for row in delivered:
+        days[row['day']]['delivered_orders'] = row['delivered_orders']
+
+    DailyOrderCounters.objects.all().delete()
+    DailyOrderCounters.objects.bulk_create(
+        DailyOrderCounters(date=day, **amounts) for day, amounts in days.items()
+    )
+    return counters
+
+
+def get_dashboard_stats():
+    """
+    Dashboard statistics from the counters row and the last week's daily rows
+    Two small indexed reads regardless of how many orders exist; the day rolls over
+    simply by reading a different date's row.
+    """
+    counters = DashboardCounters.objects.filter(pk=DashboardCounters.SINGLETON_ID).first() or rebuild()
+    today = timezone.localdate()
+
+    weekly_orders = delivered_today = 0
+    weekly_revenue = Decimal('0.00')
+    week = DailyOrderCounters.objects.filter(date__gte=today - timedelta(days=WEEK_DAYS)).values_list(
+        'date', 'orders_placed', 'delivered_orders', 'delivered_revenue'
+    )
+    for day, orders_placed, delivered_orders, delivered_revenue in week:
+        weekly_orders += orders_placed
+        weekly_revenue += delivered_revenue
+        if day == today:
+            delivered_today = delivered_orders
+
+    return {
+        'total_orders': counters.total_orders,
+        'pending_orders': counters.pending_orders,
+        'out_for_delivery': counters.out_for_delivery,
+        'delivered_today': delivered_today,
+        'weekly_orders': weekly_orders,
+        'weekly_revenue': weekly_revenue,
+        'total_products': counters.total_products,
+        'low_stock_products': counters.low_stock_products,
+        'out_of_stock': counters.out_of_stock,
+        'total_stock_value': counters.total_stock_value,
+    }
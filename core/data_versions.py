@@ -0,0 +1,80 @@
+"""
+Shared data version counters
+A version is an opaque integer kept in the default cache. Anything derived from a piece
+of data (cached snapshots, rendered fragments, ETags) is keyed by that data's version, so
+bumping the version after a write invalidates every derived copy at once.
+"""
+import time
+
+from django.core.cache import cache
+from django.db import transaction
+
+
+KEY_PREFIX = 'data_version'
+
+
+def version_key(*scope):
+    return ':'.join([KEY_PREFIX, *(str(part) for part in scope)])
+
+
+def _seed():
+    # Seeded from the clock so a version lost to cache eviction is never handed out again
+    return time.time_ns() // 1000
+
+
+def get_version(*scope):
+    """Current version for scope, e.g. get_version('catalogue') or get_version('orders', user_id)"""
+    key = version_key(*scope)
+    version = cache.get(key)
+    if version is None:
+        cache.add(key, _seed(), timeout=None)
+        version = cache.get(key)
+    return version
+
+
+async def aget_version(*scope):
+    """get_version for async views"""
+    key = version_key(*scope)
+    version = await cache.aget(key)
+    if version is None:
+        await cache.aadd(key, _seed(), timeout=None)
+        version = await cache.aget(key)
+    return version
+
+
+def get_versions(*scopes):
+    """Current versions for several scopes (each a tuple) in one cache round trip"""
+    keys = [version_key(*scope) for scope in scopes]
+    found = cache.get_many(keys)
+    return [found[key] if key in found else get_version(*scope) for key, scope in zip(keys, scopes)]
+
+
+async def aget_versions(*scopes):
+    """get_versions for async views"""
+    keys = [version_key(*scope) for scope in scopes]
+    found = await cache.aget_many(keys)
+    return [found[key] if key in found else await aget_version(*scope) for key, scope in zip(keys, scopes)]
+
+
+def bump_version(*scope):
+    """Move scope to a new version and return it"""
+    key = version_key(*scope)
+    try:
+        return cache.incr(key)
+    except ValueError:
+        cache.add(key, _seed(), timeout=None)
+        return cache.get(key)
+
+
+def bump_on_commit(*scope):
+    """Bump once the current transaction commits, so readers never pair a new version with old rows"""
+    transaction.on_commit(lambda: bump_version(*scope))
+
+
+def bump_now_and_on_commit(*scope):
+    """
+    Bump immediately, so the writing request sees its own change, and again on commit, so a
+    copy another worker derived from the pre-commit rows in between is discarded too
+    """
+    bump_version(*scope)
+    bump_on_commit(*scope)
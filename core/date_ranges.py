@@ -0,0 +1,64 @@
+"""
+Date range filters that the indexes on datetime columns can serve
+Filtering with field__date__gte / field__date=... wraps the column in a date cast, so SQLite
+has to evaluate it for every row instead of searching an index. The helpers here turn the
+calendar dates users pick into timezone-aware half-open [start, end) datetime bounds, from
+midnight of the first day to midnight after the last one, and filter with plain
+field__gte / field__lt lookups.
+"""
+from datetime import datetime, time, timedelta
+
+from django.utils import timezone
+
+DATE_FORMAT = '%Y-%m-%d'
+
+
+def parse_date(value):
+    """date for a YYYY-MM-DD string; None when it is empty or not a valid date"""
+    if not value:
+        return None
+    try:
+        return datetime.strptime(str(value).strip(), DATE_FORMAT).date()
+    except ValueError:
+        return None
+
+
+def day_start(day):
+    """Aware datetime of midnight at the start of day, in the current time zone"""
+    return timezone.make_aware(datetime.combine(day, time.min))
+
+
+def day_bounds(date_from=None, date_to=None):
+    """(start, end) datetimes covering the days date_from..date_to inclusive; a missing date leaves its bound open"""
+    start = day_start(date_from) if date_from else None
+    end = day_start(date_to + timedelta(days=1)) if date_to else None
+    return start, end
+
+
+def filter_dates(queryset, field, date_from=None, date_to=None):
+    """Rows whose datetime field falls on the days date_from..date_to (inclusive, either may be None)"""
+    start, end = day_bounds(date_from, date_to)
+    if start is not None:
+        queryset = queryset.filter(**{f'{field}__gte': start})
+    if end is not None:
+        queryset = queryset.filter(**{f'{field}__lt': end})
+    return queryset
+
+
+def filter_day(queryset, field, day):
+    """Rows whose datetime field falls on day"""
+    return filter_dates(queryset, field, day, day)
+
+
+def report_period(params, days=30, from_key='date_from', to_key='date_to'):
+    """
+    (date_from, date_to) chosen in params, defaulting to the last days days up to today
+    A missing date falls back to its default on its own; an invalid one resets both.
+    """
+    date_to_default = timezone.localdate()
+    date_from_default = date_to_default - timedelta(days=days)
+    raw_from, raw_to = params.get(from_key, ''), params.get(to_key, '')
+    date_from, date_to = parse_date(raw_from), parse_date(raw_to)
+    if (raw_from and date_from is None) or (raw_to and date_to is None):
+        return date_from_default, date_to_default
+    return date_from or date_from_default, date_to or date_to_default
@@ -0,0 +1,102 @@
+"""
+SQLite tuning applied to every new database connection
+DEFAULT_PROFILE (with any overrides from settings.SQLITE_PROFILE) sets the journal mode, sync
+level, page cache, memory map, temp storage and busy timeout with PRAGMAs as each connection
+opens. In WAL mode readers no longer
+block the writer (or each other), and synchronous=NORMAL only syncs at checkpoints. Each
+process also runs PRAGMA optimize and a passive WAL checkpoint at most once per
+maintenance_interval, from whichever connection opens after the interval has passed.
+
+The journal mode is stored in the database file itself, so only the servers set it
+(wsgi.py and asgi.py call serve()); management commands such as check or makemigrations
+leave the file as they found it unless journal_mode_everywhere is set.
+"""
+import logging
+import threading
+import time
+
+from django.conf import settings
+from django.db.backends.signals import connection_created
+from django.dispatch import receiver
+
+logger = logging.getLogger(__name__)
+
+
+DEFAULT_PROFILE = {
+    'journal_mode': 'WAL',
+    'synchronous': 'NORMAL',
+    # Milliseconds a connection waits for another writer before "database is locked"
+    'busy_timeout': 20000,
+    # Page cache per connection; negative values are KiB
+    'cache_size': -20000,
+    'mmap_size': 256 * 1024 * 1024,
+    'temp_store': 'MEMORY',
+    # Seconds between PRAGMA optimize / wal_checkpoint runs in a process (0 disables them)
+    'maintenance_interval': 60 * 60,
+    # Set journal_mode from every process, not only from the servers that called serve()
+    'journal_mode_everywhere': False,
+}
+
+PRAGMAS = ('journal_mode', 'synchronous', 'busy_timeout', 'cache_size', 'mmap_size', 'temp_store')
+
+_lock = threading.Lock()
+_last_maintenance = time.monotonic()
+_serving = False
+
+
+def get_profile():
+    return {**DEFAULT_PROFILE, **getattr(settings, 'SQLITE_PROFILE', {})}
+
+
+def serve():
+    """Let this process's connections switch the database file to the profile's journal mode"""
+    global _serving
+    _serving = True
+
+
+def pragma_statements(profile):
+    """PRAGMA statements for profile, skipping settings set to None"""
+    return [f'PRAGMA {name}={profile[name]}' for name in PRAGMAS if profile.get(name) is not None]
+
+
+def apply_profile(raw_connection, profile):
+    """Apply profile to a DB-API sqlite3 connection"""
+    for statement in pragma_statements(profile):
+        raw_connection.execute(statement).fetchall()
+
+
+def maintain(raw_connection):
+    """Refresh query planner statistics and fold the WAL back into the database file"""
+    raw_connection.execute('PRAGMA optimize').fetchall()
+    busy, log_frames, checkpointed = raw_connection.execute('PRAGMA wal_checkpoint(PASSIVE)').fetchone()
+    logger.info("SQLite maintenance: checkpointed %s of %s WAL frames", checkpointed, log_frames)
+
+
+def _maintenance_due(interval):
+    global _last_maintenance
+    if not interval:
+        return False
+    with _lock:
+        if time.monotonic() - _last_maintenance < interval:
+            return False
+        _last_maintenance = time.monotonic()
+        return True
+
+
+@receiver(connection_created)
+def tune_connection(sender, connection, **kwargs):
+    if connection.vendor != 'sqlite':
+        return
+    profile = get_profile()
+    if not (_serving or profile['journal_mode_everywhere']):
+        profile = {**profile, 'journal_mode': None}
+    if 'mode=ro' in str(connection.settings_dict['NAME']):
+        # Read-only connections (the reporting snapshot) cannot switch journal mode or checkpoint
+        apply_profile(connection.connection, {**profile, 'journal_mode': None})
+        return
+    apply_profile(connection.connection, profile)
+    if _maintenance_due(profile['maintenance_interval']):
+        try:
+            maintain(connection.connection)
+        except Exception:
+            logger.exception("SQLite maintenance failed")
@@ -0,0 +1,187 @@
+"""
+Write transactions that take SQLite's write lock up front and retry when it is busy
+atomic() works like transaction.atomic(), but the outermost block starts with
+BEGIN IMMEDIATE. In WAL mode that BEGIN is the only statement of a write transaction that
+can fail with "database is locked": once it succeeds the block holds the write lock and runs
+to commit. Each BEGIN waits a short busy timeout inside SQLite, and a busy one is retried
+with bounded, jittered exponential backoff, so the block itself never has to be re-run. With settings.SQLITE_WRITES['serialize'] the threads of a
+process also queue on an in-process lock before asking SQLite, instead of all polling the
+database file. Lock waits, retries and failures are counted per process and flushed to the
+shared cache (optimize_performance --write-stats).
+"""
+import logging
+import random
+import threading
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import DEFAULT_DB_ALIAS, OperationalError
+from django.db.transaction import Atomic, get_connection
+
+from . import db_tuning
+
+logger = logging.getLogger(__name__)
+
+
+DEFAULTS = {
+    # Milliseconds each BEGIN IMMEDIATE waits inside SQLite before it counts as locked
+    'busy_timeout': 2000,
+    # Extra attempts at BEGIN IMMEDIATE after the first one reports the database locked
+    'retries': 4,
+    # Seconds before the first retry, doubled for each further one up to max_backoff
+    'backoff': 0.05,
+    'max_backoff': 1.0,
+    # Queue this process's writers on one in-process lock before they reach SQLite
+    'serialize': False,
+}
+
+STATS_PREFIX = 'write_stats'
+STATS_FIELDS = ('transactions', 'retries', 'failures', 'wait_ms', 'slow')
+# Lock waits longer than this (seconds) are counted as slow
+SLOW_WAIT = 0.1
+# Transactions a process batches before adding them to the shared totals
+FLUSH_EVERY = 50
+
+_writer_lock = threading.Lock()
+_stats_lock = threading.Lock()
+_pending = dict.fromkeys(STATS_FIELDS, 0)
+
+
+class WriteContention(OperationalError):
+    """The write lock could not be taken within the configured retries"""
+
+
+def get_options():
+    return {**DEFAULTS, **getattr(settings, 'SQLITE_WRITES', {})}
+
+
+def _is_locked(exc):
+    return 'locked' in str(exc) or 'busy' in str(exc)
+
+
+def _set_busy_timeout(connection, milliseconds):
+    connection.connection.execute(f'PRAGMA busy_timeout={int(milliseconds)}')
+
+
+def backoff_delay(attempt, options):
+    """Seconds to sleep before retry number attempt (1-based): exponential, jittered downward by up to half"""
+    ceiling = min(options['max_backoff'], options['backoff'] * 2 ** (attempt - 1))
+    return random.uniform(ceiling / 2, ceiling)
+
+
+class ImmediateAtomic(Atomic):
+    """Atomic whose outermost block begins with BEGIN IMMEDIATE, retried while the database is locked"""
+
+    def __enter__(self):
+        connection = get_connection(self.using)
+        if connection.vendor != 'sqlite' or connection.in_atomic_block:
+            return super().__enter__()
+
+        options = get_options()
+        started = time.monotonic()
+        queued = options['serialize'] and _writer_lock.acquire()
+        attempt = 0
+        try:
+            # transaction_mode only exists once the wrapper has connected
+            connection.ensure_connection()
+            previous_mode = connection.transaction_mode
+            _set_busy_timeout(connection, options['busy_timeout'])
+            while True:
+                connection.transaction_mode = 'IMMEDIATE'
+                try:
+                    super().__enter__()
+                    break
+                except OperationalError as exc:
+                    if not _is_locked(exc):
+                        raise
+                    attempt += 1
+                    if attempt > options['retries']:
+                        record(time.monotonic() - started, attempt - 1, failed=True)
+                        logger.warning("Write lock not acquired after %d attempts", attempt)
+                        raise WriteContention(str(exc)) from exc
+                    time.sleep(backoff_delay(attempt, options))
+                finally:
+                    connection.transaction_mode = previous_mode
+        except BaseException:
+            if queued:
+                _writer_lock.release()
+            raise
+        finally:
+            if connection.connection is not None:
+                _set_busy_timeout(connection, db_tuning.get_profile()['busy_timeout'])
+        # Kept on the (per-thread) connection: a decorator's Atomic instance is shared by threads
+        connection.holds_writer_lock = queued
+        record(time.monotonic() - started, attempt)
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        connection = get_connection(self.using)
+        try:
+            return super().__exit__(exc_type, exc_value, traceback)
+        finally:
+            if getattr(connection, 'holds_writer_lock', False) and not connection.in_atomic_block:
+                connection.holds_writer_lock = False
+                _writer_lock.release()
+
+
+def atomic(using=None, savepoint=True, durable=False):
+    """transaction.atomic() for blocks that write; usable as a decorator or context manager"""
+    if callable(using):
+        return ImmediateAtomic(DEFAULT_DB_ALIAS, savepoint, durable)(using)
+    return ImmediateAtomic(using or DEFAULT_DB_ALIAS, savepoint, durable)
+
+
+def record(wait, retries, failed=False):
+    """Count one write lock acquisition (or failure) that waited wait seconds"""
+    with _stats_lock:
+        _pending['transactions'] += 0 if failed else 1
+        _pending['failures'] += 1 if failed else 0
+        _pending['retries'] += retries
+        _pending['wait_ms'] += int(wait * 1000)
+        _pending['slow'] += 1 if wait > SLOW_WAIT else 0
+        if failed or _pending['transactions'] >= FLUSH_EVERY:
+            batch = _take()
+        else:
+            return
+    _flush(batch)
+
+
+def _take():
+    batch = dict(_pending)
+    for field in STATS_FIELDS:
+        _pending[field] = 0
+    return batch
+
+
+def _flush(batch):
+    for field, amount in batch.items():
+        if not amount:
+            continue
+        key = f'{STATS_PREFIX}:{field}'
+        try:
+            cache.incr(key, amount)
+        except ValueError:
+            if not cache.add(key, amount, None):
+                cache.incr(key, amount)
+
+
+def flush():
+    """Push this process's pending counts to the shared totals"""
+    with _stats_lock:
+        batch = _take()
+    _flush(batch)
+
+
+def stats():
+    """Totals across every process that has flushed, plus the average lock wait in ms"""
+    flush()
+    totals = cache.get_many([f'{STATS_PREFIX}:{field}' for field in STATS_FIELDS])
+    result = {field: totals.get(f'{STATS_PREFIX}:{field}', 0) for field in STATS_FIELDS}
+    attempts = result['transactions'] + result['failures']
+    result['average_wait_ms'] = result['wait_ms'] / attempts if attempts else 0.0
+    return result
+
+
+def reset_stats():
+    flush()
+    cache.delete_many([f'{STATS_PREFIX}:{field}' for field in STATS_FIELDS])
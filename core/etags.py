@@ -0,0 +1,68 @@
+"""
+ETags for the HTMX polling endpoints, built from data versions before the view runs
+Each function returns a validator from the data versions the response depends on (one
+get_many round trip), the user and the request's query string. Used with
+django.views.decorators.http.condition, an unchanged poll is answered with an empty 304
+without touching the database or rendering a template. Async views cannot use condition,
+which calls the ETag function synchronously on the event loop; they await the a* variants
+and answer the 304 themselves.
+"""
+import hashlib
+import time
+
+from django.utils import timezone
+
+from .caching import ORDERS_SCOPE, REPORTS_SCOPE
+from .catalogue import CATALOGUE_SCOPE
+from .data_versions import aget_versions, get_versions
+from .notifications import NOTIFICATIONS_SCOPE
+
+
+def _is_poll(request):
+    return bool(request.headers.get('HX-Request') or request.headers.get('X-Up-Target'))
+
+
+def _digest(request, user_id, versions, *extra):
+    parts = [user_id, request.GET.urlencode(), *versions, *extra]
+    return hashlib.md5(':'.join(str(part) for part in parts).encode()).hexdigest()
+
+
+def _etag(request, scopes, *extra):
+    return _digest(request, request.user.pk, get_versions(*scopes), *extra)
+
+
+def customer_orders(request, *args, **kwargs):
+    """The customer's own orders, with product names from the catalogue"""
+    if not _is_poll(request):
+        return None
+    return _etag(request, [(ORDERS_SCOPE, request.user.pk), (CATALOGUE_SCOPE,)])
+
+
+def dealer_orders(request, *args, **kwargs):
+    """Any order or stock write moves the reports version"""
+    if not _is_poll(request):
+        return None
+    return _etag(request, [(REPORTS_SCOPE,)])
+
+
+def dashboard_stats(request, *args, **kwargs):
+    """Dashboard counters, whose daily window also moves at midnight"""
+    if not _is_poll(request):
+        return None
+    return _etag(request, [(REPORTS_SCOPE,)], timezone.localdate())
+
+
+def recent_activity(request, *args, **kwargs):
+    """Recent activity shows relative times, so it also changes once a minute"""
+    if not _is_poll(request):
+        return None
+    return _etag(request, [(REPORTS_SCOPE,)], int(time.time() // 60))
+
+
+def unread_notifications(request, *args, **kwargs):
+    return _etag(request, [(NOTIFICATIONS_SCOPE, request.user.pk)])
+
+
+async def aunread_notifications(request, user):
+    """unread_notifications for the async count endpoint, given the awaited request user"""
+    return _digest(request, user.pk, await aget_versions((NOTIFICATIONS_SCOPE, user.pk)))
@@ -0,0 +1,212 @@
+"""
+Live change feed for browsers (Server-Sent Events)
+Writes that a page shows live (order status, stock, notifications) add ChangeEvent rows in
+the writing transaction, addressed to a user's topic and/or the staff topic. Each ASGI
+worker runs one broker task while it has connected browsers: it tails the ChangeEvent table
+by id and hands new events to the subscribers of their topics in-process, so events written
+by any worker reach every worker's streams and an idle tab costs no requests at all.
+
+Running brokers keep a heartbeat key in the shared cache; while none is alive (WSGI-only
+deployments, or nobody connected) nothing is written. Events older than RETENTION are pruned
+by the brokers and by the 'change_events' retention job.
+"""
+import asyncio
+import json
+import logging
+from datetime import timedelta
+
+from django.core.cache import cache
+from django.db.models.signals import post_save
+from django.dispatch import receiver
+from django.utils import timezone
+
+from .models import ChangeEvent, LPGProduct, Notification, Order
+
+logger = logging.getLogger(__name__)
+
+
+STAFF_TOPIC = 'staff'
+
+# Event names the templates listen for with hx-trigger="sse:<name>"
+ORDERS = 'orders'
+STOCK = 'stock'
+NOTIFICATIONS = 'notifications'
+
+# Seconds between outbox reads while anyone is connected
+POLL_INTERVAL = 1.0
+# Seconds of silence after which a comment is sent to keep proxies from closing the stream
+HEARTBEAT = 25
+# Milliseconds the browser waits before reconnecting a dropped stream
+RETRY_MS = 5000
+# Events a slow subscriber may have queued before further ones are dropped
+QUEUE_SIZE = 100
+BATCH_SIZE = 500
+
+RETENTION = timedelta(hours=1)
+PRUNE_EVERY = 10 * 60
+
+# Shared-cache key a running broker refreshes every BROKER_TTL / 3 seconds
+BROKER_KEY = 'events:broker'
+BROKER_TTL = 60
+
+
+def user_topic(user_id):
+    return f'user:{user_id}'
+
+
+def topics_for(user):
+    """Topics a signed-in user's stream subscribes to"""
+    topics = {user_topic(user.pk)}
+    if user.is_staff:
+        topics.add(STAFF_TOPIC)
+    return topics
+
+
+def broker_running():
+    """Whether any worker's broker is tailing the change feed"""
+    return cache.get(BROKER_KEY) is not None
+
+
+def old_events():
+    return ChangeEvent.objects.filter(created_at__lt=timezone.now() - RETENTION)
+
+
+def publish(kind, topics, **payload):
+    """
+    Add an event for each topic in the current transaction, unless no broker would read it
+    Subscribers see it only once the surrounding change has committed.
+    """
+    if not broker_running():
+        return
+    ChangeEvent.objects.bulk_create([ChangeEvent(topic=topic, kind=kind, payload=payload) for topic in topics])
+
+
+class Broker:
+    """Per-process fan-out of outbox events to the streams connected to this worker"""
+
+    def __init__(self):
+        self._subscribers = {}
+        self._task = None
+        self._last_id = None
+        self._last_prune = 0.0
+        self._last_heartbeat = None
+
+    async def subscribe(self, topics):
+        # Announce the broker before reading the latest id, so no event it should see is skipped
+        await self._heartbeat()
+        if self._last_id is None:
+            latest = await ChangeEvent.objects.order_by('-id').values_list('id', flat=True).afirst()
+            self._last_id = latest or 0
+        queue = asyncio.Queue(maxsize=QUEUE_SIZE)
+        self._subscribers[queue] = frozenset(topics)
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._run())
+        return queue
+
+    def unsubscribe(self, queue):
+        self._subscribers.pop(queue, None)
+
+    async def _run(self):
+        while self._subscribers:
+            try:
+                await self._heartbeat()
+                await self.pump()
+                await self._prune()
+            except Exception:
+                logger.exception("Change event broker failed to read the outbox")
+            await asyncio.sleep(POLL_INTERVAL)
+        # Nobody is listening: the next subscriber starts from the then-latest event and
+        # announces the broker again
+        self._last_id = None
+        self._last_heartbeat = None
+
+    async def pump(self):
+        """Deliver events written since the last read; returns how many were read"""
+        # SQLite commits one writer at a time, so ids become visible in increasing order
+        events = [
+            event async for event in
+            ChangeEvent.objects.filter(id__gt=self._last_id).order_by('id')[:BATCH_SIZE]
+        ]
+        for event in events:
+            for queue, topics in list(self._subscribers.items()):
+                if event.topic in topics:
+                    try:
+                        queue.put_nowait((event.kind, event.payload))
+                    except asyncio.QueueFull:
+                        pass
+        if events:
+            self._last_id = events[-1].id
+        return len(events)
+
+    async def _heartbeat(self):
+        now = asyncio.get_running_loop().time()
+        if self._last_heartbeat is not None and now - self._last_heartbeat < BROKER_TTL / 3:
+            return
+        self._last_heartbeat = now
+        await cache.aset(BROKER_KEY, True, BROKER_TTL)
+
+    async def _prune(self):
+        now = asyncio.get_running_loop().time()
+        if now - self._last_prune < PRUNE_EVERY:
+            return
+        self._last_prune = now
+        await old_events().adelete()
+
+
+broker = Broker()
+
+
+def format_event(kind, payload):
+    return f"event: {kind}\ndata: {json.dumps(payload)}\n\n"
+
+
+async def stream(topics):
+    """SSE body for one browser: events for topics, a burst collapsed to one event per name"""
+    queue = await broker.subscribe(topics)
+    try:
+        yield f"retry: {RETRY_MS}\n\n"
+        while True:
+            try:
+                kind, payload = await asyncio.wait_for(queue.get(), HEARTBEAT)
+            except asyncio.TimeoutError:
+                yield ": keep-alive\n\n"
+                continue
+            # A batch order saves several rows; the page only needs to refresh once
+            pending = {kind: payload}
+            while not queue.empty():
+                kind, payload = queue.get_nowait()
+                pending[kind] = payload
+            for kind, payload in pending.items():
+                yield format_event(kind, payload)
+    finally:
+        broker.unsubscribe(queue)
+
+
+@receiver(post_save, sender=Order)
+def publish_order_change(sender, instance, **kwargs):
+    topics = [STAFF_TOPIC]
+    if instance.customer_id:
+        topics.append(user_topic(instance.customer_id))
+    publish(ORDERS, topics, order_id=instance.pk, status=instance.status)
+
+
+@receiver(post_save, sender=LPGProduct)
+def publish_stock_change(sender, instance, **kwargs):
+    publish(STOCK, [STAFF_TOPIC], product_id=instance.pk, current_stock=instance.current_stock)
+
+
+@receiver(post_save, sender=Notification)
+def publish_notification(sender, instance, created, **kwargs):
+    if created:
+        publish(NOTIFICATIONS, [user_topic(instance.customer_id)], notification_id=instance.pk)
+
+
+def publish_notifications(notifications):
+    """publish_notification for rows added with bulk_create, which sends no post_save"""
+    if not broker_running():
+        return
+    ChangeEvent.objects.bulk_create([
+        ChangeEvent(topic=user_topic(notification.customer_id), kind=NOTIFICATIONS,
+                    payload={'notification_id': notification.pk})
+        for notification in notifications
+    ])
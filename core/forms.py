@@ -10,6 +10,7 @@ from .models import (
     ProductCategory, Supplier, InventoryAdjustment, Staff, Payroll,
     Cashier, CashierTransaction, PendingRegistration
 )
+from . import catalogue
 
 
 class PendingRegistrationForm(forms.ModelForm):
@@ -452,9 +453,11 @@ class OrderForm(forms.ModelForm):
     Form for placing LPG orders with product selection and delivery options
     Requirements: 2.1, 2.2, 2.3, 2.4, 2.5 - Order placement with validation
     """
-    product = forms.ModelChoiceField(
-        queryset=LPGProduct.objects.filter(is_active=True, current_stock__gt=0),
-        empty_label="Select a product",
+    # Choices come from the catalogue snapshots and are only built when the field is rendered or cleaned
+    product = forms.TypedChoiceField(
+        choices=catalogue.product_choices,
+        coerce=int,
+        empty_value=None,
         required=False,  # Not required for submission, only for adding to cart
         widget=forms.Select(attrs={
             'class': 'mt-1 block w-full px-3 py-2 border border-gray-300 rounded-md shadow-sm placeholder-gray-400 focus:outline-none focus:ring-prycegas-orange focus:border-prycegas-orange',
@@ -588,10 +591,8 @@ class OrderForm(forms.ModelForm):
 
         if commit:
             order.save()
-            # Reduce product stock
-            product = order.product
-            product.current_stock -= order.quantity
-            product.save()
+            # Reduce product stock and record the sale
+            order.deduct_stock(created_by=self.user)
 
         return order
 
@@ -1142,7 +1143,7 @@ class CashierCreationForm(forms.ModelForm):
         widgets = {
             'employee_id': forms.TextInput(attrs={
                 'class': 'w-full px-4 py-3 border border-gray-300 rounded-xl focus:ring-2 focus:ring-prycegas-orange focus:border-transparent',
-                'placeholder': 'Enter unique employee ID'
+                'placeholder': 'Leave blank to assign automatically'
             }),
             'shift_start': forms.TimeInput(attrs={
                 'class': 'w-full px-4 py-3 border border-gray-300 rounded-xl focus:ring-2 focus:ring-prycegas-orange focus:border-transparent',
@@ -1168,7 +1169,7 @@ class CashierCreationForm(forms.ModelForm):
 
     def clean_employee_id(self):
         employee_id = self.cleaned_data.get('employee_id')
-        if Cashier.objects.filter(employee_id=employee_id).exists():
+        if employee_id and Cashier.objects.filter(employee_id=employee_id).exists():
             raise ValidationError('This employee ID is already registered.')
         return employee_id
 
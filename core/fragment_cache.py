@@ -0,0 +1,110 @@
+"""
+Versioned template fragment caching with hit/miss instrumentation
+Fragments are cached under their name plus the values they vary on, typically a row's
+updated_at or a data version, so a changed input selects a new key rather than needing
+invalidation. Lookups are counted per request (X-Fragment-Cache header in DEBUG) and per
+fragment name; per-name totals are batched in-process and flushed to the shared cache.
+"""
+import threading
+from collections import defaultdict
+
+from django.core.cache import cache
+from django.core.cache.utils import make_template_fragment_key
+
+
+KEY_PREFIX = 'fragment'
+STATS_PREFIX = 'fragment_stats'
+STATS_NAMES_KEY = f'{STATS_PREFIX}:names'
+
+DEFAULT_TIMEOUT = 60 * 10
+
+# Lookups a process batches before adding them to the shared totals
+FLUSH_EVERY = 50
+
+_lock = threading.Lock()
+_pending = defaultdict(lambda: [0, 0])
+_pending_total = 0
+
+
+def fragment_key(name, vary_on):
+    return make_template_fragment_key(f'{KEY_PREFIX}.{name}', vary_on)
+
+
+def get_or_render(name, vary_on, render, timeout=DEFAULT_TIMEOUT, request=None):
+    """Cached markup for the fragment, rendering and storing it on a miss"""
+    key = fragment_key(name, vary_on)
+    content = cache.get(key)
+    hit = content is not None
+    if not hit:
+        content = render()
+        cache.set(key, content, timeout)
+    record(name, hit, request)
+    return content
+
+
+def record(name, hit, request=None):
+    global _pending_total
+    if request is not None:
+        attr = '_fragment_hits' if hit else '_fragment_misses'
+        setattr(request, attr, getattr(request, attr, 0) + 1)
+    with _lock:
+        _pending[name][0 if hit else 1] += 1
+        _pending_total += 1
+        if _pending_total < FLUSH_EVERY:
+            return
+        batch = dict(_pending)
+        _pending.clear()
+        _pending_total = 0
+    _flush(batch)
+
+
+def _add(key, amount):
+    if not amount:
+        return
+    try:
+        cache.incr(key, amount)
+    except ValueError:
+        if not cache.add(key, amount, None):
+            cache.incr(key, amount)
+
+
+def _flush(batch):
+    names = cache.get(STATS_NAMES_KEY) or set()
+    if not names.issuperset(batch):
+        cache.set(STATS_NAMES_KEY, names | set(batch), None)
+    for name, (hits, misses) in batch.items():
+        _add(f'{STATS_PREFIX}:{name}:hits', hits)
+        _add(f'{STATS_PREFIX}:{name}:misses', misses)
+
+
+def flush():
+    """Push this process's pending counts to the shared totals"""
+    global _pending_total
+    with _lock:
+        batch = dict(_pending)
+        _pending.clear()
+        _pending_total = 0
+    if batch:
+        _flush(batch)
+
+
+def stats():
+    """{name: {'hits', 'misses', 'hit_rate'}} across every process that has flushed"""
+    flush()
+    names = sorted(cache.get(STATS_NAMES_KEY) or ())
+    keys = [f'{STATS_PREFIX}:{name}:{kind}' for name in names for kind in ('hits', 'misses')]
+    totals = cache.get_many(keys)
+    result = {}
+    for name in names:
+        hits = totals.get(f'{STATS_PREFIX}:{name}:hits', 0)
+        misses = totals.get(f'{STATS_PREFIX}:{name}:misses', 0)
+        lookups = hits + misses
+        result[name] = {'hits': hits, 'misses': misses, 'hit_rate': hits / lookups if lookups else 0.0}
+    return result
+
+
+def reset_stats():
+    flush()
+    names = cache.get(STATS_NAMES_KEY) or ()
+    cache.delete_many([f'{STATS_PREFIX}:{name}:{kind}' for name in names for kind in ('hits', 'misses')])
+    cache.delete(STATS_NAMES_KEY)
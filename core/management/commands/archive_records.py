@@ -0,0 +1,36 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+from core import archive
+from datetime import timedelta
+
+
+class Command(BaseCommand):
+    help = (
+        'Move orders, stock movements, notifications and cashier transactions older than the ARCHIVE horizon '
+        'into the archive table. '
+        'Runs in batches of one write transaction each; an interrupted run is finished by the next one.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--days', type=int, default=None,
+                            help='Archive rows older than this many days (default: ARCHIVE horizon_days)')
+        parser.add_argument('--batch-size', type=int, default=None, help='Rows per batch (default: ARCHIVE batch_size)')
+        parser.add_argument('--max-batches', type=int, default=None,
+                            help='Stop after this many batches per kind and leave the rest for the next run')
+        parser.add_argument('--dry-run', action='store_true', help='Only count the rows that would be archived')
+
+    def handle(self, *args, **options):
+        if options['days'] is not None and options['days'] < 1:
+            raise CommandError('--days must be at least 1')
+        cutoff = timezone.now() - timedelta(days=options['days']) if options['days'] else archive.get_cutoff()
+        self.stdout.write(f'Archiving rows older than {cutoff:%Y-%m-%d %H:%M}')
+
+        if options['dry_run']:
+            for kind, count in archive.pending(cutoff).items():
+                self.stdout.write(f'  {kind}: {count} to archive')
+            return
+
+        moved = archive.run(cutoff, batch_size=options['batch_size'], max_batches=options['max_batches'])
+        for kind, count in moved.items():
+            self.stdout.write(f'  {kind}: {count} archived')
+        self.stdout.write(self.style.SUCCESS(f'Archived {sum(moved.values())} row(s)'))
@@ -0,0 +1,108 @@
+from django.core.management.base import BaseCommand
+from django.core.cache.backends.filebased import FileBasedCache
+from django.core.cache.backends.locmem import LocMemCache
+from core.cache_backends import SQLiteCache
+import multiprocessing
+import os
+import random
+import shutil
+import tempfile
+import time
+
+
+def _make_backend(name, workdir):
+    params = {'TIMEOUT': 300, 'OPTIONS': {'MAX_ENTRIES': 100000}}
+    if name == 'locmem':
+        return LocMemCache('benchmark', params)
+    if name == 'filebased':
+        return FileBasedCache(os.path.join(workdir, 'filebased'), params)
+    return SQLiteCache(os.path.join(workdir, 'sqlite', 'cache.sqlite3'), params)
+
+
+def _worker(name, workdir, keys, requests, seed, results):
+    """Simulated web worker: get-or-compute over a shared key space, reporting its hits"""
+    cache = _make_backend(name, workdir)
+    rng = random.Random(seed)
+    hits = 0
+    for _ in range(requests):
+        key = f'stats:{rng.randrange(keys)}'
+        if cache.get(key) is None:
+            cache.set(key, {'total_orders': 1, 'pending_orders': 2, 'revenue': 1234.5})
+        else:
+            hits += 1
+    results.put(hits)
+
+
+class Command(BaseCommand):
+    help = 'Benchmark the shared SQLite cache backend against LocMemCache and FileBasedCache'
+
+    backends = ['locmem', 'filebased', 'sqlite']
+
+    def add_arguments(self, parser):
+        parser.add_argument('--operations', type=int, default=2000, help='Operations per throughput phase')
+        parser.add_argument('--workers', type=int, default=4, help='Worker processes for the hit-rate phase')
+        parser.add_argument('--keys', type=int, default=200, help='Distinct keys in the hit-rate phase')
+        parser.add_argument('--requests', type=int, default=1000, help='Requests per worker in the hit-rate phase')
+
+    def handle(self, *args, **options):
+        workdir = tempfile.mkdtemp(prefix='cache-benchmark-')
+        try:
+            self.stdout.write('Single-process throughput (ops/sec):')
+            self.stdout.write(f'  {"backend":<10} {"set":>10} {"get hit":>10} {"get miss":>10}')
+            for name in self.backends:
+                set_rate, hit_rate, miss_rate = self.throughput(name, workdir, options['operations'])
+                self.stdout.write(f'  {name:<10} {set_rate:>10.0f} {hit_rate:>10.0f} {miss_rate:>10.0f}')
+
+            workers = options['workers']
+            self.stdout.write(
+                f'\nHit rate with {workers} worker processes sharing {options["keys"]} keys:'
+            )
+            for name in self.backends:
+                hit_ratio, elapsed = self.hit_rate(name, workdir, workers, options['keys'], options['requests'])
+                self.stdout.write(f'  {name:<10} {hit_ratio:>7.1%} hits in {elapsed:.2f}s')
+        finally:
+            shutil.rmtree(workdir, ignore_errors=True)
+
+        self.stdout.write(self.style.SUCCESS('\nCache benchmark complete'))
+
+    def throughput(self, name, workdir, operations):
+        cache = _make_backend(name, workdir)
+        cache.clear()
+        value = {'total_orders': 1, 'pending_orders': 2, 'revenue': 1234.5}
+
+        start = time.perf_counter()
+        for i in range(operations):
+            cache.set(f'bench:{i}', value)
+        set_rate = operations / (time.perf_counter() - start)
+
+        start = time.perf_counter()
+        for i in range(operations):
+            cache.get(f'bench:{i}')
+        hit_rate = operations / (time.perf_counter() - start)
+
+        start = time.perf_counter()
+        for i in range(operations):
+            cache.get(f'missing:{i}')
+        miss_rate = operations / (time.perf_counter() - start)
+
+        cache.clear()
+        return set_rate, hit_rate, miss_rate
+
+    def hit_rate(self, name, workdir, workers, keys, requests):
+        _make_backend(name, workdir).clear()
+        context = multiprocessing.get_context('fork')
+        results = context.Queue()
+        processes = [
+            context.Process(target=_worker, args=(name, workdir, keys, requests, seed, results))
+            for seed in range(workers)
+        ]
+
+        start = time.perf_counter()
+        for process in processes:
+            process.start()
+        hits = sum(results.get() for _ in processes)
+        for process in processes:
+            process.join()
+        elapsed = time.perf_counter() - start
+
+        return hits / (workers * requests), elapsed
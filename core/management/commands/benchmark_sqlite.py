@@ -0,0 +1,141 @@
+from django.core.management.base import BaseCommand
+from core import db_tuning
+import multiprocessing
+import os
+import random
+import shutil
+import sqlite3
+import tempfile
+import time
+
+
+# What the database ran with before the tuning profile: rollback journal, full sync, 20s timeout
+BASELINE_PROFILE = {
+    'journal_mode': 'DELETE',
+    'synchronous': 'FULL',
+    'busy_timeout': 20000,
+    'cache_size': None,
+    'mmap_size': None,
+    'temp_store': None,
+}
+
+
+def _connect(path, profile):
+    conn = sqlite3.connect(path, timeout=profile['busy_timeout'] / 1000, isolation_level=None)
+    db_tuning.apply_profile(conn, profile)
+    return conn
+
+
+def _setup(path, profile, rows):
+    conn = _connect(path, profile)
+    conn.execute('CREATE TABLE product (id INTEGER PRIMARY KEY, stock INTEGER NOT NULL)')
+    conn.execute(
+        'CREATE TABLE orders (id INTEGER PRIMARY KEY, product_id INTEGER NOT NULL, quantity INTEGER NOT NULL,'
+        ' total REAL NOT NULL, status TEXT NOT NULL, created REAL NOT NULL)'
+    )
+    conn.execute('CREATE INDEX orders_status ON orders (status, created)')
+    conn.executemany('INSERT INTO product (id, stock) VALUES (?, ?)', [(i, 10000) for i in range(1, 11)])
+    rng = random.Random(0)
+    conn.execute('BEGIN')
+    conn.executemany(
+        'INSERT INTO orders (product_id, quantity, total, status, created) VALUES (?, ?, ?, ?, ?)',
+        [(rng.randint(1, 10), 1, 900.0, rng.choice(['pending', 'delivered']), time.time()) for _ in range(rows)]
+    )
+    conn.execute('COMMIT')
+    conn.close()
+
+
+def _writer(path, profile, operations, seed, results):
+    """Cashier placing orders: insert an order and take the stock in one transaction"""
+    conn = _connect(path, profile)
+    rng = random.Random(seed)
+    locked = 0
+    start = time.perf_counter()
+    for _ in range(operations):
+        product_id = rng.randint(1, 10)
+        try:
+            conn.execute('BEGIN IMMEDIATE')
+            conn.execute(
+                'INSERT INTO orders (product_id, quantity, total, status, created) VALUES (?, 1, 900.0, ?, ?)',
+                (product_id, 'pending', time.time())
+            )
+            conn.execute('UPDATE product SET stock = stock - 1 WHERE id = ?', (product_id,))
+            conn.execute('COMMIT')
+        except sqlite3.OperationalError:
+            locked += 1
+            if conn.in_transaction:
+                conn.execute('ROLLBACK')
+    results.put(('write', operations - locked, locked, time.perf_counter() - start))
+
+
+def _reader(path, profile, operations, results):
+    """Reports page: aggregate over the order table"""
+    conn = _connect(path, profile)
+    locked = 0
+    start = time.perf_counter()
+    for _ in range(operations):
+        try:
+            conn.execute(
+                'SELECT status, COUNT(*), SUM(total) FROM orders WHERE created > ? GROUP BY status',
+                (time.time() - 86400,)
+            ).fetchall()
+        except sqlite3.OperationalError:
+            locked += 1
+    results.put(('read', operations - locked, locked, time.perf_counter() - start))
+
+
+class Command(BaseCommand):
+    help = 'Benchmark concurrent reads and writes on SQLite with and without the SQLITE_PROFILE tuning'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--writers', type=int, default=2, help='Writer processes (cashiers)')
+        parser.add_argument('--readers', type=int, default=2, help='Reader processes (reports)')
+        parser.add_argument('--operations', type=int, default=500, help='Operations per process')
+        parser.add_argument('--rows', type=int, default=20000, help='Orders seeded before the run')
+
+    def handle(self, *args, **options):
+        profiles = [('baseline', BASELINE_PROFILE), ('tuned', db_tuning.get_profile())]
+        workdir = tempfile.mkdtemp(prefix='sqlite-benchmark-')
+        try:
+            self.stdout.write(
+                f"{options['writers']} writer(s) and {options['readers']} reader(s), "
+                f"{options['operations']} operations each, {options['rows']} seeded orders"
+            )
+            self.stdout.write(f'  {"profile":<10} {"writes/s":>10} {"reads/s":>10} {"locked":>8} {"elapsed":>9}')
+            for name, profile in profiles:
+                path = os.path.join(workdir, f'{name}.sqlite3')
+                _setup(path, profile, options['rows'])
+                writes, reads, locked, elapsed = self.run(path, profile, options)
+                self.stdout.write(f'  {name:<10} {writes:>10.0f} {reads:>10.0f} {locked:>8} {elapsed:>8.2f}s')
+        finally:
+            shutil.rmtree(workdir, ignore_errors=True)
+
+        self.stdout.write(self.style.SUCCESS('\nSQLite benchmark complete'))
+
+    def run(self, path, profile, options):
+        operations = options['operations']
+        context = multiprocessing.get_context('fork')
+        results = context.Queue()
+        processes = [
+            context.Process(target=_writer, args=(path, profile, operations, seed, results))
+            for seed in range(options['writers'])
+        ] + [
+            context.Process(target=_reader, args=(path, profile, operations, results))
+            for _ in range(options['readers'])
+        ]
+
+        start = time.perf_counter()
+        for process in processes:
+            process.start()
+        outcomes = [results.get() for _ in processes]
+        for process in processes:
+            process.join()
+        elapsed = time.perf_counter() - start
+
+        # Each side's rate is its completed operations over the time its slowest process took
+        rates = {}
+        for kind in ('write', 'read'):
+            done = [(completed, seconds) for k, completed, _, seconds in outcomes if k == kind]
+            rates[kind] = sum(completed for completed, _ in done) / max(seconds for _, seconds in done) if done else 0
+        locked = sum(count for _, _, count, _ in outcomes)
+        return rates['write'], rates['read'], locked, elapsed
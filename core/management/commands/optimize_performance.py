@@ -1,7 +1,8 @@
-from django.core.management.base import BaseCommand
+from django.core.management.base import BaseCommand, CommandError
 from django.db import connection
 from django.core.cache import cache
 from django.contrib.auth.models import User
+from core import db_writes, fragment_cache, query_plans
 from core.models import Order, LPGProduct, DeliveryLog, CustomerProfile
 import time
 
@@ -25,6 +26,45 @@ class Command(BaseCommand):
             action='store_true',
             help='Analyze database performance',
         )
+        parser.add_argument(
+            '--fragment-stats',
+            action='store_true',
+            help='Show template fragment cache hit rates',
+        )
+        parser.add_argument(
+            '--write-stats',
+            action='store_true',
+            help='Show SQLite write lock waits, retries and failures',
+        )
+        parser.add_argument(
+            '--advise-indexes',
+            action='store_true',
+            help='Explain the queries of the QUERY_PLAN_URLS pages, flag full scans and temp sorts, suggest indexes',
+        )
+        parser.add_argument(
+            '--save-plans',
+            action='store_true',
+            help='Store the captured query plans as the snapshot later runs are checked against',
+        )
+        parser.add_argument(
+            '--check-plans',
+            action='store_true',
+            help='Fail when a query in the plan snapshot now scans a table it used to search by index',
+        )
+        parser.add_argument(
+            '--url',
+            action='append',
+            dest='urls',
+            help='Page (URL name or path) to capture instead of QUERY_PLAN_URLS; repeatable',
+        )
+        parser.add_argument(
+            '--as-user',
+            help='Username the pages are requested as (default: the first active superuser)',
+        )
+        parser.add_argument(
+            '--plans-file',
+            help='Plan snapshot path (default: QUERY_PLAN_SNAPSHOT)',
+        )
 
     def handle(self, *args, **options):
         if options['clear_cache']:
@@ -35,6 +75,15 @@ class Command(BaseCommand):
         
         if options['analyze_db']:
             self.analyze_database()
+        
+        if options['fragment_stats']:
+            self.fragment_stats()
+
+        if options['write_stats']:
+            self.write_stats()
+
+        if options['advise_indexes'] or options['save_plans'] or options['check_plans']:
+            self.query_plans(options)
 
     def clear_cache(self):
         """Clear all cached data"""
@@ -42,6 +91,94 @@ class Command(BaseCommand):
         cache.clear()
         self.stdout.write(self.style.SUCCESS('Cache cleared successfully'))
 
+    def fragment_stats(self):
+        """Show hit rates of the cached template fragments"""
+        self.stdout.write('Fragment cache hit rates:')
+        stats = fragment_cache.stats()
+        if not stats:
+            self.stdout.write('  No fragment lookups recorded yet')
+            return
+        for name, counts in stats.items():
+            self.stdout.write(
+                f"  {name}: {counts['hit_rate']:.1%} "
+                f"({counts['hits']} hits, {counts['misses']} misses)"
+            )
+
+    def write_stats(self):
+        """Show how long write transactions waited for the SQLite write lock"""
+        stats = db_writes.stats()
+        self.stdout.write('Write lock statistics:')
+        self.stdout.write(
+            f"  {stats['transactions']} transactions, average wait {stats['average_wait_ms']:.1f}ms, "
+            f"{stats['slow']} waited over {db_writes.SLOW_WAIT * 1000:.0f}ms"
+        )
+        self.stdout.write(f"  {stats['retries']} retries, {stats['failures']} gave up")
+
+    def query_plans(self, options):
+        """Capture the hot pages' queries, explain them, and advise, snapshot or check their plans"""
+        user = self.plan_user(options['as_user'])
+        urls = [query_plans.resolve(entry) for entry in options['urls'] or query_plans.get_urls()]
+        path = options['plans_file'] or query_plans.snapshot_path()
+        self.stdout.write(f'Capturing queries of {len(urls)} page(s) as {user.username}...')
+        plans = query_plans.collect(urls, user)
+
+        if options['advise_indexes']:
+            self.advise_indexes(plans)
+
+        if options['check_plans']:
+            try:
+                previous = query_plans.load(path)
+            except FileNotFoundError:
+                raise CommandError(f'No plan snapshot at {path}; create one with --save-plans')
+            regressions, missing = query_plans.diff(previous, plans)
+            for key, entry, tables in regressions:
+                self.stdout.write(self.style.ERROR(f"  {entry['url']}: now scans {', '.join(tables)}"))
+                self.stdout.write(f"    {entry['sql'][:200]}")
+                self.stdout.write(f"    was: {' / '.join(previous[key]['plan'])}")
+                self.stdout.write(f"    now: {' / '.join(entry['plan'])}")
+            if missing:
+                self.stdout.write(f'  {len(missing)} snapshot statement(s) no longer run (changed queries are not compared)')
+            if regressions:
+                raise CommandError(f'{len(regressions)} query plan regression(s) against {path}')
+            self.stdout.write(self.style.SUCCESS(f'No query plan regressions against {path}'))
+
+        if options['save_plans']:
+            query_plans.save(plans, path)
+            self.stdout.write(self.style.SUCCESS(f'Saved {len(plans)} query plan(s) to {path}'))
+
+    def plan_user(self, username):
+        if username:
+            user = User.objects.filter(username=username).first()
+        else:
+            user = User.objects.filter(is_superuser=True, is_active=True).order_by('id').first()
+        if user is None:
+            raise CommandError('No user to request the pages as; pass --as-user')
+        return user
+
+    def advise_indexes(self, plans):
+        """Report full scans and temp B-tree sorts, with a suggested composite index per scan"""
+        flagged = [entry for entry in plans.values() if entry['scans'] or entry['temp_btrees']]
+        self.stdout.write(f'\nIndex advice ({len(plans)} distinct statements, {len(flagged)} flagged):')
+        with connection.cursor() as cursor:
+            for entry in flagged:
+                self.stdout.write(f"  {entry['url']} (x{entry['count']}): {entry['sql'][:200]}")
+                for table in entry['scans']:
+                    cursor.execute(f'SELECT COUNT(*) FROM "{table}"')
+                    rows = cursor.fetchone()[0]
+                    self.stdout.write(self.style.WARNING(f'    FULL SCAN {table} ({rows} rows)'))
+                    fields = entry['suggestions'].get(table)
+                    if not fields:
+                        continue
+                    existing = query_plans.existing_index(table, fields)
+                    if existing:
+                        self.stdout.write(f'    {existing} already covers {fields}; run ANALYZE so the planner uses it')
+                    else:
+                        self.stdout.write(f'    suggest: models.Index(fields={fields!r}) on {table}')
+                for sort in entry['temp_btrees']:
+                    self.stdout.write(self.style.WARNING(f'    TEMP B-TREE for {sort}'))
+        if not flagged:
+            self.stdout.write(self.style.SUCCESS('  Every captured query is index-driven'))
+
     def test_queries(self):
         """Test common queries for performance"""
         self.stdout.write('Testing query performance...')
@@ -0,0 +1,39 @@
+from django.core.management.base import BaseCommand
+from core import retention
+
+
+class Command(BaseCommand):
+    help = (
+        'Delete expired sessions, old archived notifications, old change events and reviewed registration ID '
+        'documents, and trim large log files, in small batches with pauses between them. Limits come from '
+        'settings.RETENTION.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--only', action='append', choices=list(retention.JOBS), dest='jobs',
+                            help='Run only this job (repeatable; default: all)')
+        parser.add_argument('--dry-run', action='store_true', help='Only count what would be removed')
+        parser.add_argument('--batch-size', type=int, default=None, help='Rows per write transaction')
+        parser.add_argument('--pause', type=float, default=None, help='Seconds to pause between transactions')
+
+    def handle(self, *args, **options):
+        overrides = {name: options[name] for name in ('batch_size', 'pause') if options[name] is not None}
+        results = retention.run(options['jobs'], dry_run=options['dry_run'], **overrides)
+
+        verb = 'would be removed' if options['dry_run'] else 'removed'
+        for job, result in results.items():
+            line = f'  {job}: {result["rows"]} {verb}'
+            if not options['dry_run'] or result['bytes']:
+                line += f', {self.format_bytes(result["bytes"])} reclaimed'
+            self.stdout.write(line)
+        total = sum(result['bytes'] for result in results.values())
+        self.stdout.write(self.style.SUCCESS(
+            f'{sum(result["rows"] for result in results.values())} item(s) {verb}, {self.format_bytes(total)} reclaimed'
+        ))
+
+    def format_bytes(self, size):
+        for unit in ('B', 'KB', 'MB'):
+            if size < 1024:
+                return f'{size:.0f} {unit}' if unit == 'B' else f'{size:.1f} {unit}'
+            size /= 1024
+        return f'{size:.1f} GB'
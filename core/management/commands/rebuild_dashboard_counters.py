@@ -0,0 +1,20 @@
+from django.core.management.base import BaseCommand
+from core import dashboard
+
+
+class Command(BaseCommand):
+    help = 'Recompute the dealer dashboard counters from the order and product tables'
+
+    def handle(self, *args, **options):
+        counters = dashboard.rebuild()
+        stats = dashboard.get_dashboard_stats()
+        self.stdout.write(
+            f"Orders: {counters.total_orders} total, {counters.pending_orders} pending, "
+            f"{counters.out_for_delivery} out for delivery; "
+            f"this week: {stats['weekly_orders']} orders, {stats['weekly_revenue']} revenue"
+        )
+        self.stdout.write(
+            f"Products: {counters.total_products} active, {counters.low_stock_products} low stock, "
+            f"{counters.out_of_stock} out of stock, stock value {counters.total_stock_value}"
+        )
+        self.stdout.write(self.style.SUCCESS('Dashboard counters rebuilt'))
@@ -0,0 +1,40 @@
+from django.core.management.base import BaseCommand
+from core import reporting
+import logging
+import time
+
+logger = logging.getLogger(__name__)
+
+
+class Command(BaseCommand):
+    help = (
+        'Copy the live database into the read-only reporting snapshot that report and PDF views read. '
+        'Run it from cron with --once, or leave it running to refresh every REPORTING_SNAPSHOT interval.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--once', action='store_true', help='Refresh the snapshot once and exit (for cron)')
+        parser.add_argument('--interval', type=float, default=None,
+                            help='Seconds between refreshes (default: REPORTING_SNAPSHOT interval)')
+
+    def handle(self, *args, **options):
+        if options['once']:
+            self.refresh()
+            return
+
+        interval = options['interval'] or reporting.get_options()['interval']
+        self.stdout.write(f'Refreshing the reporting snapshot every {interval:g}s (Ctrl+C to stop)')
+        try:
+            while True:
+                try:
+                    self.refresh()
+                except Exception:
+                    # A failed copy leaves the previous snapshot in place; reports fall back to live once it is too old
+                    logger.exception("Reporting snapshot refresh failed")
+                time.sleep(interval)
+        except KeyboardInterrupt:
+            self.stdout.write('Stopped')
+
+    def refresh(self):
+        seconds = reporting.refresh_snapshot()
+        self.stdout.write(self.style.SUCCESS(f'Reporting snapshot written to {reporting.snapshot_path()} in {seconds:.2f}s'))
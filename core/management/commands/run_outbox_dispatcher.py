@@ -0,0 +1,38 @@
+from django.core.management.base import BaseCommand
+from core import outbox
+import time
+
+
+class Command(BaseCommand):
+    help = (
+        'Carry out queued order side effects (notifications, cashier transactions) in batches. '
+        'Run exactly one dispatcher per database, e.g. as a supervised service.'
+    )
+
+    # Seconds between prunes of old processed events
+    PRUNE_EVERY = 60 * 60
+
+    def add_arguments(self, parser):
+        parser.add_argument('--once', action='store_true', help='Drain what is pending and exit (for cron)')
+        parser.add_argument('--interval', type=float, default=1.0, help='Seconds to sleep when nothing is pending')
+        parser.add_argument('--batch-size', type=int, default=outbox.BATCH_SIZE, help='Events per batch')
+
+    def handle(self, *args, **options):
+        batch_size = options['batch_size']
+        if options['once']:
+            processed = outbox.drain(batch_size)
+            pruned = outbox.prune()
+            self.stdout.write(self.style.SUCCESS(f'Processed {processed} event(s), pruned {pruned}'))
+            return
+
+        self.stdout.write(f'Dispatching outbox events every {options["interval"]}s (Ctrl+C to stop)')
+        last_prune = 0.0
+        try:
+            while True:
+                if not outbox.dispatch(batch_size):
+                    time.sleep(options['interval'])
+                if time.monotonic() - last_prune > self.PRUNE_EVERY:
+                    outbox.prune()
+                    last_prune = time.monotonic()
+        except KeyboardInterrupt:
+            self.stdout.write('Stopped')
@@ -0,0 +1,51 @@
+from django.core.management.base import BaseCommand, CommandError
+import os
+
+
+# Production profile: a few worker processes, each serving many concurrent requests on one
+# event loop. The async endpoints (stock checks, product details, form validation, unread
+# counts, categories) and the live update stream wait on the loop instead of holding a thread.
+PROFILE = {
+    'workers': 2,
+    # Open connections (mostly idle SSE streams and keep-alive polls) per worker before 503s
+    'limit_concurrency': 2000,
+    'backlog': 2048,
+    'timeout_keep_alive': 30,
+    # Let open streams finish their current event when a worker is restarted
+    'timeout_graceful_shutdown': 10,
+    'proxy_headers': True,
+}
+
+
+class Command(BaseCommand):
+    help = 'Serve the site with uvicorn (ASGI) using the production run profile'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--host', default='127.0.0.1', help='Interface to bind')
+        parser.add_argument('--port', type=int, default=8000, help='Port to bind')
+        parser.add_argument('--workers', type=int, default=PROFILE['workers'], help='Worker processes')
+        parser.add_argument('--limit-concurrency', type=int, default=PROFILE['limit_concurrency'],
+                            help='Concurrent connections per worker')
+        parser.add_argument('--reload', action='store_true', help='Restart on code changes (development, one worker)')
+
+    def handle(self, *args, **options):
+        try:
+            import uvicorn
+        except ImportError:
+            raise CommandError('uvicorn is not installed; install it with "pip install uvicorn[standard]"')
+
+        profile = dict(PROFILE, workers=options['workers'], limit_concurrency=options['limit_concurrency'])
+        if options['reload']:
+            profile['workers'] = None
+        self.stdout.write(
+            f"Serving PrycegasStation.asgi on http://{options['host']}:{options['port']} "
+            f"({profile['workers'] or 1} worker(s), {profile['limit_concurrency']} connections each)"
+        )
+        os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'PrycegasStation.settings')
+        uvicorn.run(
+            'PrycegasStation.asgi:application',
+            host=options['host'],
+            port=options['port'],
+            reload=options['reload'],
+            **profile,
+        )
@@ -2,6 +2,8 @@ import time
 import logging
 from django.conf import settings
 from django.db import connection
+from django.http import HttpResponse
+from django.utils.cache import patch_vary_headers
 from django.utils.deprecation import MiddlewareMixin
 
 logger = logging.getLogger('core.performance')
@@ -46,6 +48,10 @@ class PerformanceMonitoringMiddleware(MiddlewareMixin):
             if settings.DEBUG:
                 response['X-Response-Time'] = f"{duration:.3f}s"
                 response['X-Query-Count'] = str(queries_count)
+                fragment_hits = getattr(request, '_fragment_hits', 0)
+                fragment_misses = getattr(request, '_fragment_misses', 0)
+                if fragment_hits or fragment_misses:
+                    response['X-Fragment-Cache'] = f"{fragment_hits} hit, {fragment_misses} miss"
         
         return response
 
@@ -72,19 +78,25 @@ class MobileOptimizationMiddleware(MiddlewareMixin):
     
     def process_response(self, request, response):
         """Add mobile optimization headers"""
+        # Only anonymous responses without their own caching policy may be stored publicly
+        user = getattr(request, 'user', None)
+        cacheable = not response.has_header('Cache-Control') and not (user is not None and user.is_authenticated)
+        
         if hasattr(request, 'is_mobile') and request.is_mobile:
             # Add cache headers for mobile
-            response['Cache-Control'] = 'public, max-age=300'  # 5 minutes
+            if cacheable:
+                response['Cache-Control'] = 'public, max-age=300'  # 5 minutes
             
             # Add compression hint
-            response['Vary'] = 'Accept-Encoding, User-Agent'
+            patch_vary_headers(response, ('Accept-Encoding', 'User-Agent'))
             
             # Add mobile-specific headers
             response['X-Mobile-Optimized'] = 'true'
         
         if hasattr(request, 'is_slow_connection') and request.is_slow_connection:
             # Extend cache time for slow connections
-            response['Cache-Control'] = 'public, max-age=600'  # 10 minutes
+            if cacheable:
+                response['Cache-Control'] = 'public, max-age=600'  # 10 minutes
             response['X-Slow-Connection-Optimized'] = 'true'
         
         return response
@@ -117,9 +129,12 @@ class CacheOptimizationMiddleware(MiddlewareMixin):
                     cache_duration = duration
                     break
             
-            # Apply cache headers
-            if cache_duration:
-                response['Cache-Control'] = f'public, max-age={cache_duration}'
+            # Apply cache headers, leaving views that chose their own alone; pages rendered
+            # for a signed-in user must never be stored by shared caches
+            if cache_duration and not response.has_header('Cache-Control'):
+                user = getattr(request, 'user', None)
+                visibility = 'private' if user is not None and user.is_authenticated else 'public'
+                response['Cache-Control'] = f'{visibility}, max-age={cache_duration}'
                 
                 # Add ETag for better caching
                 if not response.get('ETag') and not getattr(response, 'streaming', False) and hasattr(response, 'content'):
@@ -127,4 +142,84 @@ class CacheOptimizationMiddleware(MiddlewareMixin):
                     content_hash = hashlib.md5(response.content).hexdigest()[:8]
                     response['ETag'] = f'"{content_hash}"'
         
-        return response
\ No newline at end of file
+        return response
+
+class RoleMiddleware(MiddlewareMixin):
+    """
+    Attach the current user's session-cached roles as request.roles and request.user.roles
+    Permission checks read these instead of loading cashier/customer profiles on every call
+    """
+
+    def process_request(self, request):
+        from .roles import for_request
+
+        request.roles = for_request(request)
+        if request.user.is_authenticated:
+            request.user.roles = request.roles
+        return None
+
+
+class PollGovernorMiddleware(MiddlewareMixin):
+    """
+    Tell polling clients when to poll next (X-Poll-Interval) and shed polls with 429 while
+    SQLite writers are waiting on the lock; see core.polling
+    """
+
+    def process_request(self, request):
+        from .polling import governor
+
+        connection.execute_wrappers.append(governor.timed_execute)
+        return None
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        from .polling import POLL_ENDPOINTS, governor
+
+        endpoint = request.resolver_match.url_name
+        if endpoint not in POLL_ENDPOINTS or request.method != 'GET':
+            return None
+        request._poll_endpoint = endpoint
+        if governor.should_shed():
+            interval = str(governor.interval(endpoint))
+            response = HttpResponse(status=429)
+            response['Retry-After'] = interval
+            response['X-Poll-Interval'] = interval
+            return response
+        return None
+
+    def process_response(self, request, response):
+        from .polling import governor
+
+        if governor.timed_execute in connection.execute_wrappers:
+            connection.execute_wrappers.remove(governor.timed_execute)
+        endpoint = getattr(request, '_poll_endpoint', None)
+        if endpoint and response.status_code in (200, 304):
+            governor.observe_poll(endpoint, changed=response.status_code == 200)
+            response['X-Poll-Interval'] = str(governor.interval(endpoint))
+        return response
+
+
+class WriteContentionMiddleware(MiddlewareMixin):
+    """
+    Answer a write that could not get the SQLite write lock (see core.db_writes) with a
+    "try again" instead of a 500: 503 with Retry-After for AJAX/HTMX, otherwise a message
+    and a redirect back to the form
+    """
+
+    RETRY_AFTER = 2
+
+    def process_exception(self, request, exception):
+        from django.contrib import messages
+        from django.http import JsonResponse
+        from django.shortcuts import redirect
+
+        from .db_writes import WriteContention
+
+        if not isinstance(exception, WriteContention):
+            return None
+        message = 'The system is busy saving other changes. Please try again in a moment.'
+        if request.headers.get('HX-Request') or request.headers.get('X-Requested-With') == 'XMLHttpRequest':
+            response = JsonResponse({'success': False, 'message': message}, status=503)
+            response['Retry-After'] = str(self.RETRY_AFTER)
+            return response
+        messages.error(request, message)
+        return redirect(request.META.get('HTTP_REFERER') or '/')
@@ -0,0 +1,65 @@
+# Generated by Django 5.2.7 on 2026-10-19 08:47
+
+import uuid
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+# movement_type -> (FK field on StockMovement, source model, reference_id parser)
+SOURCE_FIELDS = {
+    'sale': ('order', 'Order', int),
+    'return': ('order', 'Order', int),
+    'delivery': ('delivery_log', 'DeliveryLog', int),
+    'adjustment': ('adjustment', 'InventoryAdjustment', uuid.UUID),
+}
+
+
+def backfill_source_fks(apps, schema_editor):
+    """Resolve the free-text reference_id of existing movements into the typed FKs"""
+    StockMovement = apps.get_model('core', 'StockMovement')
+
+    for movement_type, (field_name, model_name, parse) in SOURCE_FIELDS.items():
+        Source = apps.get_model('core', model_name)
+        movements = StockMovement.objects.filter(movement_type=movement_type).exclude(reference_id='')
+
+        parsed = {}
+        for movement_id, reference_id in movements.values_list('id', 'reference_id').iterator():
+            try:
+                parsed[movement_id] = parse(reference_id.strip())
+            except (ValueError, TypeError, AttributeError):
+                continue
+
+        existing = set(Source.objects.values_list('pk', flat=True))
+        to_update = [
+            StockMovement(id=movement_id, **{f'{field_name}_id': source_id})
+            for movement_id, source_id in parsed.items()
+            if source_id in existing
+        ]
+        StockMovement.objects.bulk_update(to_update, [field_name], batch_size=500)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0015_add_profile_picture_to_customerprofile'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='stockmovement',
+            name='adjustment',
+            field=models.ForeignKey(blank=True, help_text='Inventory adjustment that caused this movement', null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='stock_movements', to='core.inventoryadjustment'),
+        ),
+        migrations.AddField(
+            model_name='stockmovement',
+            name='delivery_log',
+            field=models.ForeignKey(blank=True, help_text='Delivery that caused this movement', null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='stock_movements', to='core.deliverylog'),
+        ),
+        migrations.AddField(
+            model_name='stockmovement',
+            name='order',
+            field=models.ForeignKey(blank=True, help_text='Order that caused this movement (sales and returns)', null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='stock_movements', to='core.order'),
+        ),
+        migrations.RunPython(backfill_source_fks, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,31 @@
+# Generated by Django 5.2.7 on 2026-10-19 08:49
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0016_stockmovement_source_fks'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='IdentifierSequence',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('prefix', models.CharField(help_text='Identifier prefix this counter allocates for', max_length=50, unique=True)),
+                ('last_value', models.PositiveBigIntegerField(default=0, help_text='Last value handed out for this prefix')),
+            ],
+            options={
+                'verbose_name': 'Identifier Sequence',
+                'verbose_name_plural': 'Identifier Sequences',
+                'ordering': ['prefix'],
+            },
+        ),
+        migrations.AlterField(
+            model_name='cashier',
+            name='employee_id',
+            field=models.CharField(blank=True, help_text='Unique employee ID (assigned automatically when left blank)', max_length=50, unique=True),
+        ),
+    ]
@@ -0,0 +1,65 @@
+# Generated by Django 5.2.7 on 2026-10-19 08:51
+
+import django.db.models.deletion
+import django.utils.timezone
+from decimal import Decimal
+from django.db import migrations, models
+
+
+def open_initial_layers(apps, schema_editor):
+    """Start every product's average at its cost price and open one layer for the stock on hand"""
+    LPGProduct = apps.get_model('core', 'LPGProduct')
+    CostLayer = apps.get_model('core', 'CostLayer')
+
+    LPGProduct.objects.update(average_cost=models.F('cost_price'))
+    CostLayer.objects.bulk_create([
+        CostLayer(
+            product_id=product_id,
+            unit_cost=cost_price,
+            quantity_received=current_stock,
+            quantity_remaining=current_stock
+        )
+        for product_id, cost_price, current_stock in LPGProduct.objects.filter(
+            current_stock__gt=0
+        ).values_list('id', 'cost_price', 'current_stock')
+    ], batch_size=500)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0017_identifier_sequence'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='lpgproduct',
+            name='average_cost',
+            field=models.DecimalField(decimal_places=4, default=Decimal('0.0000'), help_text='Running weighted-average cost per unit of stock on hand', max_digits=12),
+        ),
+        migrations.AddField(
+            model_name='order',
+            name='cost_of_goods',
+            field=models.DecimalField(blank=True, decimal_places=2, help_text='FIFO cost of the stock this order consumed', max_digits=12, null=True),
+        ),
+        migrations.CreateModel(
+            name='CostLayer',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('unit_cost', models.DecimalField(decimal_places=4, help_text='Cost per unit of this layer', max_digits=12)),
+                ('quantity_received', models.PositiveIntegerField(help_text='Units that entered stock in this layer')),
+                ('quantity_remaining', models.PositiveIntegerField(help_text='Units of this layer not yet consumed')),
+                ('received_at', models.DateTimeField(default=django.utils.timezone.now, help_text='When the stock was received')),
+                ('adjustment', models.ForeignKey(blank=True, help_text='Positive adjustment that opened this layer', null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='cost_layers', to='core.inventoryadjustment')),
+                ('delivery_log', models.ForeignKey(blank=True, help_text='Delivery that opened this layer', null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='cost_layers', to='core.deliverylog')),
+                ('product', models.ForeignKey(help_text='Product this layer values', on_delete=django.db.models.deletion.CASCADE, related_name='cost_layers', to='core.lpgproduct')),
+            ],
+            options={
+                'verbose_name': 'Cost Layer',
+                'verbose_name_plural': 'Cost Layers',
+                'ordering': ['received_at', 'id'],
+                'indexes': [models.Index(condition=models.Q(('quantity_remaining__gt', 0)), fields=['product', 'received_at'], name='core_costlayer_open_idx')],
+            },
+        ),
+        migrations.RunPython(open_initial_layers, migrations.RunPython.noop),
+    ]
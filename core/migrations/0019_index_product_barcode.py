@@ -0,0 +1,18 @@
+# Generated by Django 5.2.7 on 2026-10-19 08:52
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0018_cost_layers'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='lpgproduct',
+            name='barcode',
+            field=models.CharField(blank=True, db_index=True, help_text='Product barcode for scanning', max_length=100),
+        ),
+    ]
@@ -0,0 +1,48 @@
+# Generated by Django 5.2.7 on 2026-10-19 09:00
+
+from decimal import Decimal
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0019_index_product_barcode'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DailyOrderCounters',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('date', models.DateField(help_text='Calendar day these totals cover', unique=True)),
+                ('orders_placed', models.IntegerField(default=0, help_text='Orders placed on this day')),
+                ('delivered_orders', models.IntegerField(default=0, help_text='Orders delivered on this day')),
+                ('delivered_revenue', models.DecimalField(decimal_places=2, default=Decimal('0.00'), help_text='Value of delivered orders placed on this day', max_digits=14)),
+            ],
+            options={
+                'verbose_name': 'Daily Order Counters',
+                'verbose_name_plural': 'Daily Order Counters',
+                'ordering': ['-date'],
+            },
+        ),
+        migrations.CreateModel(
+            name='DashboardCounters',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('total_orders', models.IntegerField(default=0, help_text='Orders ever placed')),
+                ('pending_orders', models.IntegerField(default=0, help_text='Orders currently pending')),
+                ('out_for_delivery', models.IntegerField(default=0, help_text='Orders currently out for delivery')),
+                ('total_products', models.IntegerField(default=0, help_text='Active products')),
+                ('low_stock_products', models.IntegerField(default=0, help_text='Active products at or below minimum stock')),
+                ('out_of_stock', models.IntegerField(default=0, help_text='Active products with no stock')),
+                ('total_stock_value', models.DecimalField(decimal_places=2, default=Decimal('0.00'), help_text='Retail value of active product stock', max_digits=16)),
+                ('rebuilt_at', models.DateTimeField(blank=True, help_text='When the counters were last recomputed from scratch', null=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'verbose_name': 'Dashboard Counters',
+                'verbose_name_plural': 'Dashboard Counters',
+            },
+        ),
+    ]
@@ -0,0 +1,33 @@
+# Generated by Django 5.2.7 on 2026-10-19 09:06
+
+from django.db import migrations, models
+from django.db.models.functions import Coalesce
+
+
+def count_unread_notifications(apps, schema_editor):
+    """Seed each customer's unread counter from their existing notifications"""
+    CustomerProfile = apps.get_model('core', 'CustomerProfile')
+    Notification = apps.get_model('core', 'Notification')
+
+    unread = Notification.objects.filter(
+        customer_id=models.OuterRef('user_id'), is_read=False
+    ).order_by().values('customer_id').annotate(total=models.Count('id')).values('total')
+    CustomerProfile.objects.update(
+        unread_notification_count=Coalesce(models.Subquery(unread), 0)
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0020_dashboard_counters'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='customerprofile',
+            name='unread_notification_count',
+            field=models.PositiveIntegerField(default=0, help_text='Unread notifications, maintained by core.notifications'),
+        ),
+        migrations.RunPython(count_unread_notifications, migrations.RunPython.noop),
+    ]
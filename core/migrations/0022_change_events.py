@@ -0,0 +1,28 @@
+# Generated by Django 5.2.7 on 2026-10-19 09:19
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0021_customerprofile_unread_notification_count'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ChangeEvent',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('topic', models.CharField(help_text="Audience, e.g. 'user:42' or 'staff'", max_length=64)),
+                ('kind', models.CharField(help_text="Event name sent to the browser, e.g. 'orders'", max_length=32)),
+                ('payload', models.JSONField(blank=True, default=dict, help_text='Small JSON body sent with the event')),
+                ('created_at', models.DateTimeField(auto_now_add=True, db_index=True)),
+            ],
+            options={
+                'verbose_name': 'Change Event',
+                'verbose_name_plural': 'Change Events',
+                'ordering': ['id'],
+            },
+        ),
+    ]
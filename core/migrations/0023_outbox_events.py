@@ -0,0 +1,31 @@
+# Generated by Django 5.2.7 on 2026-10-19 09:33
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0022_change_events'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='OutboxEvent',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('kind', models.CharField(choices=[('notify_customer', 'Notify Customer'), ('record_sale', 'Record Cashier Sale')], help_text='Side effect to carry out', max_length=32)),
+                ('payload', models.JSONField(blank=True, default=dict, help_text='Ids and values the side effect needs')),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('processed_at', models.DateTimeField(blank=True, help_text='When the dispatcher carried it out', null=True)),
+                ('attempts', models.PositiveIntegerField(default=0, help_text='Failed dispatch attempts so far')),
+                ('last_error', models.TextField(blank=True, help_text='Error from the last failed attempt')),
+            ],
+            options={
+                'verbose_name': 'Outbox Event',
+                'verbose_name_plural': 'Outbox Events',
+                'ordering': ['id'],
+                'indexes': [models.Index(fields=['processed_at', 'id'], name='outbox_pending_idx')],
+            },
+        ),
+    ]
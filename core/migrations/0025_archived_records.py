@@ -0,0 +1,39 @@
+# Generated by Django 5.2.7 on 2026-10-19 10:00
+
+import django.core.serializers.json
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0024_order_indexes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ArchivedRecord',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('kind', models.CharField(choices=[('order', 'Order'), ('stock_movement', 'Stock Movement'), ('notification', 'Notification')], help_text='Table the row was moved from', max_length=32)),
+                ('original_id', models.CharField(help_text='Primary key the row had in its table', max_length=64)),
+                ('occurred_at', models.DateTimeField(help_text='When the record happened (delivery date for delivered orders)')),
+                ('customer_id', models.IntegerField(blank=True, help_text='Customer the record belongs to', null=True)),
+                ('product_id', models.IntegerField(blank=True, help_text='Product of an order or movement', null=True)),
+                ('batch_id', models.UUIDField(blank=True, help_text='Batch of an archived order', null=True)),
+                ('status', models.CharField(blank=True, help_text='Order status when archived', max_length=20)),
+                ('quantity', models.IntegerField(blank=True, null=True)),
+                ('amount', models.DecimalField(blank=True, decimal_places=2, help_text='Order total amount', max_digits=12, null=True)),
+                ('cost_of_goods', models.DecimalField(blank=True, decimal_places=2, help_text='Order cost of goods, with the cost price fallback applied', max_digits=14, null=True)),
+                ('payload', models.JSONField(encoder=django.core.serializers.json.DjangoJSONEncoder, help_text='Field values of the original row')),
+                ('archived_at', models.DateTimeField(auto_now_add=True)),
+            ],
+            options={
+                'verbose_name': 'Archived Record',
+                'verbose_name_plural': 'Archived Records',
+                'ordering': ['-occurred_at'],
+                'indexes': [models.Index(fields=['kind', 'status', 'occurred_at'], name='archive_kind_status_idx'), models.Index(fields=['kind', 'customer_id', 'occurred_at'], name='archive_customer_idx'), models.Index(fields=['batch_id'], name='archive_batch_idx')],
+                'constraints': [models.UniqueConstraint(fields=('kind', 'original_id'), name='archive_original_unique')],
+            },
+        ),
+    ]
@@ -0,0 +1,26 @@
+# Generated by Django 5.2.7 on 2026-10-19 10:33
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0026_notification_read_date_idx'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='order',
+            name='customer',
+            field=models.ForeignKey(blank=True, db_index=False, help_text='Customer who placed the order (null for walk-in customers)', null=True, on_delete=django.db.models.deletion.CASCADE, related_name='orders', to=settings.AUTH_USER_MODEL),
+        ),
+        migrations.AlterField(
+            model_name='order',
+            name='processed_by',
+            field=models.ForeignKey(blank=True, db_index=False, help_text='Cashier who processed/delivered this order', null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='processed_orders', to='core.cashier'),
+        ),
+    ]
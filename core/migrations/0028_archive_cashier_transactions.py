@@ -0,0 +1,37 @@
+# Generated by Django 5.2.7 on 2026-10-19 10:37
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0027_order_drop_redundant_fk_indexes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='archivedrecord',
+            name='cashier_id',
+            field=models.IntegerField(blank=True, help_text='Cashier of an archived cashier transaction', null=True),
+        ),
+        migrations.AlterField(
+            model_name='archivedrecord',
+            name='amount',
+            field=models.DecimalField(blank=True, decimal_places=2, help_text='Order total amount or cashier transaction amount', max_digits=12, null=True),
+        ),
+        migrations.AlterField(
+            model_name='archivedrecord',
+            name='kind',
+            field=models.CharField(choices=[('order', 'Order'), ('stock_movement', 'Stock Movement'), ('notification', 'Notification'), ('cashier_transaction', 'Cashier Transaction')], help_text='Table the row was moved from', max_length=32),
+        ),
+        migrations.AlterField(
+            model_name='archivedrecord',
+            name='status',
+            field=models.CharField(blank=True, help_text="Order status when archived, or the cashier transaction's type", max_length=20),
+        ),
+        migrations.AddIndex(
+            model_name='archivedrecord',
+            index=models.Index(fields=['kind', 'cashier_id', 'occurred_at'], name='archive_cashier_idx'),
+        ),
+    ]
@@ -1,4 +1,5 @@
-from django.db import models
+from django.db import models, connection, transaction, IntegrityError
+from django.core.serializers.json import DjangoJSONEncoder
 from django.contrib.auth.models import User
 from django.core.validators import MinValueValidator, RegexValidator
 from django.utils import timezone
@@ -132,6 +133,10 @@ class CustomerProfile(models.Model):
         null=True,
         help_text="Customer profile picture"
     )
+    unread_notification_count = models.PositiveIntegerField(
+        default=0,
+        help_text="Unread notifications, maintained by core.notifications"
+    )
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
@@ -149,6 +154,85 @@ class CustomerProfile(models.Model):
         return None
 
 
+class IdentifierSequence(models.Model):
+    """
+    Per-prefix counters used to allocate generated identifiers (product SKUs, employee IDs)
+    Each allocation is a single atomic increment, so concurrent creates never share a value
+    """
+    prefix = models.CharField(max_length=50, unique=True, help_text="Identifier prefix this counter allocates for")
+    last_value = models.PositiveBigIntegerField(default=0, help_text="Last value handed out for this prefix")
+
+    class Meta:
+        verbose_name = "Identifier Sequence"
+        verbose_name_plural = "Identifier Sequences"
+        ordering = ['prefix']
+
+    def __str__(self):
+        return f"{self.prefix}: {self.last_value}"
+
+    @classmethod
+    def allocate(cls, prefix, existing=None):
+        """
+        Return the next value for prefix.
+        existing is an optional callable returning identifiers already in use for the prefix;
+        it is only consulted when the sequence is first created so allocation continues after
+        the highest suffix already taken.
+        """
+        value = cls._increment(prefix)
+        if value is not None:
+            return value
+
+        start = 0
+        if existing is not None:
+            start = max((cls._parse_suffix(prefix, identifier) for identifier in existing()), default=0)
+        try:
+            with transaction.atomic():
+                cls.objects.create(prefix=prefix, last_value=start + 1)
+            return start + 1
+        except IntegrityError:
+            # Another writer created the sequence first; take the next value from it
+            return cls._increment(prefix)
+
+    @classmethod
+    def allocate_unused(cls, prefix, render, in_use, existing=None):
+        """
+        Return the next identifier render(value) for prefix that in_use(identifier) reports free.
+        Values taken by hand after the sequence was created (e.g. a manually entered SKU ahead of
+        the counter) are skipped instead of colliding; call it inside the transaction that saves
+        the identifier.
+        """
+        while True:
+            identifier = render(cls.allocate(prefix, existing=existing))
+            if not in_use(identifier):
+                return identifier
+
+    @classmethod
+    def _increment(cls, prefix):
+        """Bump and read the counter in one statement; None if the sequence does not exist yet"""
+        table = connection.ops.quote_name(cls._meta.db_table)
+        if connection.features.can_return_columns_from_insert:
+            with connection.cursor() as cursor:
+                cursor.execute(
+                    f"UPDATE {table} SET last_value = last_value + 1 WHERE prefix = %s RETURNING last_value",
+                    [prefix]
+                )
+                row = cursor.fetchone()
+            return row[0] if row else None
+
+        with transaction.atomic():
+            if not cls.objects.filter(prefix=prefix).update(last_value=models.F('last_value') + 1):
+                return None
+            return cls.objects.filter(prefix=prefix).values_list('last_value', flat=True).get()
+
+    @staticmethod
+    def _parse_suffix(prefix, identifier):
+        """Numeric suffix of an identifier formatted as '<prefix>-<number>', 0 if it has none"""
+        suffix = (identifier or '')[len(prefix) + 1:]
+        if identifier and identifier.startswith(f"{prefix}-") and suffix.isdigit():
+            return int(suffix)
+        return 0
+
+
 class LPGProduct(models.Model):
     """
     LPG products with enhanced inventory tracking and management
@@ -166,6 +250,7 @@ class LPGProduct(models.Model):
     barcode = models.CharField(
         max_length=100,
         blank=True,
+        db_index=True,
         help_text="Product barcode for scanning"
     )
     category = models.ForeignKey(
@@ -189,6 +274,12 @@ class LPGProduct(models.Model):
         default=Decimal('0.00'),
         help_text="Cost price per unit"
     )
+    average_cost = models.DecimalField(
+        max_digits=12,
+        decimal_places=4,
+        default=Decimal('0.0000'),
+        help_text="Running weighted-average cost per unit of stock on hand"
+    )
     current_stock = models.IntegerField(
         default=0,
         validators=[MinValueValidator(0)],
@@ -240,14 +331,30 @@ class LPGProduct(models.Model):
 
     def save(self, *args, **kwargs):
         """Auto-generate SKU if not provided"""
-        if not self.sku:
-            # Generate SKU based on name and size
-            base_sku = f"{self.name[:3].upper()}-{self.size.replace('kg', '')}"
-            counter = 1
-            while LPGProduct.objects.filter(sku=f"{base_sku}-{counter:03d}").exists():
-                counter += 1
-            self.sku = f"{base_sku}-{counter:03d}"
-        super().save(*args, **kwargs)
+        with transaction.atomic():
+            if not self.sku:
+                # Generate SKU based on name and size
+                base_sku = f"{self.name[:3].upper()}-{self.size.replace('kg', '')}"
+                self.sku = IdentifierSequence.allocate_unused(
+                    base_sku,
+                    render=lambda counter: f"{base_sku}-{counter:03d}",
+                    in_use=lambda sku: LPGProduct.objects.filter(sku=sku).exists(),
+                    existing=lambda: LPGProduct.objects.filter(sku__startswith=f"{base_sku}-").values_list('sku', flat=True)
+                )
+
+            is_new = self._state.adding
+            if is_new and not self.average_cost:
+                self.average_cost = self.cost_price or Decimal('0.00')
+            super().save(*args, **kwargs)
+
+            # Opening stock entered with the product becomes its first cost layer
+            if is_new and self.current_stock > 0:
+                CostLayer.objects.create(
+                    product=self,
+                    unit_cost=self.average_cost,
+                    quantity_received=self.current_stock,
+                    quantity_remaining=self.current_stock
+                )
 
     @property
     def is_low_stock(self):
@@ -266,8 +373,8 @@ class LPGProduct(models.Model):
 
     @property
     def stock_value(self):
-        """Calculate total stock value at cost price"""
-        return self.current_stock * self.cost_price
+        """Calculate total stock value at weighted-average cost"""
+        return self.current_stock * (self.average_cost or self.cost_price)
 
     @property
     def profit_margin(self):
@@ -284,14 +391,14 @@ class LPGProduct(models.Model):
         """Reserve stock for an order"""
         if self.can_fulfill_order(quantity):
             self.reserved_stock += quantity
-            self.save()
+            self.save(update_fields=['reserved_stock', 'updated_at'])
             return True
         return False
 
     def release_stock(self, quantity):
         """Release reserved stock"""
         self.reserved_stock = max(0, self.reserved_stock - quantity)
-        self.save()
+        self.save(update_fields=['reserved_stock', 'updated_at'])
 
     def get_stock_movements(self, days=30):
         """Get stock movements for the last N days"""
@@ -329,6 +436,8 @@ class Order(models.Model):
         null=True,
         blank=True,
         related_name='orders',
+        # Lookups by customer use order_customer_date_idx, which leads with this column
+        db_index=False,
         help_text="Customer who placed the order (null for walk-in customers)"
     )
     product = models.ForeignKey(
@@ -359,6 +468,13 @@ class Order(models.Model):
         validators=[MinValueValidator(Decimal('0.01'))],
         help_text="Total order amount"
     )
+    cost_of_goods = models.DecimalField(
+        max_digits=12,
+        decimal_places=2,
+        null=True,
+        blank=True,
+        help_text="FIFO cost of the stock this order consumed"
+    )
     order_date = models.DateTimeField(auto_now_add=True)
     delivery_date = models.DateTimeField(
         null=True, 
@@ -375,6 +491,8 @@ class Order(models.Model):
         null=True,
         blank=True,
         related_name='processed_orders',
+        # Lookups by cashier use order_cashier_delivered_idx, which leads with this column
+        db_index=False,
         help_text="Cashier who processed/delivered this order"
     )
     delivery_person_name = models.CharField(
@@ -406,6 +524,20 @@ class Order(models.Model):
         verbose_name = "Order"
         verbose_name_plural = "Orders"
         ordering = ['-order_date']
+        indexes = [
+            # Unfiltered order lists, newest first
+            models.Index(fields=['-order_date'], name='order_date_idx'),
+            # Lists filtered by status (and then delivery type), newest first
+            models.Index(fields=['status', '-order_date'], name='order_status_date_idx'),
+            # A customer's order history
+            models.Index(fields=['customer', '-order_date'], name='order_customer_date_idx'),
+            # Items of one order, in the order they were added
+            models.Index(fields=['batch_id', 'id'], name='order_batch_idx'),
+            # Sales reports: delivered orders by delivery date
+            models.Index(fields=['status', 'delivery_date'], name='order_status_delivered_idx'),
+            # Cashier reports: one cashier's delivered orders by delivery date
+            models.Index(fields=['processed_by', 'status', 'delivery_date'], name='order_cashier_delivered_idx'),
+        ]
 
     def __str__(self):
         customer_name = self.customer.username if self.customer else "Walk-in Customer"
@@ -469,6 +601,32 @@ class Order(models.Model):
         first_item = self.batch_items.first()
         return first_item and first_item.id == self.id
 
+    def deduct_stock(self, created_by):
+        """
+        Take this order's quantity out of stock: cost it from the product's FIFO layers,
+        decrement current stock and record the sale movement
+        """
+        product = self.product
+        previous_stock = product.current_stock
+
+        self.cost_of_goods = CostLayer.consume(product, self.quantity)
+        Order.objects.filter(pk=self.pk).update(cost_of_goods=self.cost_of_goods)
+
+        product.current_stock -= self.quantity
+        product.save(update_fields=['current_stock', 'updated_at'])
+
+        StockMovement.objects.create(
+            product=product,
+            movement_type='sale',
+            quantity=-self.quantity,
+            previous_stock=previous_stock,
+            new_stock=product.current_stock,
+            reference_id=str(self.id),
+            order=self,
+            notes=f"Sale: Order #{self.id}",
+            created_by=created_by
+        )
+
 
 class DeliveryLog(models.Model):
     """
@@ -532,12 +690,24 @@ class DeliveryLog(models.Model):
         # Update product stock when delivery is logged
         if is_new:
             previous_stock = self.product.current_stock
+            self.product.average_cost = CostLayer.weighted_average(
+                self.product, previous_stock, self.quantity_received, self.cost_per_unit
+            )
             self.product.current_stock += self.quantity_received
-            self.product.save()
+            self.product.save(update_fields=['current_stock', 'average_cost', 'updated_at'])
 
             # Save the delivery log first
             super().save(*args, **kwargs)
 
+            CostLayer.objects.create(
+                product=self.product,
+                delivery_log=self,
+                unit_cost=self.cost_per_unit,
+                quantity_received=self.quantity_received,
+                quantity_remaining=self.quantity_received,
+                received_at=self.delivery_date
+            )
+
             # Create stock movement record
             try:
                 StockMovement.objects.create(
@@ -547,6 +717,7 @@ class DeliveryLog(models.Model):
                     previous_stock=previous_stock,
                     new_stock=self.product.current_stock,
                     reference_id=str(self.id),
+                    delivery_log=self,
                     notes=f"Delivery from {self.supplier_name}",
                     created_by=self.logged_by
                 )
@@ -638,6 +809,30 @@ class StockMovement(models.Model):
         blank=True,
         help_text="Reference ID (order ID, delivery ID, etc.)"
     )
+    order = models.ForeignKey(
+        'Order',
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        related_name='stock_movements',
+        help_text="Order that caused this movement (sales and returns)"
+    )
+    delivery_log = models.ForeignKey(
+        'DeliveryLog',
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        related_name='stock_movements',
+        help_text="Delivery that caused this movement"
+    )
+    adjustment = models.ForeignKey(
+        'InventoryAdjustment',
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        related_name='stock_movements',
+        help_text="Inventory adjustment that caused this movement"
+    )
     notes = models.TextField(blank=True, help_text="Additional notes")
     created_by = models.ForeignKey(
         User,
@@ -661,6 +856,93 @@ class StockMovement(models.Model):
         return f"{self.movement_type.title()}: {self.quantity} {self.product.name}"
 
 
+class CostLayer(models.Model):
+    """
+    A FIFO cost layer: a quantity of stock received at a single unit cost
+    Deliveries open layers, sales and negative adjustments drain the oldest open layers first
+    Requirements: Inventory valuation with FIFO and weighted-average costing
+    """
+    product = models.ForeignKey(
+        'LPGProduct',
+        on_delete=models.CASCADE,
+        related_name='cost_layers',
+        help_text="Product this layer values"
+    )
+    delivery_log = models.ForeignKey(
+        'DeliveryLog',
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        related_name='cost_layers',
+        help_text="Delivery that opened this layer"
+    )
+    adjustment = models.ForeignKey(
+        'InventoryAdjustment',
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        related_name='cost_layers',
+        help_text="Positive adjustment that opened this layer"
+    )
+    unit_cost = models.DecimalField(
+        max_digits=12,
+        decimal_places=4,
+        help_text="Cost per unit of this layer"
+    )
+    quantity_received = models.PositiveIntegerField(help_text="Units that entered stock in this layer")
+    quantity_remaining = models.PositiveIntegerField(help_text="Units of this layer not yet consumed")
+    received_at = models.DateTimeField(default=timezone.now, help_text="When the stock was received")
+
+    class Meta:
+        verbose_name = "Cost Layer"
+        verbose_name_plural = "Cost Layers"
+        ordering = ['received_at', 'id']
+        indexes = [
+            models.Index(
+                fields=['product', 'received_at'],
+                name='core_costlayer_open_idx',
+                condition=models.Q(quantity_remaining__gt=0)
+            ),
+        ]
+
+    def __str__(self):
+        return f"{self.product.name}: {self.quantity_remaining}/{self.quantity_received} @ {self.unit_cost}"
+
+    @staticmethod
+    def weighted_average(product, on_hand, quantity, unit_cost):
+        """Average cost after receiving quantity units at unit_cost on top of on_hand units"""
+        on_hand = max(on_hand, 0)
+        if on_hand + quantity <= 0:
+            return product.average_cost
+        current = product.average_cost or product.cost_price or Decimal('0.00')
+        total = current * on_hand + Decimal(unit_cost) * quantity
+        return (total / (on_hand + quantity)).quantize(Decimal('0.0001'))
+
+    @classmethod
+    def consume(cls, product, quantity):
+        """
+        Drain quantity units from the product's oldest open layers and return their cost.
+        Units not covered by any layer are costed at the product's average cost.
+        """
+        remaining = quantity
+        cost = Decimal('0.00')
+        drained = []
+        for layer in cls.objects.filter(product=product, quantity_remaining__gt=0).order_by('received_at', 'id'):
+            taken = min(layer.quantity_remaining, remaining)
+            layer.quantity_remaining -= taken
+            cost += taken * layer.unit_cost
+            drained.append(layer)
+            remaining -= taken
+            if not remaining:
+                break
+
+        if drained:
+            cls.objects.bulk_update(drained, ['quantity_remaining'])
+        if remaining:
+            cost += remaining * (product.average_cost or product.cost_price or Decimal('0.00'))
+        return cost.quantize(Decimal('0.01'))
+
+
 class InventoryAdjustment(models.Model):
     """
     Inventory adjustments for stock corrections
@@ -755,6 +1037,10 @@ class InventoryAdjustment(models.Model):
                 raise ValueError(error_msg)
             print(f"[DEBUG] Validation passed - stock is valid: {self.product.current_stock}")
             
+            # Written-off units leave through the oldest cost layers
+            if self.quantity_change < 0:
+                CostLayer.consume(self.product, -self.quantity_change)
+
             # Save the product with updated stock
             print(f"[DEBUG] Saving product to database...")
             try:
@@ -766,8 +1052,22 @@ class InventoryAdjustment(models.Model):
                 import traceback
                 traceback.print_exc()
                 raise
+        else:
+            print(f"[DEBUG] This is an UPDATE (pk exists: {self.pk})")
+
+        # Save the adjustment record itself
+        print(f"[DEBUG] Saving InventoryAdjustment record...")
+        try:
+            super().save(*args, **kwargs)
+            print(f"[DEBUG] InventoryAdjustment saved successfully with ID: {self.id}")
+        except Exception as e:
+            print(f"[ERROR] Failed to save InventoryAdjustment: {str(e)}")
+            import traceback
+            traceback.print_exc()
+            raise
 
-            # Create stock movement record for audit trail
+        # Create the stock movement once the adjustment row exists so it can reference it
+        if is_new:
             print(f"[DEBUG] Creating StockMovement record...")
             try:
                 movement = StockMovement.objects.create(
@@ -777,6 +1077,7 @@ class InventoryAdjustment(models.Model):
                     previous_stock=previous_stock,
                     new_stock=self.product.current_stock,
                     reference_id=str(self.id),
+                    adjustment=self,
                     notes=f"Adjustment: {self.reason} - {self.notes}",
                     created_by=self.adjusted_by
                 )
@@ -785,19 +1086,16 @@ class InventoryAdjustment(models.Model):
                 print(f"[WARNING] Could not create stock movement: {str(e)}")
                 import traceback
                 traceback.print_exc()
-        else:
-            print(f"[DEBUG] This is an UPDATE (pk exists: {self.pk})")
 
-        # Save the adjustment record itself
-        print(f"[DEBUG] Saving InventoryAdjustment record...")
-        try:
-            super().save(*args, **kwargs)
-            print(f"[DEBUG] InventoryAdjustment saved successfully with ID: {self.id}")
-        except Exception as e:
-            print(f"[ERROR] Failed to save InventoryAdjustment: {str(e)}")
-            import traceback
-            traceback.print_exc()
-            raise
+            # Found units are valued at the current average cost
+            if self.quantity_change > 0:
+                CostLayer.objects.create(
+                    product=self.product,
+                    adjustment=self,
+                    unit_cost=self.product.average_cost or self.product.cost_price,
+                    quantity_received=self.quantity_change,
+                    quantity_remaining=self.quantity_change
+                )
         
         print(f"\n{'='*80}")
         print(f"[DEBUG] InventoryAdjustment.save() COMPLETE")
@@ -859,7 +1157,12 @@ class Cashier(models.Model):
     A cashier is a staff member with permission to manage customer orders
     """
     user = models.OneToOneField(User, on_delete=models.CASCADE, related_name='cashier_profile')
-    employee_id = models.CharField(max_length=50, unique=True, help_text="Unique employee ID")
+    employee_id = models.CharField(
+        max_length=50,
+        unique=True,
+        blank=True,
+        help_text="Unique employee ID (assigned automatically when left blank)"
+    )
     is_active = models.BooleanField(default=True, help_text="Cashier status")
     shift_start = models.TimeField(null=True, blank=True, help_text="Cashier shift start time")
     shift_end = models.TimeField(null=True, blank=True, help_text="Cashier shift end time")
@@ -871,9 +1174,24 @@ class Cashier(models.Model):
         verbose_name_plural = "Cashiers"
         ordering = ['user__username']
 
+    EMPLOYEE_ID_PREFIX = 'EMP'
+
     def __str__(self):
         return f"Cashier: {self.user.first_name or self.user.username}"
 
+    def save(self, *args, **kwargs):
+        """Assign the next sequential employee ID if none was given"""
+        with transaction.atomic():
+            if not self.employee_id:
+                prefix = self.EMPLOYEE_ID_PREFIX
+                self.employee_id = IdentifierSequence.allocate_unused(
+                    prefix,
+                    render=lambda number: f"{prefix}-{number:04d}",
+                    in_use=lambda employee_id: Cashier.objects.filter(employee_id=employee_id).exists(),
+                    existing=lambda: Cashier.objects.filter(employee_id__startswith=f"{prefix}-").values_list('employee_id', flat=True)
+                )
+            super().save(*args, **kwargs)
+
     def can_manage_order(self):
         """Check if cashier is active and can manage orders"""
         return self.is_active
@@ -989,6 +1307,8 @@ class Notification(models.Model):
         indexes = [
             models.Index(fields=['customer', '-created_at']),
             models.Index(fields=['customer', 'is_read']),
+            # Retention and archival: read notifications, oldest first
+            models.Index(fields=['is_read', 'created_at'], name='notification_read_date_idx'),
         ]
 
     def __str__(self):
@@ -999,4 +1319,160 @@ class Notification(models.Model):
         if not self.is_read:
             self.is_read = True
             self.read_at = timezone.now()
-            self.save()
\ No newline at end of file
+            self.save()
+
+class DashboardCounters(models.Model):
+    """
+    Running totals behind the dealer dashboard, kept in a single row
+    Updated incrementally by order and product changes (see core.dashboard) so the
+    dashboard reads a fixed number of rows however large the order history grows
+    """
+    SINGLETON_ID = 1
+
+    total_orders = models.IntegerField(default=0, help_text="Orders ever placed")
+    pending_orders = models.IntegerField(default=0, help_text="Orders currently pending")
+    out_for_delivery = models.IntegerField(default=0, help_text="Orders currently out for delivery")
+    total_products = models.IntegerField(default=0, help_text="Active products")
+    low_stock_products = models.IntegerField(default=0, help_text="Active products at or below minimum stock")
+    out_of_stock = models.IntegerField(default=0, help_text="Active products with no stock")
+    total_stock_value = models.DecimalField(
+        max_digits=16,
+        decimal_places=2,
+        default=Decimal('0.00'),
+        help_text="Retail value of active product stock"
+    )
+    rebuilt_at = models.DateTimeField(null=True, blank=True, help_text="When the counters were last recomputed from scratch")
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        verbose_name = "Dashboard Counters"
+        verbose_name_plural = "Dashboard Counters"
+
+    def __str__(self):
+        return f"Dashboard counters (updated {self.updated_at:%Y-%m-%d %H:%M})"
+
+
+class DailyOrderCounters(models.Model):
+    """
+    Per-day order totals for the dashboard's daily and weekly figures
+    Orders and their revenue count on the day they were placed; deliveries on the day they were delivered
+    """
+    date = models.DateField(unique=True, help_text="Calendar day these totals cover")
+    orders_placed = models.IntegerField(default=0, help_text="Orders placed on this day")
+    delivered_orders = models.IntegerField(default=0, help_text="Orders delivered on this day")
+    delivered_revenue = models.DecimalField(
+        max_digits=14,
+        decimal_places=2,
+        default=Decimal('0.00'),
+        help_text="Value of delivered orders placed on this day"
+    )
+
+    class Meta:
+        verbose_name = "Daily Order Counters"
+        verbose_name_plural = "Daily Order Counters"
+        ordering = ['-date']
+
+    def __str__(self):
+        return f"{self.date}: {self.orders_placed} placed, {self.delivered_orders} delivered"
+
+
+class ChangeEvent(models.Model):
+    """
+    Outbox of change notifications for the live update stream
+    Written in the same transaction as the change it describes, then read by every worker's
+    event broker and pushed to the browsers subscribed to its topic
+    """
+    topic = models.CharField(max_length=64, help_text="Audience, e.g. 'user:42' or 'staff'")
+    kind = models.CharField(max_length=32, help_text="Event name sent to the browser, e.g. 'orders'")
+    payload = models.JSONField(default=dict, blank=True, help_text="Small JSON body sent with the event")
+    created_at = models.DateTimeField(auto_now_add=True, db_index=True)
+
+    class Meta:
+        verbose_name = "Change Event"
+        verbose_name_plural = "Change Events"
+        ordering = ['id']
+
+    def __str__(self):
+        return f"{self.kind} -> {self.topic} #{self.pk}"
+
+
+class OutboxEvent(models.Model):
+    """
+    Side effect of an order transition waiting to be carried out
+    Written in the same transaction as the status change and drained in batches by the
+    run_outbox_dispatcher command, which creates the notifications and cashier transactions
+    """
+    KIND_CHOICES = [
+        ('notify_customer', 'Notify Customer'),
+        ('record_sale', 'Record Cashier Sale'),
+    ]
+
+    kind = models.CharField(max_length=32, choices=KIND_CHOICES, help_text="Side effect to carry out")
+    payload = models.JSONField(default=dict, blank=True, help_text="Ids and values the side effect needs")
+    created_at = models.DateTimeField(auto_now_add=True)
+    processed_at = models.DateTimeField(null=True, blank=True, help_text="When the dispatcher carried it out")
+    attempts = models.PositiveIntegerField(default=0, help_text="Failed dispatch attempts so far")
+    last_error = models.TextField(blank=True, help_text="Error from the last failed attempt")
+
+    class Meta:
+        verbose_name = "Outbox Event"
+        verbose_name_plural = "Outbox Events"
+        ordering = ['id']
+        indexes = [
+            models.Index(fields=['processed_at', 'id'], name='outbox_pending_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.kind} #{self.pk}"
+
+
+class ArchivedRecord(models.Model):
+    """
+    Copy of an order, stock movement, notification or cashier transaction moved out of its
+    table once it is older than the archive horizon (see core.archive). The full row is kept in payload;
+    the columns reports filter and total on are copied next to it.
+    """
+    KIND_CHOICES = [
+        ('order', 'Order'),
+        ('stock_movement', 'Stock Movement'),
+        ('notification', 'Notification'),
+        ('cashier_transaction', 'Cashier Transaction'),
+    ]
+
+    kind = models.CharField(max_length=32, choices=KIND_CHOICES, help_text="Table the row was moved from")
+    original_id = models.CharField(max_length=64, help_text="Primary key the row had in its table")
+    occurred_at = models.DateTimeField(help_text="When the record happened (delivery date for delivered orders)")
+    customer_id = models.IntegerField(null=True, blank=True, help_text="Customer the record belongs to")
+    cashier_id = models.IntegerField(null=True, blank=True, help_text="Cashier of an archived cashier transaction")
+    product_id = models.IntegerField(null=True, blank=True, help_text="Product of an order or movement")
+    batch_id = models.UUIDField(null=True, blank=True, help_text="Batch of an archived order")
+    status = models.CharField(max_length=20, blank=True,
+                              help_text="Order status when archived, or the cashier transaction's type")
+    quantity = models.IntegerField(null=True, blank=True)
+    amount = models.DecimalField(max_digits=12, decimal_places=2, null=True, blank=True,
+                                 help_text="Order total amount or cashier transaction amount")
+    cost_of_goods = models.DecimalField(max_digits=14, decimal_places=2, null=True, blank=True,
+                                        help_text="Order cost of goods, with the cost price fallback applied")
+    payload = models.JSONField(encoder=DjangoJSONEncoder, help_text="Field values of the original row")
+    archived_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        verbose_name = "Archived Record"
+        verbose_name_plural = "Archived Records"
+        ordering = ['-occurred_at']
+        constraints = [
+            # Re-running an interrupted batch skips rows that were already copied
+            models.UniqueConstraint(fields=['kind', 'original_id'], name='archive_original_unique'),
+        ]
+        indexes = [
+            # Report totals: archived delivered orders by delivery date
+            models.Index(fields=['kind', 'status', 'occurred_at'], name='archive_kind_status_idx'),
+            # A customer's archived history
+            models.Index(fields=['kind', 'customer_id', 'occurred_at'], name='archive_customer_idx'),
+            # A cashier's archived transactions
+            models.Index(fields=['kind', 'cashier_id', 'occurred_at'], name='archive_cashier_idx'),
+            models.Index(fields=['batch_id'], name='archive_batch_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.get_kind_display()} #{self.original_id}"
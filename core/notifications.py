@@ -0,0 +1,129 @@
+"""
+Cached per-user notification summary
+Each customer's unread count is denormalized onto CustomerProfile and kept in step with
+notification creates, reads and deletes. The count and the latest unread notifications are
+cached per user, so the context processor and the bell poll read one cache entry instead of
+querying Notification on every render.
+"""
+from collections import Counter
+
+from asgiref.sync import sync_to_async
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import F, Value
+from django.db.models.functions import Greatest
+from django.db.models.signals import post_delete, post_init, post_save
+from django.dispatch import receiver
+from django.utils import timezone
+
+from .data_versions import bump_now_and_on_commit
+from .models import CustomerProfile, Notification
+
+
+LATEST_COUNT = 5
+SUMMARY_TIMEOUT = 60 * 60
+
+EMPTY_SUMMARY = {'unread_count': 0, 'latest': []}
+
+# Per-user scope ('notifications', user_id), moved whenever the summary is dropped
+NOTIFICATIONS_SCOPE = 'notifications'
+
+
+def summary_key(user_id):
+    return f'notifications:summary:{user_id}'
+
+
+def _skips(user, roles):
+    """Users known not to be customers never receive notifications and need no lookup at all"""
+    if not user.is_authenticated:
+        return True
+    roles = roles if roles is not None else getattr(user, 'roles', None)
+    return roles is not None and not roles.is_customer
+
+
+def get_summary(user, roles=None):
+    """
+    {'unread_count', 'latest'} for user, from the cache when possible
+    roles (request.roles, or the user.roles RoleMiddleware attaches) lets non-customers such as
+    dealers and cashiers skip the cache entirely; without them, users with no customer profile
+    cache an empty summary on their first miss.
+    """
+    if _skips(user, roles):
+        return EMPTY_SUMMARY
+    summary = cache.get(summary_key(user.pk))
+    if summary is None:
+        summary = _load_summary(user.pk)
+    return summary
+
+
+async def aget_summary(user, roles=None):
+    """get_summary for async views; the database is only read on a cache miss"""
+    if _skips(user, roles):
+        return EMPTY_SUMMARY
+    summary = await cache.aget(summary_key(user.pk))
+    if summary is None:
+        summary = await sync_to_async(_load_summary)(user.pk)
+    return summary
+
+
+def _load_summary(user_id):
+    count = CustomerProfile.objects.filter(user_id=user_id).values_list(
+        'unread_notification_count', flat=True
+    ).first()
+    summary = {
+        'unread_count': count or 0,
+        'latest': list(Notification.objects.filter(
+            customer_id=user_id, is_read=False
+        ).order_by('-created_at')[:LATEST_COUNT]) if count else [],
+    }
+    cache.set(summary_key(user_id), summary, SUMMARY_TIMEOUT)
+    return summary
+
+
+def invalidate(user_id):
+    """Drop the summary now and again on commit, so a copy rebuilt from pre-commit rows is discarded"""
+    cache.delete(summary_key(user_id))
+    transaction.on_commit(lambda: cache.delete(summary_key(user_id)))
+    bump_now_and_on_commit(NOTIFICATIONS_SCOPE, user_id)
+
+
+def _adjust_unread(user_id, delta):
+    CustomerProfile.objects.filter(user_id=user_id).update(
+        unread_notification_count=Greatest(F('unread_notification_count') + delta, Value(0))
+    )
+    invalidate(user_id)
+
+
+def count_created(created):
+    """Unread counts and summaries for notifications added with bulk_create, which sends no post_save"""
+    for user_id, count in Counter(notification.customer_id for notification in created
+                                  if not notification.is_read).items():
+        _adjust_unread(user_id, count)
+
+
+def mark_all_as_read(user):
+    """Mark every unread notification of user as read; returns how many were marked"""
+    marked = Notification.objects.filter(customer=user, is_read=False).update(is_read=True, read_at=timezone.now())
+    CustomerProfile.objects.filter(user=user).update(unread_notification_count=0)
+    invalidate(user.pk)
+    return marked
+
+
+@receiver(post_init, sender=Notification)
+def remember_read_state(sender, instance, **kwargs):
+    instance._was_unread = instance.__dict__.get('is_read') is False
+
+
+@receiver(post_save, sender=Notification)
+def count_unread_on_save(sender, instance, created, **kwargs):
+    is_unread = not instance.is_read
+    delta = int(is_unread) - int(not created and instance._was_unread)
+    if delta:
+        _adjust_unread(instance.customer_id, delta)
+    instance._was_unread = is_unread
+
+
+@receiver(post_delete, sender=Notification)
+def count_unread_on_delete(sender, instance, **kwargs):
+    if not instance.is_read:
+        _adjust_unread(instance.customer_id, -1)
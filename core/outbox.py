@@ -0,0 +1,144 @@
+"""
+Transactional outbox for order side effects
+Order transitions record what has to follow them (customer notifications, cashier sale
+transactions) as OutboxEvent rows in the same transaction as the status write, so the
+request only pays for that write. The run_outbox_dispatcher command drains pending events in
+batches: rows are bulk-created, unread counters are adjusted once per customer and report
+caches are invalidated once per batch. An event is marked processed in the transaction that
+carries it out, so a crash leaves it pending rather than half done.
+"""
+import logging
+from collections import defaultdict
+from datetime import timedelta
+from decimal import Decimal
+
+from django.db.models import F
+from django.utils import timezone
+
+from . import db_writes, events, notifications
+from .models import CashierTransaction, Notification, OutboxEvent
+
+logger = logging.getLogger(__name__)
+
+
+NOTIFY_CUSTOMER = 'notify_customer'
+RECORD_SALE = 'record_sale'
+
+BATCH_SIZE = 200
+# Failed attempts after which an event is left for someone to look at
+MAX_ATTEMPTS = 5
+# Processed events are kept this long for troubleshooting
+RETENTION = timedelta(days=7)
+
+
+def enqueue(kind, **payload):
+    OutboxEvent.objects.create(kind=kind, payload=payload)
+
+
+def notify_customer(order, notification_type, title, message, reason=''):
+    """Queue a notification about order for its customer (orders without one are skipped)"""
+    if order.customer_id:
+        enqueue(NOTIFY_CUSTOMER, customer_id=order.customer_id, order_id=order.id,
+                notification_type=notification_type, title=title, message=message, reason=reason)
+
+
+def record_sale(order, cashier=None):
+    """Queue the cashier transaction for a delivered order, credited to cashier or order.processed_by"""
+    cashier_id = cashier.pk if cashier is not None else order.processed_by_id
+    if cashier_id is not None:
+        enqueue(RECORD_SALE, order_id=order.id, cashier_id=cashier_id, customer_id=order.customer_id,
+                amount=str(order.total_amount))
+
+
+def _notify_customers(payloads):
+    created = Notification.objects.bulk_create([
+        Notification(
+            customer_id=payload['customer_id'],
+            order_id=payload['order_id'],
+            notification_type=payload['notification_type'],
+            title=payload['title'],
+            message=payload['message'],
+            reason=payload['reason'],
+        )
+        for payload in payloads
+    ])
+    notifications.count_created(created)
+    events.publish_notifications(created)
+
+
+def _record_sales(payloads):
+    # One transaction per order, however often its delivery was queued
+    recorded = set(CashierTransaction.objects.filter(
+        order_id__in=[payload['order_id'] for payload in payloads], transaction_type='order'
+    ).values_list('order_id', flat=True))
+    sales = []
+    for payload in payloads:
+        if payload['order_id'] in recorded:
+            continue
+        recorded.add(payload['order_id'])
+        sales.append(CashierTransaction(
+            cashier_id=payload['cashier_id'],
+            order_id=payload['order_id'],
+            transaction_type='order',
+            amount=Decimal(payload['amount']),
+            payment_method='cash',
+            customer_id=payload['customer_id'],
+        ))
+    if sales:
+        CashierTransaction.objects.bulk_create(sales)
+
+
+HANDLERS = {
+    NOTIFY_CUSTOMER: _notify_customers,
+    RECORD_SALE: _record_sales,
+}
+
+
+def pending():
+    return OutboxEvent.objects.filter(processed_at__isnull=True, attempts__lt=MAX_ATTEMPTS).order_by('id')
+
+
+def _process(batch):
+    by_kind = defaultdict(list)
+    for event in batch:
+        by_kind[event.kind].append(event.payload)
+    with db_writes.atomic():
+        for kind, payloads in by_kind.items():
+            HANDLERS[kind](payloads)
+        OutboxEvent.objects.filter(id__in=[event.id for event in batch]).update(processed_at=timezone.now())
+
+
+def dispatch(batch_size=BATCH_SIZE):
+    """
+    Carry out one batch of pending events; returns how many were taken
+    A failed batch is retried one event at a time, so only the failing events are held back.
+    Run a single dispatcher per database: batches are claimed by reading them.
+    """
+    batch = list(pending()[:batch_size])
+    if not batch:
+        return 0
+    try:
+        _process(batch)
+    except Exception:
+        logger.exception("Outbox batch of %d event(s) failed, retrying them one by one", len(batch))
+        for event in batch:
+            try:
+                _process([event])
+            except Exception as exc:
+                logger.exception("Outbox event %s failed", event)
+                OutboxEvent.objects.filter(id=event.id).update(attempts=F('attempts') + 1, last_error=str(exc))
+    return len(batch)
+
+
+def drain(batch_size=BATCH_SIZE):
+    """Dispatch batches until nothing is pending; returns how many events were processed"""
+    total = 0
+    while processed := dispatch(batch_size):
+        total += processed
+    return total
+
+
+def prune():
+    """Delete processed events older than RETENTION; returns how many were deleted"""
+    deleted, _ = OutboxEvent.objects.filter(processed_at__lt=timezone.now() - RETENTION).delete()
+    return deleted
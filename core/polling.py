@@ -0,0 +1,115 @@
+"""
+Adaptive polling governor
+Polling endpoints get an X-Poll-Interval hint computed from the endpoint's cost, how often
+its recent polls actually returned new content, and how long SQLite writers are currently
+waiting on the database lock. When those waits get too long, polls are shed with 429 and a
+Retry-After, before the view runs, so the writes that matter get the lock. Measurements are
+per process and decay with time, so a quiet spell restores the normal intervals.
+"""
+import threading
+import time
+
+from django.db import OperationalError
+
+
+# Base interval in seconds for each polled endpoint (by URL name), longer for costlier renders
+POLL_ENDPOINTS = {
+    'get_unread_notifications_count': 30,
+    'refresh_dashboard_orders': 30,
+    'refresh_order_status': 30,
+    'refresh_dashboard_stats': 30,
+    'refresh_order_table': 45,
+    'refresh_recent_activity': 60,
+    'refresh_inventory_dashboard': 60,
+    'refresh_stock_movements': 60,
+    'poll_updates': 30,
+}
+
+MIN_INTERVAL = 10
+MAX_INTERVAL = 300
+
+# Polls that keep coming back unchanged stretch up to this multiple of the base interval
+QUIET_STRETCH = 3
+
+# Smoothed write statement latency (seconds) that doubles intervals, and that starts shedding
+LOCK_WAIT_SLOW = 0.05
+LOCK_WAIT_SHED = 0.5
+# Latency charged for a write that failed with "database is locked"
+LOCKED_PENALTY = 5.0
+
+# Weight of each new sample, and seconds for an old measurement to lose half its weight
+SMOOTHING = 0.2
+HALF_LIFE = 10.0
+
+WRITE_STATEMENTS = ('INSERT', 'UPDATE', 'DELETE', 'REPLACE', 'BEGIN', 'COMMIT')
+
+
+class _Decaying:
+    """Exponentially smoothed value that also relaxes toward a resting value over time"""
+
+    def __init__(self, rest):
+        self.rest = rest
+        self.value = rest
+        self.updated = time.monotonic()
+
+    def get(self, now):
+        weight = 0.5 ** ((now - self.updated) / HALF_LIFE)
+        return self.rest + (self.value - self.rest) * weight
+
+    def add(self, sample, now):
+        current = self.get(now)
+        self.value = current + SMOOTHING * (sample - current)
+        self.updated = now
+
+
+class Governor:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._lock_wait = _Decaying(0.0)
+        # Share of recent polls per endpoint that returned new content (1.0 until measured)
+        self._change_rate = {}
+
+    def lock_wait(self):
+        with self._lock:
+            return self._lock_wait.get(time.monotonic())
+
+    def observe_write(self, seconds):
+        with self._lock:
+            self._lock_wait.add(seconds, time.monotonic())
+
+    def observe_poll(self, endpoint, changed):
+        with self._lock:
+            rate = self._change_rate.setdefault(endpoint, _Decaying(1.0))
+            rate.add(1.0 if changed else 0.0, time.monotonic())
+
+    def should_shed(self):
+        return self.lock_wait() >= LOCK_WAIT_SHED
+
+    def interval(self, endpoint):
+        """Seconds the client should wait before polling endpoint again"""
+        now = time.monotonic()
+        with self._lock:
+            rate = self._change_rate.get(endpoint)
+            change_rate = rate.get(now) if rate else 1.0
+            lock_wait = self._lock_wait.get(now)
+        quiet = 1 + QUIET_STRETCH * (1 - change_rate)
+        pressure = 1 + lock_wait / LOCK_WAIT_SLOW
+        seconds = POLL_ENDPOINTS[endpoint] * quiet * pressure
+        return int(min(MAX_INTERVAL, max(MIN_INTERVAL, seconds)))
+
+    def timed_execute(self, execute, sql, params, many, context):
+        """connection.execute_wrapper hook timing write statements, where SQLite lock waits show up"""
+        if not sql.lstrip()[:7].upper().startswith(WRITE_STATEMENTS):
+            return execute(sql, params, many, context)
+        started = time.monotonic()
+        try:
+            result = execute(sql, params, many, context)
+        except OperationalError as exc:
+            if 'locked' in str(exc):
+                self.observe_write(LOCKED_PENALTY)
+            raise
+        self.observe_write(time.monotonic() - started)
+        return result
+
+
+governor = Governor()
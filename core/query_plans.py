@@ -0,0 +1,220 @@
+"""
+Query plan capture, index advice and plan regression checks
+capture() requests a list of pages with the test client and records every SELECT they
+run. Each statement (literals replaced, so repeated lookups collapse into one) is run through
+EXPLAIN QUERY PLAN. Full table scans and temporary B-tree sorts are flagged, and
+suggest_index() proposes a composite index from the statement's equality filters, range
+filters and ORDER BY. Plans can be saved as a JSON snapshot; diff() compares a later run
+against it and reports statements that searched an index before and scan their table now.
+Used by optimize_performance --advise-indexes / --save-plans / --check-plans.
+"""
+import hashlib
+import json
+import re
+from collections import OrderedDict
+
+from django.apps import apps
+from django.conf import settings
+from django.core.cache import cache
+from django.db import DEFAULT_DB_ALIAS, connections
+from django.test import Client
+from django.test.utils import CaptureQueriesContext, override_settings
+from django.urls import reverse
+
+# Pages whose queries are checked unless settings.QUERY_PLAN_URLS lists others.
+# Entries are URL names or paths (optionally with a query string).
+DEFAULT_URLS = [
+    'core:dealer_dashboard',
+    'core:order_management',
+    'core:order_management?status=pending',
+    'core:reports_dashboard',
+    'core:sales_report',
+    'core:stock_report',
+    'core:inventory_reports',
+    'core:delivery_log',
+    'core:stock_in_list',
+    'core:stock_out_list',
+    'core:cashier_transactions',
+    'core:cashier_reports',
+]
+
+_STRING = re.compile(r"'(?:[^']|'')*'")
+_NUMBER = re.compile(r'\b\d+(?:\.\d+)?\b')
+_IN_LIST = re.compile(r'IN \((?:\?, )*\?\)')
+_SCAN = re.compile(r'^SCAN (\w+)(.*)$')
+_TEMP_BTREE = re.compile(r'USE TEMP B-TREE FOR (.+)$')
+
+
+def get_urls():
+    return list(getattr(settings, 'QUERY_PLAN_URLS', DEFAULT_URLS))
+
+
+def snapshot_path():
+    return str(getattr(settings, 'QUERY_PLAN_SNAPSHOT', settings.BASE_DIR / 'query_plans.json'))
+
+
+def resolve(entry):
+    """Path for a URL name ('core:sales_report?status=x') or a path, which is returned as is"""
+    if entry.startswith('/'):
+        return entry
+    name, _, query = entry.partition('?')
+    return reverse(name) + (f'?{query}' if query else '')
+
+
+def fingerprint(sql):
+    """sql with its literals replaced by ?, so one lookup repeated with other values matches itself"""
+    normalized = _NUMBER.sub('?', _STRING.sub('?', sql))
+    return _IN_LIST.sub('IN (...)', normalized)
+
+
+def statement_key(url, sql):
+    return f'{url} {hashlib.sha1(fingerprint(sql).encode()).hexdigest()[:12]}'
+
+
+def capture(urls, user):
+    """[(url, sql)] for every SELECT the pages run against the live database when requested as user"""
+    # Report views read the live database too, so their plans reflect its indexes
+    live_reports = {**getattr(settings, 'REPORTING_SNAPSHOT', {}), 'max_age': -1}
+    # A private, empty cache: every run computes (and so runs the queries of) each cached block
+    cold_cache = {'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache', 'LOCATION': 'query-plans'}}
+    captured = []
+    with override_settings(ALLOWED_HOSTS=['*'], REPORTING_SNAPSHOT=live_reports, CACHES=cold_cache):
+        cache.clear()
+        client = Client()
+        client.force_login(user)
+        try:
+            for url in urls:
+                with CaptureQueriesContext(connections[DEFAULT_DB_ALIAS]) as context:
+                    client.get(url)
+                captured.extend(
+                    (url, query['sql']) for query in context.captured_queries
+                    if query['sql'].lstrip().upper().startswith('SELECT')
+                )
+        finally:
+            client.logout()
+    return captured
+
+
+def explain(sql):
+    """EXPLAIN QUERY PLAN detail lines for sql"""
+    with connections[DEFAULT_DB_ALIAS].cursor() as cursor:
+        cursor.execute(f'EXPLAIN QUERY PLAN {sql}')
+        return [row[-1] for row in cursor.fetchall()]
+
+
+def analyse(plan, tables):
+    """Tables plan reads in full (no index) and what it sorts in temporary B-trees"""
+    scans, temp_btrees = [], []
+    for line in plan:
+        scan = _SCAN.match(line)
+        if scan and scan.group(1) in tables and 'INDEX' not in scan.group(2):
+            scans.append(scan.group(1))
+        temp = _TEMP_BTREE.search(line)
+        if temp:
+            temp_btrees.append(temp.group(1))
+    return scans, temp_btrees
+
+
+def _models_by_table():
+    return {model._meta.db_table: model for model in apps.get_models()}
+
+
+def _column_fields(model):
+    return {field.column: field.name for field in model._meta.concrete_fields}
+
+
+def suggest_index(sql, table):
+    """
+    Model field names (descending ones prefixed with -) for a composite index serving sql's
+    access to table: equality filters first, then one range filter or the ORDER BY. None if
+    the statement does not filter or sort on table's columns.
+    """
+    column = rf'"{table}"\."(\w+)"'
+    where = sql.split(' WHERE ', 1)[1] if ' WHERE ' in sql else ''
+    where, _, order_by = where.partition(' ORDER BY ')
+    if not where and ' ORDER BY ' in sql:
+        order_by = sql.split(' ORDER BY ', 1)[1]
+    equal = re.findall(rf'{column} (?:= |IN \(|IS NULL)', where)
+    # Comparisons with another column, e.g. current_stock <= minimum_stock, cannot use a range search
+    ranged = re.findall(rf'{column} (?:>=|<=|>|<|BETWEEN) (?![("])', where)
+    ordered = re.findall(rf'{column}( DESC| ASC)?', re.split(r' LIMIT | OFFSET ', order_by)[0])
+
+    columns = list(OrderedDict.fromkeys(equal))
+    if ranged:
+        columns += [c for c in ranged[:1] if c not in columns]
+    else:
+        columns += [f'-{c}' if direction == ' DESC' else c for c, direction in ordered if c not in columns]
+    if not columns:
+        return None
+    model = _models_by_table().get(table)
+    fields = _column_fields(model) if model else {}
+    return [('-' if c.startswith('-') else '') + fields.get(c.lstrip('-'), c.lstrip('-')) for c in columns]
+
+
+def existing_index(table, fields):
+    """Name of an index on table whose leading columns are fields, or None"""
+    model = _models_by_table().get(table)
+    if model is None:
+        return None
+    wanted = [model._meta.get_field(name.lstrip('-')).column for name in fields]
+    connection = connections[DEFAULT_DB_ALIAS]
+    with connection.cursor() as cursor:
+        constraints = connection.introspection.get_constraints(cursor, table)
+    for name, constraint in constraints.items():
+        if constraint['index'] and constraint['columns'][:len(wanted)] == wanted:
+            return name
+    return None
+
+
+def collect(urls, user):
+    """Plans of the distinct statements the pages run, keyed by statement_key()"""
+    tables = set(connections[DEFAULT_DB_ALIAS].introspection.table_names())
+    plans = {}
+    for url, sql in capture(urls, user):
+        key = statement_key(url, sql)
+        if key in plans:
+            plans[key]['count'] += 1
+            continue
+        try:
+            plan = explain(sql)
+        except Exception as exc:
+            plan = [f'EXPLAIN failed: {exc}']
+        scans, temp_btrees = analyse(plan, tables)
+        plans[key] = {
+            'url': url,
+            'sql': fingerprint(sql),
+            'plan': plan,
+            'scans': scans,
+            'temp_btrees': temp_btrees,
+            'count': 1,
+            'suggestions': {table: suggest_index(sql, table) for table in scans},
+        }
+    return plans
+
+
+def save(plans, path):
+    with open(path, 'w') as handle:
+        json.dump({key: {k: v for k, v in entry.items() if k != 'suggestions'} for key, entry in plans.items()},
+                  handle, indent=2, sort_keys=True)
+
+
+def load(path):
+    with open(path) as handle:
+        return json.load(handle)
+
+
+def diff(previous, current):
+    """
+    (regressions, missing) between two plan sets: statements that now scan a table they did
+    not scan before, and snapshot statements the pages no longer run
+    """
+    regressions = []
+    for key, entry in current.items():
+        before = previous.get(key)
+        if before is None:
+            continue
+        new_scans = sorted(set(entry['scans']) - set(before['scans']))
+        if new_scans:
+            regressions.append((key, entry, new_scans))
+    missing = sorted(set(previous) - set(current))
+    return regressions, missing
@@ -0,0 +1,119 @@
+"""
+Read-only reporting snapshot of the main database
+The refresh_reporting_snapshot command copies the live database with SQLite's online backup
+API into a separate file, swapped into place atomically. Report and PDF views decorated with
+from_snapshot read every model from that copy through ReportingRouter while the snapshot is
+younger than max_age, so long report scans never hold the live file. Writes always go to the
+live database, and a missing or stale snapshot falls back to live reads.
+"""
+import contextvars
+import functools
+import os
+import sqlite3
+import time
+from datetime import datetime, timezone as dt_timezone
+
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS, connections
+
+SNAPSHOT_ALIAS = 'reporting'
+
+DEFAULTS = {
+    # Seconds between refreshes when the command runs continuously
+    'interval': 5 * 60,
+    # Snapshots older than this are ignored and reports read the live database
+    'max_age': 15 * 60,
+}
+
+# Database alias reads are sent to in the current request (None: the router does not interfere)
+_read_alias = contextvars.ContextVar('reporting_read_alias', default=None)
+
+
+def get_options():
+    return {**DEFAULTS, **getattr(settings, 'REPORTING_SNAPSHOT', {})}
+
+
+def snapshot_path():
+    """Filesystem path of the snapshot, from the reporting alias' NAME (a file:...?mode=ro URI)"""
+    name = str(settings.DATABASES[SNAPSHOT_ALIAS]['NAME'])
+    if name.startswith('file:'):
+        name = name[len('file:'):].split('?', 1)[0]
+    return name
+
+
+def snapshot_info():
+    """{'taken_at', 'age'} for the current snapshot file, or None when there is none"""
+    try:
+        taken = os.stat(snapshot_path()).st_mtime
+    except OSError:
+        return None
+    return {
+        'taken_at': datetime.fromtimestamp(taken, tz=dt_timezone.utc),
+        'age': max(0.0, time.time() - taken),
+        'interval_minutes': get_options()['interval'] // 60,
+    }
+
+
+def refresh_snapshot():
+    """Copy the live database into a new snapshot file and swap it in; returns seconds taken"""
+    started = time.monotonic()
+    path = snapshot_path()
+    temporary = f'{path}.tmp'
+    if os.path.exists(temporary):
+        os.remove(temporary)
+    source = sqlite3.connect(str(settings.DATABASES[DEFAULT_DB_ALIAS]['NAME']))
+    target = sqlite3.connect(temporary)
+    try:
+        # One step under a single read transaction: in WAL mode writers carry on meanwhile
+        source.backup(target)
+        # A rollback-journal copy can be opened read-only without a -shm file
+        target.execute('PRAGMA journal_mode=DELETE')
+    finally:
+        target.close()
+        source.close()
+    os.replace(temporary, path)
+    # Readers still holding the previous file keep their snapshot; new connections get this one
+    connections[SNAPSHOT_ALIAS].close()
+    return time.monotonic() - started
+
+
+def from_snapshot(view_func):
+    """
+    Serve the view's reads from the reporting snapshot while it is fresh
+    request.reporting_snapshot holds the snapshot's freshness, or None for live data.
+    """
+    @functools.wraps(view_func)
+    def wrapper(request, *args, **kwargs):
+        info = snapshot_info()
+        if info is None or info['age'] > get_options()['max_age']:
+            request.reporting_snapshot = None
+            return view_func(request, *args, **kwargs)
+        request.reporting_snapshot = info
+        token = _read_alias.set(SNAPSHOT_ALIAS)
+        try:
+            return view_func(request, *args, **kwargs)
+        finally:
+            _read_alias.reset(token)
+    return wrapper
+
+
+def active_snapshot():
+    """Alias reads currently go to, when a view is reading from the snapshot"""
+    return _read_alias.get()
+
+
+class ReportingRouter:
+    """Send reads to the snapshot inside from_snapshot views; everything else stays on default"""
+
+    def db_for_read(self, model, **hints):
+        return _read_alias.get()
+
+    def db_for_write(self, model, **hints):
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        return {obj1._state.db, obj2._state.db} <= {DEFAULT_DB_ALIAS, SNAPSHOT_ALIAS, None}
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        # The snapshot is a byte copy of the migrated live database
+        return db != SNAPSHOT_ALIAS
@@ -0,0 +1,254 @@
+"""
+Retention jobs for expired sessions, archived notifications, old live change events,
+reviewed registration ID documents and growing log files
+Read notifications leave the notification table only through the archive (core.archive), at
+its horizon; this job then drops their archived copies once they pass a second, later one.
+Rows are deleted in small batches picked through an index, each batch in its own short
+write transaction followed by a pause, so other writers never wait long for SQLite's write
+lock. Each job reports the rows it removed and the bytes it reclaimed: file sizes for
+documents and logs, pages returned to the database's free list for tables (SQLite reuses
+them for new rows instead of growing the file).
+
+The prune command runs the jobs on demand or from cron. With RETENTION['interval'] set, a
+request_finished hook also starts them in a background thread at most once per interval
+across all processes sharing the cache.
+"""
+import glob
+import logging
+import os
+import threading
+import time
+from datetime import timedelta
+
+from django.conf import settings
+from django.contrib.sessions.models import Session
+from django.core.cache import cache
+from django.core.signals import request_finished
+from django.db import DEFAULT_DB_ALIAS, connections
+from django.dispatch import receiver
+from django.utils import timezone
+
+from . import db_writes, events
+from .models import ArchivedRecord, PendingRegistration
+
+logger = logging.getLogger(__name__)
+
+
+DEFAULTS = {
+    # Rows deleted per write transaction, and seconds to pause between transactions
+    'batch_size': 500,
+    'pause': 0.1,
+    # Archived notifications created more than this many days ago are deleted (None keeps them);
+    # meant to be well past the ARCHIVE horizon, which is when read notifications are archived
+    'archived_notification_days': 3 * 365,
+    # ID documents of approved or rejected registrations older than this many days are deleted
+    'registration_days': 30,
+    # Log files (globs relative to BASE_DIR) larger than log_max_bytes keep only their last log_keep_bytes
+    'log_files': ['logs/*.log', '*.log'],
+    'log_max_bytes': 5 * 1024 * 1024,
+    'log_keep_bytes': 1024 * 1024,
+    # Seconds between runs started from requests (0 disables the in-process schedule)
+    'interval': 0,
+}
+
+LOCK_KEY = 'retention:running'
+
+_lock = threading.Lock()
+_last_run = time.monotonic()
+
+
+def get_options():
+    return {**DEFAULTS, **getattr(settings, 'RETENTION', {})}
+
+
+def _days_ago(days):
+    return timezone.now() - timedelta(days=days)
+
+
+def _free_bytes():
+    """Bytes in pages the database file holds free for reuse"""
+    with connections[DEFAULT_DB_ALIAS].cursor() as cursor:
+        cursor.execute('PRAGMA freelist_count')
+        free_pages = cursor.fetchone()[0]
+        cursor.execute('PRAGMA page_size')
+        page_size = cursor.fetchone()[0]
+    return free_pages * page_size
+
+
+def delete_in_batches(queryset, order_by, options):
+    """Delete queryset's rows batch_size at a time in order_by order; returns how many were deleted"""
+    model = queryset.model
+    deleted = 0
+    while True:
+        with db_writes.atomic():
+            pks = list(queryset.order_by(order_by).values_list('pk', flat=True)[:options['batch_size']])
+            if pks:
+                model.objects.filter(pk__in=pks).delete()
+        deleted += len(pks)
+        if len(pks) < options['batch_size']:
+            return deleted
+        time.sleep(options['pause'])
+
+
+def expired_sessions():
+    return Session.objects.filter(expire_date__lt=timezone.now())
+
+
+def old_archived_notifications(options):
+    return ArchivedRecord.objects.filter(
+        kind='notification', occurred_at__lt=_days_ago(options['archived_notification_days'])
+    )
+
+
+def reviewed_registration_documents(options):
+    return PendingRegistration.objects.filter(
+        status__in=['approved', 'rejected'], created_at__lt=_days_ago(options['registration_days'])
+    ).exclude(id_document='')
+
+
+def _prune_table(queryset, order_by, options, dry_run):
+    if dry_run:
+        return queryset.count(), 0
+    free = _free_bytes()
+    rows = delete_in_batches(queryset, order_by, options)
+    return rows, max(0, _free_bytes() - free)
+
+
+def prune_sessions(options, dry_run=False):
+    """Expired sessions; the cache copies of cached_db sessions expire on their own"""
+    return _prune_table(expired_sessions(), 'expire_date', options, dry_run)
+
+
+def prune_notifications(options, dry_run=False):
+    """Archived notifications older than archived_notification_days; the notification table is left to the archive"""
+    if options['archived_notification_days'] is None:
+        return 0, 0
+    return _prune_table(old_archived_notifications(options), 'occurred_at', options, dry_run)
+
+
+def prune_change_events(options, dry_run=False):
+    """Live change feed events older than events.RETENTION, including those no broker was left to prune"""
+    return _prune_table(events.old_events(), 'id', options, dry_run)
+
+
+def prune_registration_documents(options, dry_run=False):
+    """ID document files of reviewed registrations; the registration rows stay as the review record"""
+    if options['registration_days'] is None:
+        return 0, 0
+    registrations = reviewed_registration_documents(options)
+    if dry_run:
+        return registrations.count(), 0
+    rows = reclaimed = 0
+    while True:
+        batch = list(registrations.order_by('created_at')[:options['batch_size']])
+        for registration in batch:
+            document = registration.id_document
+            try:
+                reclaimed += document.size
+                document.storage.delete(document.name)
+            except OSError:
+                # Already gone from storage: only the reference is left to clear
+                pass
+        with db_writes.atomic():
+            PendingRegistration.objects.filter(pk__in=[registration.pk for registration in batch]).update(id_document='')
+        rows += len(batch)
+        if len(batch) < options['batch_size']:
+            return rows, reclaimed
+        time.sleep(options['pause'])
+
+
+def log_paths(options):
+    paths = set()
+    for pattern in options['log_files']:
+        paths.update(glob.glob(os.path.join(str(settings.BASE_DIR), pattern)))
+    return sorted(paths)
+
+
+def trim_log(path, keep_bytes):
+    """
+    Cut path down to its last keep_bytes (from the first full line), in place; returns bytes removed
+    The file is rewritten rather than replaced, so handlers appending to it keep writing to it.
+    """
+    with open(path, 'r+b') as handle:
+        size = handle.seek(0, os.SEEK_END)
+        if size <= keep_bytes:
+            return 0
+        handle.seek(size - keep_bytes)
+        tail = handle.read()
+        newline = tail.find(b'\n')
+        if newline != -1:
+            tail = tail[newline + 1:]
+        handle.seek(0)
+        handle.write(tail)
+        handle.truncate()
+    return size - len(tail)
+
+
+def trim_logs(options, dry_run=False):
+    """Log files over log_max_bytes, each cut down to its last log_keep_bytes"""
+    rows = reclaimed = 0
+    for path in log_paths(options):
+        try:
+            size = os.path.getsize(path)
+            if size <= options['log_max_bytes']:
+                continue
+            removed = size - options['log_keep_bytes'] if dry_run else trim_log(path, options['log_keep_bytes'])
+        except OSError:
+            logger.warning("Could not trim log file %s", path, exc_info=True)
+            continue
+        rows += 1
+        reclaimed += removed
+    return rows, reclaimed
+
+
+JOBS = {
+    'sessions': prune_sessions,
+    'notifications': prune_notifications,
+    'change_events': prune_change_events,
+    'registration_documents': prune_registration_documents,
+    'logs': trim_logs,
+}
+
+
+def run(jobs=None, dry_run=False, **overrides):
+    """
+    Run the named jobs (default: all) with settings.RETENTION plus overrides
+    Returns {job: {'rows', 'bytes'}}: rows (or log files) removed and bytes reclaimed; a dry run only counts rows.
+    """
+    options = {**get_options(), **overrides}
+    results = {}
+    for name in jobs or JOBS:
+        rows, reclaimed = JOBS[name](options, dry_run=dry_run)
+        results[name] = {'rows': rows, 'bytes': reclaimed}
+    if not dry_run:
+        logger.info("Retention: %s", results)
+    return results
+
+
+def _run_in_background():
+    try:
+        run()
+    except Exception:
+        logger.exception("Scheduled retention run failed")
+    finally:
+        # This thread's own connections; request threads keep theirs
+        connections.close_all()
+
+
+def _due(interval):
+    global _last_run
+    if not interval:
+        return False
+    with _lock:
+        if time.monotonic() - _last_run < interval:
+            return False
+        _last_run = time.monotonic()
+    # One process per interval: the first to claim the key runs, the others wait for the next interval
+    return cache.add(LOCK_KEY, True, interval)
+
+
+@receiver(request_finished)
+def run_when_due(sender, **kwargs):
+    interval = get_options()['interval']
+    if _due(interval):
+        threading.Thread(target=_run_in_background, name='retention', daemon=True).start()
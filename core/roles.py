@@ -0,0 +1,122 @@
+"""
+Per-session role resolution
+A user's roles and profile ids are resolved with one query and kept in the session, tagged
+with the user's 'roles' data version. RoleMiddleware attaches them as request.roles (and
+user.roles). Saving a Cashier, CustomerProfile or User bumps that version, so the next
+request re-resolves instead of each permission check loading the one-to-one profiles.
+"""
+from typing import NamedTuple, Optional
+
+from django.contrib.auth.models import User
+from django.contrib.auth.signals import user_logged_in
+from django.db import DEFAULT_DB_ALIAS
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from .data_versions import bump_now_and_on_commit, get_version
+from .models import Cashier, CustomerProfile
+
+
+SESSION_KEY = '_core_roles'
+ROLES_SCOPE = 'roles'
+
+
+class Roles(NamedTuple):
+    """What the current user is allowed to act as"""
+    user_id: Optional[int] = None
+    is_staff: bool = False
+    is_superuser: bool = False
+    cashier_id: Optional[int] = None
+    cashier_active: bool = False
+    customer_profile_id: Optional[int] = None
+    version: Optional[int] = None
+
+    @property
+    def is_authenticated(self):
+        return self.user_id is not None
+
+    @property
+    def has_cashier_profile(self):
+        return self.cashier_id is not None
+
+    @property
+    def is_cashier(self):
+        """Active cashier"""
+        return self.cashier_id is not None and self.cashier_active
+
+    @property
+    def is_dealer(self):
+        return self.is_staff
+
+    @property
+    def is_admin(self):
+        """Superuser, or staff who are not cashiers"""
+        return self.is_superuser or (self.is_staff and self.cashier_id is None)
+
+    @property
+    def is_customer(self):
+        return self.customer_profile_id is not None
+
+
+ANONYMOUS = Roles()
+
+
+def resolve(user, version=None):
+    """Roles for user from one query joining both profiles"""
+    if not user.is_authenticated:
+        return ANONYMOUS
+    row = User.objects.using(DEFAULT_DB_ALIAS).filter(pk=user.pk).values_list(
+        'is_staff', 'is_superuser', 'cashier_profile__id', 'cashier_profile__is_active', 'customer_profile__id'
+    ).first()
+    if row is None:
+        return ANONYMOUS
+    is_staff, is_superuser, cashier_id, cashier_active, customer_profile_id = row
+    return Roles(user.pk, is_staff, is_superuser, cashier_id, bool(cashier_active), customer_profile_id, version)
+
+
+def for_request(request, user=None):
+    """Session-cached roles for request.user, re-resolved when the user's roles version moved"""
+    user = user or request.user
+    if not user.is_authenticated:
+        return ANONYMOUS
+    version = get_version(ROLES_SCOPE, user.pk)
+    stored = request.session.get(SESSION_KEY)
+    if stored:
+        roles = Roles(**stored)
+        if roles.user_id == user.pk and roles.version == version:
+            return roles
+    roles = resolve(user, version)
+    request.session[SESSION_KEY] = roles._asdict()
+    return roles
+
+
+def for_user(user):
+    """Roles attached by RoleMiddleware, resolved directly for users seen outside a request"""
+    roles = getattr(user, 'roles', None)
+    return roles if roles is not None else resolve(user)
+
+
+def invalidate(user_id):
+    bump_now_and_on_commit(ROLES_SCOPE, user_id)
+
+
+@receiver(user_logged_in)
+def resolve_on_login(sender, request, user, **kwargs):
+    if request is not None and hasattr(request, 'session'):
+        user.roles = request.roles = for_request(request, user)
+
+
+@receiver(post_save, sender=Cashier)
+@receiver(post_delete, sender=Cashier)
+@receiver(post_save, sender=CustomerProfile)
+@receiver(post_delete, sender=CustomerProfile)
+def invalidate_on_profile_change(sender, instance, **kwargs):
+    invalidate(instance.user_id)
+
+
+@receiver(post_save, sender=User)
+def invalidate_on_user_change(sender, instance, created, update_fields=None, **kwargs):
+    # Logins only touch last_login
+    if not created and update_fields and set(update_fields) <= {'last_login'}:
+        return
+    invalidate(instance.pk)
@@ -0,0 +1,47 @@
+from django import template
+
+from core import fragment_cache
+
+register = template.Library()
+
+
+class FragmentNode(template.Node):
+    def __init__(self, nodelist, name, vary_on, timeout):
+        self.nodelist = nodelist
+        self.name = name
+        self.vary_on = vary_on
+        self.timeout = timeout
+
+    def render(self, context):
+        timeout = self.timeout.resolve(context) if self.timeout is not None else fragment_cache.DEFAULT_TIMEOUT
+        return fragment_cache.get_or_render(
+            self.name,
+            [var.resolve(context) for var in self.vary_on],
+            lambda: self.nodelist.render(context),
+            timeout=int(timeout),
+            request=context.get('request'),
+        )
+
+
+@register.tag('fragment')
+def do_fragment(parser, token):
+    """
+    Cache the enclosed markup under a name and the values it depends on
+    {% fragment "order_row" order.id order.updated_at %}...{% endfragment %}
+    {% fragment "recent_activity" activity_version timeout=60 %}...{% endfragment %}
+    Never put {% csrf_token %} inside a fragment; cached markup is shared between users.
+    """
+    bits = token.split_contents()
+    if len(bits) < 2:
+        raise template.TemplateSyntaxError(f"'{bits[0]}' requires a fragment name")
+    name = bits[1].strip('"\'')
+    timeout = None
+    vary_on = []
+    for bit in bits[2:]:
+        if bit.startswith('timeout='):
+            timeout = parser.compile_filter(bit[len('timeout='):])
+        else:
+            vary_on.append(parser.compile_filter(bit))
+    nodelist = parser.parse(('endfragment',))
+    parser.delete_first_token()
+    return FragmentNode(nodelist, name, vary_on, timeout)
@@ -1,10 +1,62 @@
-from django.test import TestCase, Client
+import json
+import os
+import shutil
+import tempfile
+import threading
+import time as time_module
+import uuid
+from datetime import date, datetime as datetime_type, timedelta, timezone as dt_timezone
+from decimal import Decimal
+from io import StringIO
+from unittest import mock
+
+from asgiref.sync import async_to_sync, iscoroutinefunction, sync_to_async
 from django.contrib.auth.models import User
+from django.contrib.sessions.models import Session
+from django.core.cache import cache
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.db import OperationalError, connection
+from django.db.transaction import Atomic
+from django.template import Context, Template
+from django.test import AsyncClient, Client, RequestFactory, TestCase, TransactionTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
 from django.urls import reverse
-from django.contrib.auth import authenticate
-from .models import CustomerProfile
-from .forms import CustomerRegistrationForm, CustomerLoginForm, CustomerProfileForm, UserUpdateForm
-import json
+from django.utils import timezone
+
+from . import (
+    archive, caching, catalogue, dashboard, date_ranges, db_tuning, db_writes, events, fragment_cache,
+    notifications, outbox, polling, query_plans, reporting, retention, roles, views,
+)
+from .cache_backends import SQLiteCache
+from .caching import cached_report
+from .cashier_views import is_admin, is_cashier
+from .data_versions import get_version
+from .forms import CustomerRegistrationForm, CustomerLoginForm, CustomerProfileForm, UserUpdateForm, OrderForm
+from .models import (
+    ArchivedRecord, Cashier, CashierTransaction, ChangeEvent, CustomerProfile, DailyOrderCounters,
+    DashboardCounters, DeliveryLog, IdentifierSequence, InventoryAdjustment, LPGProduct, Notification, Order,
+    OutboxEvent, PendingRegistration, ProductCategory, StockMovement,
+)
+
+
+# Every test here runs on a per-process in-memory cache, whichever runner loads the module,
+# so tests never read or leave entries in the host cache the site uses
+in_memory_cache = override_settings(CACHES={
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'prycegas-test-cache',
+        'TIMEOUT': 300,
+    }
+})
+
+
+def setUpModule():
+    in_memory_cache.enable()
+
+
+def tearDownModule():
+    in_memory_cache.disable()
 
 
 class AuthenticationTestCase(TestCase):
@@ -248,10 +300,6 @@ class ModelTestCase(TestCase):
         expected_str = 'testuser - 1234567890'
         self.assertEqual(str(profile), expected_str)
 
-from decimal import Decimal
-from .models import LPGProduct, Order
-from .forms import OrderForm
-
 
 class OrderPlacementTestCase(TestCase):
     """Test cases for the order placement system"""
@@ -558,4 +606,1515 @@ class OrderModelTestCase(TestCase):
         # Delivered orders cannot be cancelled
         self.order.status = 'delivered'
         self.order.save()
-        self.assertFalse(self.order.can_be_cancelled)
\ No newline at end of file
+        self.assertFalse(self.order.can_be_cancelled)
+
+
+class FixturesMixin:
+    """Accounts and products shared by the test cases below"""
+
+    password = 'testpass123'
+
+    def create_dealer(self, username='dealer', **fields):
+        return User.objects.create_user(username=username, password=self.password, is_staff=True, **fields)
+
+    def create_customer(self, username='customer', **profile_fields):
+        """A customer account with its profile"""
+        customer = User.objects.create_user(username=username, password=self.password)
+        profile_fields = {'phone_number': '09123456789', 'address': 'Test Address', **profile_fields}
+        CustomerProfile.objects.create(user=customer, **profile_fields)
+        return customer
+
+    def create_cashier(self, username='cashier'):
+        return Cashier.objects.create(user=User.objects.create_user(username=username, password=self.password))
+
+    def create_product(self, **fields):
+        fields = {'name': 'LPG Gas', 'size': '11kg', 'price': Decimal('500.00'), **fields}
+        return LPGProduct.objects.create(**fields)
+
+
+class StockMovementSourceTestCase(FixturesMixin, TestCase):
+    """Test cases for typed stock movement source links"""
+
+    def setUp(self):
+        """Set up test data"""
+        self.dealer = self.create_dealer()
+        self.product = self.create_product(cost_price=Decimal('400.00'), current_stock=50, minimum_stock=10)
+
+    def test_delivery_and_adjustment_movements_link_sources(self):
+        """Test that deliveries and adjustments record their movement source"""
+        delivery = DeliveryLog.objects.create(
+            product=self.product,
+            quantity_received=10,
+            supplier_name='Supplier',
+            delivery_date=timezone.now(),
+            cost_per_unit=Decimal('400.00'),
+            logged_by=self.dealer
+        )
+        adjustment = InventoryAdjustment.objects.create(
+            product=self.product,
+            quantity_change=-2,
+            reason='damage',
+            adjusted_by=self.dealer
+        )
+
+        self.assertEqual(StockMovement.objects.get(movement_type='delivery').delivery_log, delivery)
+        self.assertEqual(StockMovement.objects.get(movement_type='adjustment').adjustment, adjustment)
+
+    def test_stock_out_summary_uses_order_link(self):
+        """Test stock out revenue and COGS come from the linked orders"""
+        order = Order.objects.create(
+            product=self.product,
+            quantity=3,
+            delivery_type='pickup',
+            status='delivered'
+        )
+        StockMovement.objects.create(
+            product=self.product,
+            movement_type='sale',
+            quantity=-3,
+            previous_stock=50,
+            new_stock=47,
+            order=order,
+            created_by=self.dealer
+        )
+
+        self.client.login(username='dealer', password='testpass123')
+        response = self.client.get(reverse('core:stock_out_list'))
+
+        self.assertEqual(response.status_code, 200)
+        stats = response.context['summary_stats']
+        self.assertEqual(stats['sale_movements'], 1)
+        self.assertEqual(stats['total_out'], 3)
+        self.assertEqual(stats['total_revenue'], Decimal('1500.00'))
+        self.assertEqual(stats['total_cost_of_goods'], Decimal('1200.00'))
+        self.assertEqual(stats['total_gross_profit'], Decimal('300.00'))
+
+
+class IdentifierSequenceTestCase(FixturesMixin, TestCase):
+    """Test cases for sequence-backed SKU and employee ID allocation"""
+
+    def test_sku_sequence_continues_after_existing_skus(self):
+        """Test that a new sequence starts after SKUs already in use"""
+        self.create_product(sku='LPG-11-007')
+
+        self.assertEqual(self.create_product().sku, 'LPG-11-008')
+        self.assertEqual(self.create_product().sku, 'LPG-11-009')
+
+    def test_sku_allocation_is_one_query(self):
+        """Test that allocating a SKU for an existing family takes a single query"""
+        self.create_product()
+        with self.assertNumQueries(1):
+            self.assertEqual(IdentifierSequence.allocate('LPG-11'), 2)
+
+    def test_cashier_employee_id_assigned_when_blank(self):
+        """Test that cashiers without an employee ID get the next EMP number"""
+        first = Cashier.objects.create(user=User.objects.create_user(username='cashier1', password='x'))
+        second = Cashier.objects.create(
+            user=User.objects.create_user(username='cashier2', password='x'),
+            employee_id='CUSTOM-1'
+        )
+        third = Cashier.objects.create(user=User.objects.create_user(username='cashier3', password='x'))
+
+        self.assertEqual(first.employee_id, 'EMP-0001')
+        self.assertEqual(second.employee_id, 'CUSTOM-1')
+        self.assertEqual(third.employee_id, 'EMP-0002')
+
+    def test_allocation_skips_identifiers_taken_by_hand(self):
+        """Test that SKUs and employee IDs entered ahead of the sequence are skipped, not reused"""
+        self.assertEqual(self.create_product().sku, 'LPG-11-001')
+        self.create_product(sku='LPG-11-002')
+        self.create_product(sku='LPG-11-003')
+        self.assertEqual(self.create_product().sku, 'LPG-11-004')
+
+        Cashier.objects.create(user=User.objects.create_user(username='cashier1', password='x'))
+        Cashier.objects.create(user=User.objects.create_user(username='cashier2', password='x'), employee_id='EMP-0002')
+        third = Cashier.objects.create(user=User.objects.create_user(username='cashier3', password='x'))
+        self.assertEqual(third.employee_id, 'EMP-0003')
+
+
+class CostLayerTestCase(FixturesMixin, TestCase):
+    """Test cases for FIFO cost layers and weighted-average cost"""
+
+    def setUp(self):
+        """Set up test data"""
+        self.dealer = self.create_dealer()
+        self.product = self.create_product(cost_price=Decimal('300.00'), current_stock=10)
+        DeliveryLog.objects.create(
+            product=self.product,
+            quantity_received=10,
+            supplier_name='Supplier',
+            delivery_date=timezone.now(),
+            cost_per_unit=Decimal('400.00'),
+            logged_by=self.dealer
+        )
+        self.product.refresh_from_db()
+
+    def test_delivery_updates_weighted_average(self):
+        """Test that deliveries open a layer and move the average cost"""
+        self.assertEqual(self.product.cost_layers.count(), 2)
+        self.assertEqual(self.product.average_cost, Decimal('350.0000'))
+
+    def test_sale_consumes_oldest_layers_first(self):
+        """Test that an order is costed FIFO across layers"""
+        order = Order.objects.create(product=self.product, quantity=12, delivery_type='pickup')
+        order.deduct_stock(created_by=self.dealer)
+
+        order.refresh_from_db()
+        self.product.refresh_from_db()
+        self.assertEqual(order.cost_of_goods, Decimal('3800.00'))  # 10 @ 300 + 2 @ 400
+        self.assertEqual(self.product.current_stock, 8)
+        self.assertEqual(
+            list(self.product.cost_layers.values_list('quantity_remaining', flat=True)),
+            [0, 8]
+        )
+        self.assertTrue(StockMovement.objects.filter(movement_type='sale', order=order).exists())
+
+    def test_sales_report_gross_profit_uses_stored_cogs(self):
+        """Test that the sales report reads gross profit from stored COGS"""
+        order = Order.objects.create(product=self.product, quantity=2, delivery_type='pickup')
+        order.deduct_stock(created_by=self.dealer)
+        Order.objects.filter(pk=order.pk).update(status='delivered', delivery_date=timezone.now())
+
+        self.client.login(username='dealer', password='testpass123')
+        response = self.client.get(reverse('core:sales_report'))
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.context['summary']['total_cost_of_goods'], Decimal('600.00'))
+        self.assertEqual(response.context['summary']['gross_profit'], Decimal('400.00'))
+
+
+class CashierScanLookupTestCase(FixturesMixin, TestCase):
+    """Test cases for the POS barcode/SKU scan endpoint"""
+
+    def setUp(self):
+        """Set up test data"""
+        catalogue.invalidate()
+        self.user = User.objects.create_user(username='cashier', password='testpass123', is_staff=True)
+        Cashier.objects.create(user=self.user)
+        self.product = self.create_product(barcode='4800001', current_stock=5)
+        self.client.login(username='cashier', password='testpass123')
+
+    def test_batch_lookup_by_barcode_and_sku(self):
+        """Test that barcodes and SKUs resolve in one response"""
+        response = self.client.get(reverse('core:cashier_scan_lookup'), {
+            'codes': f'4800001,{self.product.sku.lower()},UNKNOWN'
+        })
+
+        data = response.json()
+        self.assertTrue(data['success'])
+        self.assertEqual([item['found'] for item in data['items']], [True, True, False])
+        self.assertEqual(data['items'][0]['id'], self.product.id)
+        self.assertEqual(data['items'][1]['available_stock'], 5)
+        self.assertEqual(data['not_found'], ['UNKNOWN'])
+
+    def test_lookup_reads_only_live_stock_once_catalogue_is_loaded(self):
+        """Test that a warm lookup costs a single stock query"""
+        catalogue.get_catalogue()
+        with self.assertNumQueries(1):
+            catalogue.lookup_codes(['4800001', '4800001'])
+
+    def test_product_change_invalidates_map(self):
+        """Test that editing a barcode is reflected in the next lookup"""
+        catalogue.get_catalogue()
+        self.product.barcode = '4800002'
+        self.product.save()
+
+        self.assertFalse(catalogue.lookup_codes(['4800001'])[0]['found'])
+        self.assertTrue(catalogue.lookup_codes(['4800002'])[0]['found'])
+
+
+class CatalogueCacheTestCase(FixturesMixin, TestCase):
+    """Test cases for the versioned product catalogue snapshots"""
+
+    def setUp(self):
+        """Set up test data"""
+        catalogue.invalidate()
+        self.product = self.create_product(current_stock=5)
+
+    def test_snapshots_are_immutable(self):
+        """Test that catalogue snapshots cannot be modified"""
+        snapshot = catalogue.get_product(self.product.id)
+        with self.assertRaises(AttributeError):
+            snapshot.price = Decimal('1.00')
+
+    def test_warm_stock_check_reads_only_stock_columns(self):
+        """Test that a warm product lookup costs one stock query"""
+        catalogue.get_catalogue()
+        with self.assertNumQueries(1):
+            product = catalogue.get_product_with_stock(self.product.id)
+        self.assertEqual(product.price, Decimal('500.00'))
+        self.assertEqual(product.current_stock, 5)
+
+    def test_product_edit_bumps_version_on_commit(self):
+        """Test that catalogue edits move the shared version once committed"""
+        version = get_version(catalogue.CATALOGUE_SCOPE)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.product.price = Decimal('550.00')
+            self.product.save()
+
+        self.assertNotEqual(get_version(catalogue.CATALOGUE_SCOPE), version)
+        self.assertEqual(catalogue.get_product(self.product.id).price, Decimal('550.00'))
+
+    def test_stock_only_save_keeps_version(self):
+        """Test that stock changes do not invalidate the catalogue"""
+        version = get_version(catalogue.CATALOGUE_SCOPE)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.product.current_stock = 3
+            self.product.save(update_fields=['current_stock', 'updated_at'])
+
+        self.assertEqual(get_version(catalogue.CATALOGUE_SCOPE), version)
+
+
+class SQLiteCacheTestCase(TestCase):
+    """Test cases for the shared SQLite cache backend"""
+
+    def setUp(self):
+        """Set up a cache file shared by two backend instances"""
+        self.workdir = tempfile.mkdtemp()
+        self.path = f'{self.workdir}/cache.sqlite3'
+        self.cache = SQLiteCache(self.path, {'OPTIONS': {'MAX_ENTRIES': 10, 'CULL_FREQUENCY': 2}})
+        self.other_worker = SQLiteCache(self.path, {})
+
+    def tearDown(self):
+        shutil.rmtree(self.workdir, ignore_errors=True)
+
+    def test_entries_are_shared_between_instances(self):
+        """Test that a value set by one worker is visible to another"""
+        self.cache.set('stats', {'pending': 3})
+        self.assertEqual(self.other_worker.get('stats'), {'pending': 3})
+        self.other_worker.delete('stats')
+        self.assertIsNone(self.cache.get('stats'))
+
+    def test_expired_entries_are_misses(self):
+        """Test TTL expiry and add() over an expired key"""
+        self.cache.set('short', 1, timeout=0.05)
+        time_module.sleep(0.1)
+        self.assertIsNone(self.cache.get('short'))
+        self.assertTrue(self.cache.add('short', 2))
+        self.assertFalse(self.cache.add('short', 3))
+        self.assertEqual(self.cache.get('short'), 2)
+
+    def test_incr_is_shared(self):
+        """Test increments from two workers accumulate"""
+        self.cache.set('counter', 1)
+        self.cache.incr('counter')
+        self.other_worker.incr('counter', 5)
+        self.assertEqual(self.cache.get('counter'), 7)
+        with self.assertRaises(ValueError):
+            self.cache.incr('missing')
+
+    def test_least_recently_used_entries_are_culled(self):
+        """Test eviction keeps the entry count bounded"""
+        for i in range(20):
+            self.cache.set(f'key:{i}', i)
+        self.cache._cull()
+        remaining = sum(1 for i in range(20) if self.cache.has_key(f'key:{i}'))
+        self.assertLessEqual(remaining, 10)
+        self.assertTrue(self.cache.has_key('key:19'))
+
+
+class DashboardCountersTestCase(FixturesMixin, TestCase):
+    """Test cases for the incrementally maintained dashboard counters"""
+
+    def setUp(self):
+        """Set up test data"""
+        self.dealer = self.create_dealer()
+        self.product = self.create_product(cost_price=Decimal('300.00'), current_stock=20, minimum_stock=5)
+
+    def assertMatchesRebuild(self):
+        """Counters maintained incrementally must equal a full recomputation"""
+        incremental = dashboard.get_dashboard_stats()
+        dashboard.rebuild()
+        self.assertEqual(incremental, dashboard.get_dashboard_stats())
+        return incremental
+
+    def test_concurrent_transitions_count_once(self):
+        """Test that two copies of an order both moved to delivered only count the delivery once"""
+        order = Order.objects.create(product=self.product, quantity=1, delivery_type='pickup')
+        first, second = Order.objects.get(pk=order.pk), Order.objects.get(pk=order.pk)
+        for copy in (first, second):
+            with db_writes.atomic():
+                copy.status = 'delivered'
+                copy.delivery_date = timezone.now()
+                copy.save()
+        stats = self.assertMatchesRebuild()
+        self.assertEqual((stats['pending_orders'], stats['delivered_today']), (0, 1))
+
+    def test_order_lifecycle_updates_counters(self):
+        """Test that creating and moving orders through their statuses keeps the counters exact"""
+        first = Order.objects.create(product=self.product, quantity=2, delivery_type='pickup')
+        second = Order.objects.create(product=self.product, quantity=1, delivery_type='delivery',
+                                      delivery_address='123 Test Street')
+        stats = self.assertMatchesRebuild()
+        self.assertEqual(stats['pending_orders'], 2)
+        self.assertEqual(stats['weekly_orders'], 2)
+
+        second.status = 'out_for_delivery'
+        second.save()
+        first.status = 'delivered'
+        first.delivery_date = timezone.now()
+        first.save()
+        stats = self.assertMatchesRebuild()
+        self.assertEqual(stats['pending_orders'], 0)
+        self.assertEqual(stats['out_for_delivery'], 1)
+        self.assertEqual(stats['delivered_today'], 1)
+        self.assertEqual(stats['weekly_revenue'], Decimal('1000.00'))
+
+        second.delete()
+        stats = self.assertMatchesRebuild()
+        self.assertEqual(stats['total_orders'], 1)
+        self.assertEqual(stats['out_for_delivery'], 0)
+
+    def test_orders_roll_out_of_the_week(self):
+        """Test that an order's day row stops counting once it is older than a week"""
+        order = Order.objects.create(product=self.product, quantity=1, delivery_type='pickup')
+        order.order_date = timezone.now() - timedelta(days=10)
+        order.save()
+
+        stats = self.assertMatchesRebuild()
+        self.assertEqual(stats['total_orders'], 1)
+        self.assertEqual(stats['weekly_orders'], 0)
+        self.assertEqual(DailyOrderCounters.objects.get().orders_placed, 1)
+
+    def test_stock_changes_update_inventory_counters(self):
+        """Test that stock movements keep low-stock, out-of-stock and stock value current"""
+        order = Order.objects.create(product=self.product, quantity=16, delivery_type='pickup')
+        order.deduct_stock(created_by=self.dealer)
+        stats = self.assertMatchesRebuild()
+        self.assertEqual(stats['low_stock_products'], 1)
+        self.assertEqual(stats['total_stock_value'], Decimal('2000.00'))
+
+        self.product.current_stock = 0
+        self.product.save(update_fields=['current_stock', 'updated_at'])
+        self.product.is_active = False
+        self.create_product(size='22kg', price=Decimal('900.00'), current_stock=3)
+        self.product.save()
+        stats = self.assertMatchesRebuild()
+        self.assertEqual(stats['total_products'], 1)
+        self.assertEqual(stats['out_of_stock'], 0)
+        self.assertEqual(stats['total_stock_value'], Decimal('2700.00'))
+
+    def test_stats_endpoint_reads_counters(self):
+        """Test that the polled stats partial renders from the counters without aggregating orders"""
+        Order.objects.create(product=self.product, quantity=1, delivery_type='pickup')
+        DashboardCounters.objects.update(total_orders=42)
+
+        self.client.login(username='dealer', password='testpass123')
+        response = self.client.get(reverse('core:refresh_dashboard_stats'), HTTP_HX_REQUEST='true')
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.context['dashboard_stats']['total_orders'], 42)
+
+
+class SingleFlightCacheTestCase(FixturesMixin, TestCase):
+    """Test cases for the stampede-safe cache helper"""
+
+    def setUp(self):
+        """Set up a unique key and a counting compute function"""
+        self.key = f'test:{uuid.uuid4().hex}'
+        self.calls = 0
+
+    def compute(self):
+        self.calls += 1
+        return self.calls
+
+    def test_fresh_value_is_computed_once(self):
+        """Test that a fresh value is served without recomputing"""
+        self.assertEqual(caching.get_or_compute(self.key, self.compute, 60, beta=0), 1)
+        self.assertEqual(caching.get_or_compute(self.key, self.compute, 60, beta=0), 1)
+        self.assertEqual(self.calls, 1)
+
+    def test_stale_value_served_while_another_worker_recomputes(self):
+        """Test that callers without the lock get the expired value instead of recomputing"""
+        caching.get_or_compute(self.key, self.compute, 0.01, stale_timeout=60)
+        time_module.sleep(0.02)
+        cache.add(f'{self.key}:lock', 'other-worker', 30)
+
+        self.assertEqual(caching.get_or_compute(self.key, self.compute, 0.01, stale_timeout=60), 1)
+        self.assertEqual(self.calls, 1)
+
+        cache.delete(f'{self.key}:lock')
+        self.assertEqual(caching.get_or_compute(self.key, self.compute, 0.01, stale_timeout=60), 2)
+
+    def test_early_expiration_refreshes_before_ttl(self):
+        """Test that XFetch recomputes ahead of expiry when the computation is expensive"""
+        caching.get_or_compute(self.key, self.compute, 60, beta=0)
+        envelope = cache.get(self.key)
+        envelope['delta'] = 3600
+        cache.set(self.key, envelope, 120)
+
+        self.assertEqual(caching.get_or_compute(self.key, self.compute, 60, beta=1.0), 2)
+
+    def test_only_writes_to_past_days_expire_past_reports(self):
+        """Test that today's sales leave past-period reports cached and back-dated writes expire them"""
+        yesterday = timezone.localdate() - timedelta(days=1)
+        self.assertEqual(caching.cached_report(self.key, self.compute, period=(yesterday, yesterday)), 1)
+        product = self.create_product(current_stock=5)
+        order = Order.objects.create(product=product, quantity=1, delivery_type='pickup')
+        self.assertEqual(caching.cached_report(self.key, self.compute, period=(yesterday, yesterday)), 1)
+
+        order.order_date = timezone.now() - timedelta(days=1)
+        order.save()
+        self.assertEqual(caching.cached_report(self.key, self.compute, period=(yesterday, yesterday)), 2)
+
+    def test_reports_reaching_today_are_cached_per_day(self):
+        """Test that reports covering today are not expired by each write and start afresh the next day"""
+        today = timezone.localdate()
+        self.assertEqual(caching.cached_report(self.key, self.compute, period=(today, today)), 1)
+        product = self.create_product(current_stock=5)
+        Order.objects.create(product=product, quantity=1, delivery_type='pickup')
+        self.assertEqual(caching.cached_report(self.key, self.compute, period=(today, today)), 1)
+
+        with mock.patch('core.caching.timezone.localdate', return_value=today + timedelta(days=1)):
+            self.assertEqual(caching.cached_report(self.key, self.compute, period=(today, today)), 2)
+
+    def test_report_views_render_from_cache(self):
+        """Test that cached report aggregates render on the report pages"""
+        self.create_dealer()
+        self.client.login(username='dealer', password='testpass123')
+        for name in ('reports_dashboard', 'sales_report', 'stock_report', 'inventory_reports'):
+            for _ in range(2):
+                response = self.client.get(reverse(f'core:{name}'))
+                self.assertEqual(response.status_code, 200)
+
+
+class NotificationSummaryTestCase(FixturesMixin, TestCase):
+    """Test cases for the denormalized, cached notification counters"""
+
+    def setUp(self):
+        """Set up a customer with a profile"""
+        self.customer = self.create_customer()
+        self.profile = self.customer.customer_profile
+        cache.delete(notifications.summary_key(self.customer.pk))
+
+    def notify(self, title='Order update'):
+        return Notification.objects.create(
+            customer=self.customer,
+            notification_type='order_updated',
+            title=title,
+            message='Your order was updated'
+        )
+
+    def unread_count(self):
+        self.profile.refresh_from_db()
+        return self.profile.unread_notification_count
+
+    def test_counter_follows_create_read_and_delete(self):
+        """Test that the denormalized counter tracks notification changes"""
+        first, second, third = self.notify(), self.notify(), self.notify()
+        self.assertEqual(self.unread_count(), 3)
+
+        first.mark_as_read()
+        first.mark_as_read()
+        self.assertEqual(self.unread_count(), 2)
+
+        Notification.objects.get(pk=second.pk).delete()
+        self.assertEqual(self.unread_count(), 1)
+
+        self.assertEqual(notifications.mark_all_as_read(self.customer), 1)
+        self.assertEqual(self.unread_count(), 0)
+        third.refresh_from_db()
+        self.assertTrue(third.is_read)
+
+    def test_summary_is_cached_until_notifications_change(self):
+        """Test that the bell data is served from the cache and refreshed on change"""
+        for index in range(7):
+            self.notify(title=f'Update {index}')
+
+        summary = notifications.get_summary(self.customer)
+        self.assertEqual(summary['unread_count'], 7)
+        self.assertEqual([n.title for n in summary['latest']], [f'Update {index}' for index in range(6, 1, -1)])
+        with self.assertNumQueries(0):
+            notifications.get_summary(self.customer)
+
+        summary['latest'][0].mark_as_read()
+        self.assertEqual(notifications.get_summary(self.customer)['unread_count'], 6)
+
+    def test_non_customers_skip_notification_lookups(self):
+        """Test that dealers and cashiers with resolved roles never touch the cache or notifications"""
+        dealer = self.create_dealer()
+        dealer.roles = roles.resolve(dealer)
+        cashier_user = User.objects.create_user(username='cashier', password='testpass123')
+        Cashier.objects.create(user=cashier_user)
+        cashier_roles = roles.resolve(cashier_user)
+        with self.assertNumQueries(0):
+            self.assertEqual(notifications.get_summary(dealer)['unread_count'], 0)
+            self.assertEqual(notifications.get_summary(cashier_user, cashier_roles)['unread_count'], 0)
+            summary = async_to_sync(notifications.aget_summary)(cashier_user, cashier_roles)
+        self.assertEqual(summary['unread_count'], 0)
+        self.assertIsNone(cache.get(notifications.summary_key(cashier_user.pk)))
+
+    def test_users_without_roles_cache_an_empty_summary(self):
+        """Test that a non-customer seen outside a request costs one lookup, then none"""
+        dealer = self.create_dealer()
+        self.assertEqual(notifications.get_summary(dealer)['unread_count'], 0)
+        with self.assertNumQueries(0):
+            self.assertEqual(notifications.get_summary(dealer)['unread_count'], 0)
+
+    def test_unread_count_poll_reads_summary(self):
+        """Test that the bell poll returns the cached count"""
+        self.notify()
+        self.client.login(username='customer', password='testpass123')
+        notifications.get_summary(self.customer)
+
+        response = self.client.get(reverse('core:get_unread_notifications_count'))
+
+        self.assertEqual(response.json()['unread_count'], 1)
+
+
+class RoleResolutionTestCase(TestCase):
+    """Test cases for session-cached role resolution"""
+
+    def setUp(self):
+        """Set up a cashier account"""
+        self.user = User.objects.create_user(username='cashier', password='testpass123', is_staff=True)
+        self.cashier = Cashier.objects.create(user=self.user)
+
+    def test_roles_resolved_in_one_query(self):
+        """Test that roles and profile ids come from a single query"""
+        with self.assertNumQueries(1):
+            resolved = roles.resolve(self.user)
+        self.assertTrue(resolved.is_cashier)
+        self.assertFalse(resolved.is_admin)
+        self.assertEqual(resolved.cashier_id, self.cashier.pk)
+        self.assertIsNone(resolved.customer_profile_id)
+
+    def test_predicates_read_attached_roles(self):
+        """Test that permission checks use request-attached roles without profile queries"""
+        self.user.roles = roles.resolve(self.user)
+        with self.assertNumQueries(0):
+            self.assertTrue(is_cashier(self.user))
+            self.assertFalse(is_admin(self.user))
+
+    def test_login_stores_roles_in_session(self):
+        """Test that logging in caches the roles in the session"""
+        self.client.login(username='cashier', password='testpass123')
+        stored = self.client.session[roles.SESSION_KEY]
+        self.assertEqual(stored['cashier_id'], self.cashier.pk)
+
+        response = self.client.get(reverse('core:cashier_walkin_order'))
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.wsgi_request.roles.is_cashier)
+
+    def test_cashier_change_invalidates_session_roles(self):
+        """Test that deactivating a cashier takes effect on their next request"""
+        self.client.login(username='cashier', password='testpass123')
+        self.cashier.is_active = False
+        self.cashier.save()
+
+        response = self.client.get(reverse('core:cashier_walkin_order'))
+
+        self.assertEqual(response.status_code, 302)
+        self.assertFalse(response.wsgi_request.roles.is_cashier)
+
+
+class FragmentCacheTestCase(FixturesMixin, TestCase):
+    """Test cases for versioned template fragment caching"""
+
+    def setUp(self):
+        """Use a fragment name no earlier run has cached"""
+        self.name = f'test_fragment_{uuid.uuid4().hex}'
+        self.renders = []
+        self.template = Template(
+            '{% load fragment_cache %}'
+            '{% fragment "' + self.name + '" item version %}{{ item }}:{{ counter.next }}{% endfragment %}'
+        )
+
+    def render(self, item, version, request=None):
+        counter = {'next': len(self.renders)}
+        self.renders.append(item)
+        return self.template.render(Context({'item': item, 'version': version, 'counter': counter, 'request': request}))
+
+    def test_fragment_cached_until_version_changes(self):
+        """Test that a fragment is reused for the same inputs and re-rendered for new ones"""
+        first = self.render('a', 1)
+        self.assertEqual(self.render('a', 1), first)
+        self.assertNotEqual(self.render('a', 2), first)
+
+    def test_hits_and_misses_counted(self):
+        """Test that lookups are counted per request and per fragment name"""
+        request = RequestFactory().get('/')
+        self.render('a', 1, request)
+        self.render('a', 1, request)
+        self.render('b', 1, request)
+
+        self.assertEqual(request._fragment_hits, 1)
+        self.assertEqual(request._fragment_misses, 2)
+        counts = fragment_cache.stats()[self.name]
+        self.assertEqual((counts['hits'], counts['misses']), (1, 2))
+        self.assertAlmostEqual(counts['hit_rate'], 1 / 3)
+
+    def test_dashboard_poll_served_from_fragment(self):
+        """Test that an unchanged customer dashboard poll skips the order queries"""
+        user = self.create_customer(f'frag_{uuid.uuid4().hex[:8]}')
+        self.client.login(username=user.username, password='testpass123')
+        url = reverse('core:refresh_dashboard_orders')
+
+        first = self.client.get(url, HTTP_HX_REQUEST='true')
+        with CaptureQueriesContext(connection) as queries:
+            second = self.client.get(url, HTTP_HX_REQUEST='true')
+
+        self.assertEqual(first.content, second.content)
+        self.assertFalse([q for q in queries if 'core_order' in q['sql']])
+
+
+class ConditionalPollTestCase(FixturesMixin, TestCase):
+    """Test cases for data-version ETags on the HTMX polling endpoints"""
+
+    def setUp(self):
+        """Set up a customer with one order"""
+        self.user = self.create_customer(f'poll_{uuid.uuid4().hex[:8]}')
+        self.product = self.create_product(current_stock=50, minimum_stock=5)
+        self.client.login(username=self.user.username, password='testpass123')
+        self.url = reverse('core:refresh_dashboard_orders')
+
+    def poll(self, etag=None):
+        headers = {'HTTP_HX_REQUEST': 'true'}
+        if etag:
+            headers['HTTP_IF_NONE_MATCH'] = etag
+        return self.client.get(self.url, **headers)
+
+    def test_unchanged_poll_is_304_without_queries(self):
+        """Test that a repeated poll is answered 304 before the view queries anything"""
+        first = self.poll()
+        self.assertEqual(first.status_code, 200)
+        self.assertIn('private', first['Cache-Control'])
+        self.assertNotIn('public', first['Cache-Control'])
+
+        with CaptureQueriesContext(connection) as queries:
+            second = self.poll(first['ETag'])
+
+        self.assertEqual(second.status_code, 304)
+        self.assertEqual(second.content, b'')
+        self.assertFalse([q for q in queries if 'core_' in q['sql']])
+
+    def test_mobile_poll_stays_private(self):
+        """Test that mobile clients get the same private, revalidated polls"""
+        response = self.client.get(self.url, HTTP_HX_REQUEST='true', HTTP_USER_AGENT='Mozilla/5.0 (Linux; Android 10) Mobile')
+        self.assertNotIn('public', response['Cache-Control'])
+        self.assertIn('Cookie', response['Vary'])
+
+    def test_order_write_changes_etag(self):
+        """Test that a new order for the customer moves the ETag"""
+        etag = self.poll()['ETag']
+        Order.objects.create(
+            customer=self.user, product=self.product, quantity=1,
+            delivery_type='pickup', total_amount=Decimal('500.00')
+        )
+        response = self.poll(etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response['ETag'], etag)
+
+    def test_notification_count_etag(self):
+        """Test that the unread count endpoint revalidates on the notifications version"""
+        url = reverse('core:get_unread_notifications_count')
+        etag = self.client.get(url)['ETag']
+        self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH=etag).status_code, 304)
+
+        Notification.objects.create(
+            customer=self.user, notification_type='order_updated', title='Hi', message='Hello'
+        )
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()['unread_count'], 1)
+
+
+class ChangeEventStreamTestCase(FixturesMixin, TestCase):
+    """Test cases for the change event outbox and per-process broker"""
+
+    def setUp(self):
+        """Set up a customer, a product and a running broker's heartbeat"""
+        cache.set(events.BROKER_KEY, True, events.BROKER_TTL)
+        self.addCleanup(cache.delete, events.BROKER_KEY)
+        self.customer = User.objects.create_user(username='live_customer', password='testpass123')
+        self.product = self.create_product(current_stock=50, minimum_stock=5)
+
+    def place_order(self):
+        return Order.objects.create(
+            customer=self.customer, product=self.product, quantity=1,
+            delivery_type='pickup', total_amount=Decimal('900.00')
+        )
+
+    def test_order_save_writes_events_for_customer_and_staff(self):
+        """Test that an order change is queued for its customer and for staff"""
+        order = self.place_order()
+        topics = set(ChangeEvent.objects.filter(kind=events.ORDERS).values_list('topic', flat=True))
+        self.assertEqual(topics, {events.user_topic(self.customer.pk), events.STAFF_TOPIC})
+        self.assertEqual(ChangeEvent.objects.filter(kind=events.ORDERS).first().payload['order_id'], order.pk)
+
+    def test_nothing_is_written_without_a_broker(self):
+        """Test that writes add no events while no broker is tailing the feed"""
+        cache.delete(events.BROKER_KEY)
+        written = ChangeEvent.objects.count()
+        self.place_order()
+        events.publish_notifications([Notification(pk=1, customer=self.customer)])
+        self.assertEqual(ChangeEvent.objects.count(), written)
+
+    def test_broker_delivers_only_subscribed_topics(self):
+        """Test that the broker hands each subscriber the events for its topics"""
+        broker = events.Broker()
+
+        async def receive():
+            customer_queue = await broker.subscribe(events.topics_for(self.customer))
+            other_queue = await broker.subscribe({events.user_topic(self.customer.pk + 1000)})
+            await sync_to_async(self.place_order)()
+            await broker.pump()
+            broker.unsubscribe(customer_queue)
+            broker.unsubscribe(other_queue)
+            await broker._task
+            return customer_queue, other_queue
+
+        customer_queue, other_queue = async_to_sync(receive)()
+
+        kind, payload = customer_queue.get_nowait()
+        self.assertEqual((kind, payload['status']), (events.ORDERS, 'pending'))
+        self.assertTrue(other_queue.empty())
+
+    def test_stream_requires_asgi(self):
+        """Test that WSGI requests are told not to reconnect and anonymous ones are refused"""
+        url = reverse('core:event_stream')
+        self.assertEqual(self.client.get(url).status_code, 401)
+        self.client.login(username='live_customer', password='testpass123')
+        self.assertEqual(self.client.get(url).status_code, 204)
+
+
+class PollGovernorTestCase(FixturesMixin, TestCase):
+    """Test cases for poll interval hints and shedding"""
+
+    def setUp(self):
+        """Give each test a fresh governor and a signed-in customer"""
+        self.saved_governor = polling.governor
+        polling.governor = polling.Governor()
+        user = self.create_customer(f'gov_{uuid.uuid4().hex[:8]}')
+        self.client.login(username=user.username, password='testpass123')
+        self.url = reverse('core:refresh_dashboard_orders')
+
+    def tearDown(self):
+        polling.governor = self.saved_governor
+
+    def test_interval_stretches_for_unchanged_polls(self):
+        """Test that endpoints whose polls keep returning 304 are polled less often"""
+        governor = polling.governor
+        base = governor.interval('refresh_dashboard_orders')
+        for _ in range(20):
+            governor.observe_poll('refresh_dashboard_orders', changed=False)
+        self.assertEqual(base, polling.POLL_ENDPOINTS['refresh_dashboard_orders'])
+        self.assertGreater(governor.interval('refresh_dashboard_orders'), base)
+
+    def test_poll_response_carries_interval(self):
+        """Test that polled endpoints return an X-Poll-Interval hint"""
+        response = self.client.get(self.url, HTTP_HX_REQUEST='true')
+        self.assertEqual(response.status_code, 200)
+        self.assertGreaterEqual(int(response['X-Poll-Interval']), polling.MIN_INTERVAL)
+
+    def test_polls_shed_under_lock_pressure(self):
+        """Test that polls get 429 with Retry-After while writers wait on the lock"""
+        for _ in range(10):
+            polling.governor.observe_write(polling.LOCKED_PENALTY)
+
+        response = self.client.get(self.url, HTTP_HX_REQUEST='true')
+
+        self.assertEqual(response.status_code, 429)
+        self.assertGreaterEqual(int(response['Retry-After']), polling.MIN_INTERVAL)
+        # Other pages are never shed
+        self.assertEqual(self.client.get(reverse('core:customer_dashboard')).status_code, 200)
+
+
+class MultiplexedPollTestCase(FixturesMixin, TestCase):
+    """Test cases for the multiplexed out-of-band poll endpoint"""
+
+    def setUp(self):
+        """Set up a dealer and a customer"""
+        self.dealer = self.create_dealer('mux_dealer')
+        self.customer = self.create_customer('mux_customer')
+        self.url = reverse('core:poll_updates')
+
+    def poll(self, parts, **headers):
+        return self.client.get(self.url, {'parts': parts}, HTTP_HX_REQUEST='true', **headers)
+
+    def test_dealer_gets_each_part_out_of_band(self):
+        """Test that one poll returns an out-of-band fragment per requested part"""
+        self.client.login(username='mux_dealer', password='testpass123')
+        response = self.poll('dashboard_stats,recent_activity,dashboard_stats')
+        content = response.content.decode()
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(content.count('hx-swap-oob='), 2)
+        self.assertIn('hx-swap-oob="innerHTML:#dashboard-stats"', content)
+        self.assertIn('hx-swap-oob="innerHTML:#recent-activity"', content)
+
+    def test_customer_cannot_request_dealer_parts(self):
+        """Test that parts the user may not see are left out"""
+        self.client.login(username='mux_customer', password='testpass123')
+        content = self.poll('dashboard_stats,dashboard_orders,notifications').content.decode()
+
+        self.assertNotIn('#dashboard-stats', content)
+        self.assertIn('innerHTML:#dashboard-orders', content)
+        self.assertIn('innerHTML:.notification-count', content)
+
+    def test_unchanged_poll_is_304(self):
+        """Test that the combined ETag answers an unchanged poll with 304"""
+        self.client.login(username='mux_customer', password='testpass123')
+        etag = self.poll('dashboard_orders,notifications')['ETag']
+        self.assertEqual(self.poll('dashboard_orders,notifications', HTTP_IF_NONE_MATCH=etag).status_code, 304)
+
+
+class AsyncEndpointsTestCase(FixturesMixin, TestCase):
+    """Test cases for the async read-only endpoints"""
+
+    def setUp(self):
+        """Set up a customer, a product and a category"""
+        self.customer = self.create_customer('async_customer', unread_notification_count=2)
+        self.product = self.create_product(name='Async LPG', current_stock=3, minimum_stock=5)
+        ProductCategory.objects.create(name=f'Async {uuid.uuid4().hex[:8]}')
+        cache.delete(notifications.summary_key(self.customer.pk))
+        self.async_client = AsyncClient()
+
+    def test_hot_endpoints_are_async(self):
+        """Test that the high-frequency read endpoints are coroutine views"""
+        for view in (views.check_stock, views.get_product_details, views.validate_username,
+                     views.validate_email, views.get_unread_notifications_count, views.get_categories):
+            self.assertTrue(iscoroutinefunction(view), view.__name__)
+
+    async def test_check_stock_and_product_details(self):
+        """Test that stock checks read live stock through the async ORM"""
+        await self.async_client.alogin(username='async_customer', password='testpass123')
+
+        response = await self.async_client.get(reverse('core:check_stock'), {'product': self.product.id, 'quantity': 5})
+        self.assertEqual(response.status_code, 200)
+        self.assertIn('Async LPG', response.content.decode())
+
+        response = await self.async_client.get(reverse('core:get_product_details'), {'product_id': self.product.id})
+        data = response.json()
+        self.assertEqual((data['current_stock'], data['can_fulfill']), (3, True))
+
+        response = await self.async_client.get(reverse('core:get_product_details'), {'product_id': 999999})
+        self.assertEqual(response.status_code, 404)
+
+    async def test_anonymous_requests_are_redirected(self):
+        """Test that the async login check still applies"""
+        response = await self.async_client.get(reverse('core:get_product_details'), {'product_id': self.product.id})
+        self.assertEqual(response.status_code, 302)
+
+    async def test_unread_count_categories_and_username(self):
+        """Test the notification count, category list and username check"""
+        await self.async_client.alogin(username='async_customer', password='testpass123')
+
+        response = await self.async_client.get(reverse('core:get_unread_notifications_count'))
+        self.assertEqual(response.json()['unread_count'], 2)
+
+        response = await self.async_client.get(reverse('core:get_categories'))
+        names = [category['name'] for category in response.json()['categories']]
+        self.assertTrue(any(name.startswith('Async ') for name in names))
+
+        response = await self.async_client.post(reverse('core:validate_username'), {'username': 'ASYNC_customer'})
+        self.assertFalse(response.json()['valid'])
+        response = await self.async_client.post(reverse('core:validate_username'), {'username': 'fresh_async_name'})
+        self.assertTrue(response.json()['valid'])
+
+    async def test_unread_count_revalidates_without_blocking_cache_reads(self):
+        """Test that the unread count ETag comes from the async cache API"""
+        await self.async_client.alogin(username='async_customer', password='testpass123')
+        url = reverse('core:get_unread_notifications_count')
+        with mock.patch('core.etags.get_versions', side_effect=AssertionError):
+            etag = (await self.async_client.get(url))['ETag']
+            response = await self.async_client.get(url, headers={'If-None-Match': etag})
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(response['ETag'], etag)
+
+
+class OutboxDispatcherTestCase(FixturesMixin, TestCase):
+    """Test cases for queued order side effects and their dispatcher"""
+
+    def setUp(self):
+        """Set up a dealer, a cashier, a customer and an order"""
+        self.dealer = User.objects.create_superuser(username='outbox_dealer', password='testpass123')
+        self.cashier = self.create_cashier('outbox_cashier')
+        self.customer = self.create_customer('outbox_customer')
+        self.product = self.create_product(current_stock=50, minimum_stock=5)
+        self.order = Order.objects.create(
+            customer=self.customer, product=self.product, quantity=1,
+            delivery_type='pickup', total_amount=Decimal('500.00')
+        )
+
+    def test_cancellation_notifies_customer_once_dispatched(self):
+        """Test that the request only queues the notification and the dispatcher creates it"""
+        self.client.login(username='outbox_dealer', password='testpass123')
+        self.client.post(reverse('core:update_order_status', args=[self.order.id]),
+                         {'status': 'cancelled', 'cancellation_reason': 'Out of area'})
+
+        self.order.refresh_from_db()
+        self.assertEqual(self.order.status, 'cancelled')
+        self.assertFalse(Notification.objects.filter(customer=self.customer).exists())
+        self.assertEqual(outbox.pending().count(), 1)
+
+        cache.set(events.BROKER_KEY, True, events.BROKER_TTL)
+        self.addCleanup(cache.delete, events.BROKER_KEY)
+        self.assertEqual(outbox.drain(), 1)
+        notification = Notification.objects.get(customer=self.customer)
+        self.assertEqual(notification.reason, 'Out of area')
+        self.assertEqual(CustomerProfile.objects.get(user=self.customer).unread_notification_count, 1)
+        self.assertTrue(ChangeEvent.objects.filter(kind=events.NOTIFICATIONS, topic=events.user_topic(self.customer.pk)).exists())
+        self.assertEqual(outbox.pending().count(), 0)
+
+    def test_sale_recorded_once_per_order(self):
+        """Test that a delivery queued twice produces one cashier transaction"""
+        self.order.processed_by = self.cashier
+        outbox.record_sale(self.order)
+        outbox.record_sale(self.order)
+        outbox.drain()
+        self.assertEqual(CashierTransaction.objects.filter(order=self.order).count(), 1)
+
+    def test_failing_event_is_held_back_alone(self):
+        """Test that one failing event does not block the rest of its batch"""
+        OutboxEvent.objects.create(kind='unknown', payload={})
+        outbox.record_sale(self.order, cashier=self.cashier)
+
+        with self.assertLogs('core.outbox', 'ERROR'):
+            self.assertEqual(outbox.dispatch(), 2)
+        self.assertTrue(CashierTransaction.objects.filter(order=self.order).exists())
+        failed = OutboxEvent.objects.get(kind='unknown')
+        self.assertEqual((failed.processed_at, failed.attempts), (None, 1))
+
+
+class SQLiteTuningTestCase(TestCase):
+    """Test cases for the SQLite connection profile"""
+
+    def test_profile_applied_to_connections(self):
+        """Test that new connections carry the configured PRAGMAs"""
+        profile = db_tuning.get_profile()
+        with connection.cursor() as cursor:
+            cursor.execute('PRAGMA busy_timeout')
+            self.assertEqual(cursor.fetchone()[0], profile['busy_timeout'])
+            cursor.execute('PRAGMA cache_size')
+            self.assertEqual(cursor.fetchone()[0], profile['cache_size'])
+
+    def test_unset_pragmas_are_skipped(self):
+        """Test that settings set to None are left at SQLite's defaults"""
+        statements = db_tuning.pragma_statements({'journal_mode': 'WAL', 'synchronous': None})
+        self.assertEqual(statements, ['PRAGMA journal_mode=WAL'])
+
+    @override_settings(SQLITE_PROFILE={'maintenance_interval': 0})
+    def test_only_servers_set_the_journal_mode(self):
+        """Test that commands leave the database file's journal mode alone and servers set it"""
+        def statements():
+            raw = mock.MagicMock()
+            sqlite_connection = mock.Mock(vendor='sqlite', settings_dict={'NAME': 'db.sqlite3'}, connection=raw)
+            db_tuning.tune_connection(sender=None, connection=sqlite_connection)
+            return [call.args[0] for call in raw.execute.call_args_list]
+
+        self.assertNotIn('PRAGMA journal_mode=WAL', statements())
+        with mock.patch('core.db_tuning._serving', True):
+            self.assertIn('PRAGMA journal_mode=WAL', statements())
+        with override_settings(SQLITE_PROFILE={'maintenance_interval': 0, 'journal_mode_everywhere': True}):
+            self.assertIn('PRAGMA journal_mode=WAL', statements())
+
+    def test_maintenance_runs_once_per_interval(self):
+        """Test that PRAGMA optimize / checkpoint is rate limited per process"""
+        db_tuning._last_maintenance = time_module.monotonic() - 120
+        self.assertTrue(db_tuning._maintenance_due(60))
+        self.assertFalse(db_tuning._maintenance_due(60))
+        self.assertFalse(db_tuning._maintenance_due(0))
+
+
+@override_settings(SQLITE_WRITES={'busy_timeout': 10, 'retries': 2, 'backoff': 0, 'max_backoff': 0})
+class WriteTransactionTestCase(TransactionTestCase):
+    """Test cases for BEGIN IMMEDIATE write transactions with retry on lock"""
+
+    def flaky_begin(self, failures):
+        """Atomic.__enter__ that reports the database locked the first failures times"""
+        real_enter = Atomic.__enter__
+        modes = []
+
+        def enter(atomic):
+            modes.append(connection.transaction_mode)
+            if len(modes) <= failures:
+                raise OperationalError('database is locked')
+            return real_enter(atomic)
+
+        return mock.patch.object(Atomic, '__enter__', enter), modes
+
+    def test_locked_begin_is_retried(self):
+        """Test that a locked BEGIN IMMEDIATE is retried and the block runs once"""
+        patch, modes = self.flaky_begin(failures=2)
+        runs = []
+        with patch:
+            with db_writes.atomic():
+                runs.append(connection.in_atomic_block)
+
+        self.assertEqual(runs, [True])
+        self.assertEqual(modes, ['IMMEDIATE'] * 3)
+        self.assertIsNone(connection.transaction_mode)
+
+    def test_gives_up_after_retries(self):
+        """Test that contention beyond the retry budget raises WriteContention and is counted"""
+        db_writes.reset_stats()
+        patch, modes = self.flaky_begin(failures=10)
+        with patch, self.assertLogs('core.db_writes', 'WARNING'):
+            with self.assertRaises(db_writes.WriteContention):
+                with db_writes.atomic():
+                    pass
+
+        self.assertEqual(len(modes), 3)
+        self.assertEqual(db_writes.stats()['failures'], 1)
+
+    def test_nested_block_is_a_savepoint(self):
+        """Test that only the outermost block takes the write lock"""
+        with db_writes.atomic():
+            patch, modes = self.flaky_begin(failures=0)
+            with patch:
+                with db_writes.atomic():
+                    pass
+        self.assertEqual(modes, [None])
+
+    def test_first_query_of_a_thread(self):
+        """Test that a thread whose first database access is the write block gets its connection"""
+        errors = []
+
+        def write():
+            try:
+                with db_writes.atomic():
+                    ProductCategory.objects.create(name='Thread category')
+            except Exception as exc:
+                errors.append(exc)
+            finally:
+                connection.close()
+
+        thread = threading.Thread(target=write)
+        thread.start()
+        thread.join()
+        self.assertEqual(errors, [])
+        self.assertTrue(ProductCategory.objects.filter(name='Thread category').exists())
+
+
+class ReportingSnapshotTestCase(FixturesMixin, TestCase):
+    """Test cases for serving reports from the read-only snapshot"""
+
+    def setUp(self):
+        self.dealer = self.create_dealer('snapshot_dealer')
+        self.router = reporting.ReportingRouter()
+
+    def fresh_snapshot(self, age=60):
+        info = {'taken_at': datetime_type(2025, 1, 31, 8, 0, tzinfo=dt_timezone.utc), 'age': age, 'interval_minutes': 5}
+        return mock.patch('core.reporting.snapshot_info', return_value=info)
+
+    def test_router_only_routes_reads_inside_snapshot_views(self):
+        """Test that reads go to the snapshot only inside from_snapshot and writes never do"""
+        seen = []
+
+        @reporting.from_snapshot
+        def view(request):
+            seen.append((self.router.db_for_read(Order), self.router.db_for_write(Order)))
+
+        with self.fresh_snapshot():
+            view(mock.Mock())
+        self.assertEqual(seen, [('reporting', 'default')])
+        self.assertIsNone(self.router.db_for_read(Order))
+        self.assertFalse(self.router.allow_migrate('reporting', 'core'))
+        self.assertTrue(self.router.allow_migrate('default', 'core'))
+
+    def test_stale_or_missing_snapshot_reads_live(self):
+        """Test that reports fall back to the live database without a fresh snapshot"""
+        @reporting.from_snapshot
+        def view(request):
+            return reporting.active_snapshot()
+
+        request = mock.Mock()
+        with mock.patch('core.reporting.snapshot_info', return_value=None):
+            self.assertIsNone(view(request))
+        self.assertIsNone(request.reporting_snapshot)
+        with self.fresh_snapshot(age=reporting.get_options()['max_age'] + 1):
+            self.assertIsNone(view(request))
+        self.assertIsNone(request.reporting_snapshot)
+
+    def test_snapshot_aggregates_cached_apart_from_live(self):
+        """Test that a report computed from the snapshot is not served as the live figure"""
+        name = f'snapshot-test-{time_module.time()}'
+        self.assertEqual(cached_report(name, lambda: 'live'), 'live')
+        token = reporting._read_alias.set(reporting.SNAPSHOT_ALIAS)
+        try:
+            self.assertEqual(cached_report(name, lambda: 'snapshot'), 'snapshot')
+        finally:
+            reporting._read_alias.reset(token)
+
+    def test_report_shows_snapshot_freshness(self):
+        """Test that a report served from the snapshot says how old its data is"""
+        self.client.login(username='snapshot_dealer', password='testpass123')
+        # The test mirror of the reporting alias cannot see this test's transaction
+        with self.fresh_snapshot(), mock.patch('core.reporting.SNAPSHOT_ALIAS', 'default'):
+            response = self.client.get(reverse('core:sales_report'))
+        self.assertContains(response, 'Data as of Jan 31, 2025')
+
+        response = self.client.get(reverse('core:sales_report'))
+        self.assertNotContains(response, 'Data as of')
+
+    def test_stock_report_reads_products_and_stock_from_the_snapshot(self):
+        """Test that the stock report takes products and their stock from the snapshot, not the live catalogue"""
+        self.create_product(current_stock=7)
+        self.client.login(username='snapshot_dealer', password='testpass123')
+        with self.fresh_snapshot(), mock.patch('core.reporting.SNAPSHOT_ALIAS', 'default'), \
+                mock.patch('core.catalogue.active_products_with_stock', side_effect=AssertionError):
+            response = self.client.get(reverse('core:stock_report'))
+        self.assertEqual(response.context['inventory_summary']['total_current_stock'], 7)
+        self.assertEqual([row['product'].current_stock for row in response.context['product_details']], [7])
+
+
+class OrderIndexTestCase(FixturesMixin, TestCase):
+    """Test that the order queries the list, history and report pages run are index-driven"""
+
+    def setUp(self):
+        """Set up a dealer, a customer, a cashier and a delivered order"""
+        self.dealer = self.create_dealer('index_dealer')
+        self.customer = self.create_customer('index_customer')
+        self.cashier = self.create_cashier('index_cashier')
+        product = self.create_product(current_stock=20)
+        for status in ('pending', 'delivered'):
+            Order.objects.create(
+                customer=self.customer, product=product, quantity=1, delivery_type='pickup', status=status,
+                delivery_date=timezone.now() if status == 'delivered' else None, processed_by=self.cashier
+            )
+
+    def order_plans(self, url, user):
+        """Plans of the statements url runs against core_order when requested as user"""
+        plans = query_plans.collect([query_plans.resolve(url)], user).values()
+        return [entry for entry in plans if '"core_order"' in entry['sql']]
+
+    def assertUsesIndex(self, url, user, index_name):
+        """url searches core_order through index_name and never reads the whole table"""
+        plans = self.order_plans(url, user)
+        self.assertTrue(plans, f'{url} runs no order queries')
+        for entry in plans:
+            self.assertNotIn('core_order', entry['scans'], f"{entry['sql']}\n{entry['plan']}")
+        lines = [line for entry in plans for line in entry['plan']]
+        self.assertTrue(any(f'INDEX {index_name} ' in line for line in lines), '\n'.join(lines))
+
+    def test_order_management_lists(self):
+        """Test that the dealer order list filtered by status is read from the status index"""
+        self.assertUsesIndex('core:order_management?status=pending', self.dealer, 'order_status_date_idx')
+
+    def test_customer_order_history(self):
+        """Test that a customer's order history is looked up by customer and date"""
+        self.assertUsesIndex('core:order_history', self.customer, 'order_customer_date_idx')
+
+    def test_sales_report_range(self):
+        """Test that the sales report searches delivered orders by delivery date range"""
+        self.assertUsesIndex('core:sales_report', self.dealer, 'order_status_delivered_idx')
+
+    def test_cashier_daily_report(self):
+        """Test that the cashier daily report searches each cashier's delivered orders by delivery date"""
+        self.assertUsesIndex('core:cashier_reports_daily', self.dealer, 'order_cashier_delivered_idx')
+
+
+class DateRangesTestCase(FixturesMixin, TestCase):
+    """Test cases for half-open date range filtering"""
+
+    def setUp(self):
+        product = self.create_product(current_stock=50, minimum_stock=10)
+        self.orders = {}
+        for label, moment in [
+            ('before', datetime_type(2025, 1, 9, 23, 59, 59, tzinfo=dt_timezone.utc)),
+            ('first', datetime_type(2025, 1, 10, 0, 0, tzinfo=dt_timezone.utc)),
+            ('last', datetime_type(2025, 1, 12, 23, 59, 59, tzinfo=dt_timezone.utc)),
+            ('after', datetime_type(2025, 1, 13, 0, 0, tzinfo=dt_timezone.utc)),
+        ]:
+            self.orders[label] = Order.objects.create(
+                product=product, quantity=1, delivery_type='pickup', status='delivered',
+                total_amount=Decimal('500.00'), delivery_date=moment
+            )
+
+    def delivered_labels(self, queryset):
+        ids = set(queryset.values_list('id', flat=True))
+        return sorted(label for label, order in self.orders.items() if order.id in ids)
+
+    def test_days_are_inclusive_and_end_is_open(self):
+        """Test that a range covers its first and last day completely and nothing after"""
+        orders = date_ranges.filter_dates(Order.objects.all(), 'delivery_date', date(2025, 1, 10), date(2025, 1, 12))
+        self.assertEqual(self.delivered_labels(orders), ['first', 'last'])
+        day = date_ranges.filter_day(Order.objects.all(), 'delivery_date', date(2025, 1, 9))
+        self.assertEqual(self.delivered_labels(day), ['before'])
+        open_ended = date_ranges.filter_dates(Order.objects.all(), 'delivery_date', date(2025, 1, 12))
+        self.assertEqual(self.delivered_labels(open_ended), ['after', 'last'])
+
+    def test_range_filter_uses_delivery_index(self):
+        """Test that a delivered-orders date range searches the (status, delivery_date) index"""
+        sales = date_ranges.filter_dates(
+            Order.objects.filter(status='delivered'), 'delivery_date', date(2025, 1, 10), date(2025, 1, 12)
+        )
+        self.assertIn('order_status_delivered_idx (status=? AND delivery_date>? AND delivery_date<?)', sales.explain())
+
+    def test_report_period_defaults(self):
+        """Test that missing dates default on their own and invalid ones reset the period"""
+        today = timezone.localdate()
+        self.assertEqual(date_ranges.report_period({}), (today - timedelta(days=30), today))
+        self.assertEqual(
+            date_ranges.report_period({'date_from': '2025-01-10'}), (date(2025, 1, 10), today)
+        )
+        self.assertEqual(
+            date_ranges.report_period({'date_from': '2025-01-10', 'date_to': 'soon'}), (today - timedelta(days=30), today)
+        )
+        self.assertIsNone(date_ranges.parse_date('2025-02-30'))
+
+
+class QueryPlanAdvisorTestCase(TestCase):
+    """Test cases for the optimize_performance index advisor and plan checks"""
+
+    def test_analyse_flags_scans_and_temp_sorts(self):
+        """Test that table scans without an index and temp B-tree sorts are flagged"""
+        plan = [
+            'SCAN core_order',
+            'SCAN core_lpgproduct USING INDEX core_lpgproduct_name_idx',
+            'SEARCH auth_user USING INTEGER PRIMARY KEY (rowid=?)',
+            'SCAN CONSTANT ROW',
+            'USE TEMP B-TREE FOR ORDER BY',
+        ]
+        scans, temp_btrees = query_plans.analyse(plan, {'core_order', 'core_lpgproduct', 'auth_user'})
+        self.assertEqual(scans, ['core_order'])
+        self.assertEqual(temp_btrees, ['ORDER BY'])
+
+    def test_suggest_index_from_filters_and_ordering(self):
+        """Test that suggestions put equality filters first, then the range or the ordering"""
+        ranged = str(Order.objects.filter(
+            status='delivered', delivery_date__gte=timezone.now(), delivery_date__lt=timezone.now()
+        ).query)
+        self.assertEqual(query_plans.suggest_index(ranged, 'core_order'), ['status', 'delivery_date'])
+        ordered = str(Order.objects.filter(customer_id=1).order_by('-order_date').query)
+        self.assertEqual(query_plans.suggest_index(ordered, 'core_order'), ['customer', '-order_date'])
+        self.assertEqual(query_plans.existing_index('core_order', ['customer', '-order_date']), 'order_customer_date_idx')
+
+    def test_diff_reports_scan_regressions(self):
+        """Test that only statements which now scan a table they used to search are regressions"""
+        before = {'a': {'scans': []}, 'b': {'scans': ['core_order']}, 'gone': {'scans': []}}
+        after = {'a': {'scans': ['core_order']}, 'b': {'scans': ['core_order']}, 'new': {'scans': ['core_order']}}
+        regressions, missing = query_plans.diff(before, after)
+        self.assertEqual([(key, tables) for key, _, tables in regressions], [('a', ['core_order'])])
+        self.assertEqual(missing, ['gone'])
+
+    def test_check_plans_against_saved_snapshot(self):
+        """Test that a saved snapshot of the captured pages checks clean on the next run"""
+        User.objects.create_user(username='plan_admin', password='testpass123', is_staff=True, is_superuser=True)
+        path = os.path.join(tempfile.mkdtemp(), 'plans.json')
+        options = {'urls': ['core:order_management'], 'as_user': 'plan_admin', 'plans_file': path, 'stdout': StringIO()}
+        call_command('optimize_performance', advise_indexes=True, save_plans=True, **options)
+        self.assertTrue(query_plans.load(path))
+
+        output = StringIO()
+        call_command('optimize_performance', check_plans=True, **{**options, 'stdout': output})
+        self.assertIn('No query plan regressions', output.getvalue())
+
+
+class ArchiveTestCase(FixturesMixin, TestCase):
+    """Test cases for moving old orders, movements and notifications to the archive"""
+
+    def setUp(self):
+        """Set up a customer with an old delivered batch of two orders, an old pending order and a recent sale"""
+        self.customer = self.create_customer('archive_customer')
+        self.cashier = self.create_cashier('archive_cashier')
+        self.product = self.create_product(cost_price=Decimal('300.00'), current_stock=50, minimum_stock=5)
+        self.long_ago = timezone.now() - timedelta(days=800)
+        first = self.create_order(status='delivered', delivery_date=self.long_ago)
+        second = self.create_order(status='delivered', delivery_date=self.long_ago, batch_id=first.batch_id)
+        self.old_batch = [first, second]
+        self.old_pending = self.create_order(status='pending')
+        self.recent = self.create_order(status='delivered', delivery_date=timezone.now())
+        Order.objects.filter(id__in=[first.id, second.id, self.old_pending.id]).update(order_date=self.long_ago)
+
+        self.notification = Notification.objects.create(
+            customer=self.customer, order=first, notification_type='order_delivered', title='Delivered', message='x'
+        )
+        self.movement = StockMovement.objects.create(
+            product=self.product, movement_type='sale', quantity=-1, previous_stock=51, new_stock=50,
+            order=first, created_by=self.customer
+        )
+        self.sale = CashierTransaction.objects.create(
+            cashier=self.cashier, order=first, transaction_type='order', amount=Decimal('500.00'), customer=self.customer
+        )
+
+    def create_order(self, **fields):
+        return Order.objects.create(
+            customer=self.customer, product=self.product, quantity=1, delivery_type='pickup',
+            total_amount=Decimal('500.00'), **fields
+        )
+
+    def test_closed_batches_move_with_their_dependents(self):
+        """Test that an old closed batch moves with its notification, movement and sale, and open orders stay"""
+        total_orders = DashboardCounters.objects.get().total_orders
+        self.assertEqual(CustomerProfile.objects.get(user=self.customer).unread_notification_count, 1)
+
+        moved = archive.run(batch_size=1)
+
+        self.assertEqual(moved, {'order': 2, 'stock_movement': 1, 'notification': 1, 'cashier_transaction': 1})
+        self.assertEqual(set(Order.objects.values_list('id', flat=True)), {self.old_pending.id, self.recent.id})
+        self.assertFalse(Notification.objects.exists())
+        self.assertFalse(StockMovement.objects.exists())
+        self.assertFalse(CashierTransaction.objects.exists())
+        self.assertEqual(CustomerProfile.objects.get(user=self.customer).unread_notification_count, 0)
+        # Archived orders still count towards the lifetime total, also after a rebuild
+        self.assertEqual(DashboardCounters.objects.get().total_orders, total_orders)
+        self.assertEqual(dashboard.rebuild().total_orders, total_orders)
+        # A second run finds nothing left to move
+        self.assertEqual(archive.run(), {'order': 0, 'stock_movement': 0, 'notification': 0, 'cashier_transaction': 0})
+        self.assertEqual(ArchivedRecord.objects.count(), 5)
+
+    def test_cashier_totals_include_archived_transactions(self):
+        """Test that old transactions without an order are archived and still count in cashier totals"""
+        payment = CashierTransaction.objects.create(
+            cashier=self.cashier, transaction_type='payment', amount=Decimal('200.00'), customer=self.customer
+        )
+        CashierTransaction.objects.filter(pk=payment.pk).update(created_at=self.long_ago)
+
+        moved = archive.run()
+
+        self.assertEqual(moved['cashier_transaction'], 2)
+        self.assertEqual(archive.transaction_totals(self.cashier.pk), {'count': 2, 'amount': Decimal('700.00')})
+        by_cashier = archive.transaction_totals_by_cashier()[self.cashier.pk]
+        self.assertEqual(by_cashier['by_type'], {'order': 1, 'payment': 1})
+        self.client.force_login(self.cashier.user)
+        response = self.client.get(reverse('core:cashier_personal_dashboard'))
+        self.assertEqual((response.context['total_transactions'], response.context['total_amount']),
+                         (2, Decimal('700.00')))
+
+    def test_open_batch_keeps_its_closed_items(self):
+        """Test that a batch with an item still pending is not archived at all"""
+        Order.objects.filter(id=self.old_pending.id).update(batch_id=self.old_batch[0].batch_id)
+        self.assertEqual(archive.pending()['order'], 0)
+        self.assertEqual(archive.run()['order'], 0)
+
+    def test_order_detail_reads_the_archive(self):
+        """Test that an archived order's detail page is restored from the archive"""
+        first = self.old_batch[0]
+        archive.run()
+        restored = archive.archived_order(first.id, customer=self.customer)
+        self.assertEqual((restored.total_amount, restored.delivery_date), (first.total_amount, first.delivery_date))
+
+        self.client.login(username='archive_customer', password='testpass123')
+        response = self.client.get(reverse('core:order_detail', args=[first.id]))
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.context['archived'])
+        self.assertEqual(response.context['batch_item_count'], 2)
+        self.assertEqual(response.context['batch_total'], Decimal('1000.00'))
+        other = User.objects.create_user(username='archive_other', password='testpass123')
+        self.client.force_login(other)
+        self.assertEqual(self.client.get(reverse('core:order_detail', args=[first.id])).status_code, 404)
+
+    def test_report_totals_include_archived_sales(self):
+        """Test that delivered order totals for an old period add the archived orders"""
+        archive.run()
+        period = (timezone.localdate(self.long_ago), timezone.localdate())
+        totals = archive.with_archived_orders(
+            {'total_orders': 1, 'total_revenue': Decimal('500.00'), 'total_quantity': 1}, *period
+        )
+        self.assertEqual(totals['total_orders'], 3)
+        self.assertEqual(totals['archived_orders'], 2)
+        self.assertEqual(totals['total_revenue'], Decimal('1500.00'))
+        self.assertEqual(totals['total_cost_of_goods'], Decimal('600.00'))
+        self.assertEqual(totals['average_order_value'], Decimal('500.00'))
+        recent = archive.with_archived_orders({'total_orders': 0}, timezone.localdate(), timezone.localdate())
+        self.assertEqual(recent['archived_orders'], 0)
+
+
+class RetentionTestCase(FixturesMixin, TestCase):
+    """Test cases for the batched retention jobs and their in-process schedule"""
+
+    def setUp(self):
+        self.temp_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.temp_dir, ignore_errors=True)
+        self.customer = self.create_customer('retention_customer')
+
+    def test_expired_sessions_are_deleted(self):
+        """Test that only expired sessions go, across several batches"""
+        now = timezone.now()
+        for index in range(5):
+            Session.objects.create(session_key=f'expired{index}', session_data='', expire_date=now - timedelta(days=1))
+        Session.objects.create(session_key='active', session_data='', expire_date=now + timedelta(days=1))
+
+        results = retention.run(['sessions'], batch_size=2, pause=0)
+
+        self.assertEqual(results['sessions']['rows'], 5)
+        self.assertEqual(list(Session.objects.values_list('session_key', flat=True)), ['active'])
+
+    def test_notifications_are_archived_before_they_are_pruned(self):
+        """Test that retention leaves notifications to the archive and only drops archived copies past its own horizon"""
+        now = timezone.now()
+        for label, is_read, days in [('ancient_read', True, 1200), ('old_read', True, 600),
+                                     ('old_unread', False, 600), ('recent_read', True, 1)]:
+            notification = Notification.objects.create(
+                customer=self.customer, notification_type='system_message', title=label, message='x', is_read=is_read
+            )
+            Notification.objects.filter(pk=notification.pk).update(created_at=now - timedelta(days=days))
+
+        # Before archiving, retention removes nothing from the notification table
+        self.assertEqual(retention.run(['notifications'], pause=0)['notifications']['rows'], 0)
+        self.assertEqual(Notification.objects.count(), 4)
+
+        self.assertEqual(archive.run()['notification'], 2)
+        results = retention.run(['notifications'], batch_size=1, pause=0)
+
+        self.assertEqual(results['notifications']['rows'], 1)
+        self.assertEqual(sorted(Notification.objects.values_list('title', flat=True)), ['old_unread', 'recent_read'])
+        archived = ArchivedRecord.objects.filter(kind='notification')
+        self.assertEqual([record.payload['title'] for record in archived], ['old_read'])
+
+    def test_old_change_events_are_deleted(self):
+        """Test that change events past the feed's retention go even when no broker prunes them"""
+        ChangeEvent.objects.bulk_create(ChangeEvent(topic=events.STAFF_TOPIC, kind=events.ORDERS, payload={})
+                                        for _ in range(3))
+        ChangeEvent.objects.filter(pk__in=ChangeEvent.objects.values('pk')[:2]).update(
+            created_at=timezone.now() - events.RETENTION - timedelta(minutes=1)
+        )
+
+        results = retention.run(['change_events'], batch_size=1, pause=0)
+
+        self.assertEqual(results['change_events']['rows'], 2)
+        self.assertEqual(ChangeEvent.objects.count(), 1)
+
+    def test_reviewed_registration_documents_are_removed(self):
+        """Test that old reviewed registrations lose their ID document file but keep their row"""
+        with override_settings(MEDIA_ROOT=self.temp_dir):
+            registrations = {}
+            for status in ('rejected', 'pending'):
+                registrations[status] = PendingRegistration.objects.create(
+                    username=f'retention_{status}', email=f'{status}@example.com', password='x',
+                    phone_number='09123456789', address='Test Address', id_type='other', id_number='1',
+                    status=status, id_document=SimpleUploadedFile('id.jpg', b'x' * 100, content_type='image/jpeg'),
+                )
+            PendingRegistration.objects.update(created_at=timezone.now() - timedelta(days=60))
+            rejected_path = registrations['rejected'].id_document.path
+
+            results = retention.run(['registration_documents'], registration_days=30)
+
+            self.assertEqual(results['registration_documents'], {'rows': 1, 'bytes': 100})
+            self.assertFalse(os.path.exists(rejected_path))
+            self.assertEqual(PendingRegistration.objects.get(status='rejected').id_document.name, '')
+            self.assertTrue(os.path.exists(registrations['pending'].id_document.path))
+
+    def test_large_logs_keep_their_last_lines_in_place(self):
+        """Test that a log over the limit keeps its last full lines in the same file"""
+        path = os.path.join(self.temp_dir, 'big.log')
+        with open(path, 'w') as handle:
+            handle.writelines(f'line {index:04d}\n' for index in range(1000))
+        small = os.path.join(self.temp_dir, 'small.log')
+        with open(small, 'w') as handle:
+            handle.write('line\n')
+        inode = os.stat(path).st_ino
+
+        results = retention.run(['logs'], log_files=[os.path.join(self.temp_dir, '*.log')],
+                                log_max_bytes=1000, log_keep_bytes=105)
+
+        with open(path) as handle:
+            lines = handle.read().splitlines()
+        self.assertEqual(lines, [f'line {index:04d}' for index in range(990, 1000)])
+        self.assertEqual(os.stat(path).st_ino, inode)
+        self.assertEqual(results['logs'], {'rows': 1, 'bytes': 10000 - 100})
+        self.assertEqual(os.path.getsize(small), 5)
+
+    def test_schedule_starts_one_background_run_per_interval(self):
+        """Test that the request hook starts a run once the interval has passed, and not again right after"""
+        cache.delete(retention.LOCK_KEY)
+        self.addCleanup(cache.delete, retention.LOCK_KEY)
+        with override_settings(RETENTION={'interval': 60}), \
+                mock.patch.object(retention, '_last_run', time_module.monotonic() - 120), \
+                mock.patch('core.retention.threading.Thread') as thread:
+            retention.run_when_due(sender=None)
+            retention.run_when_due(sender=None)
+        thread.assert_called_once()
+        thread.return_value.start.assert_called_once()
@@ -18,7 +18,7 @@ from .views import (
     create_category, get_categories, export_order_history_pdf
     , export_stock_report_pdf, export_sales_report_pdf,
     customer_notifications, mark_notification_as_read, mark_all_notifications_as_read, 
-    get_unread_notifications_count, cancel_order,
+    get_unread_notifications_count, event_stream, poll_updates, cancel_order,
     stock_in_list, stock_out_list,
     remove_profile_picture
 )
@@ -31,7 +31,7 @@ from .cashier_views import (
 from .cashier_reports import (
     cashier_reports, cashier_daily_report, cashier_monthly_report, cashier_yearly_report
 )
-from .cashier_walkin_view import cashier_walkin_order
+from .cashier_walkin_view import cashier_walkin_order, cashier_scan_lookup
 
 app_name = 'core'
 
@@ -64,6 +64,8 @@ urlpatterns = [
     path('customer/notifications/<int:notification_id>/read/', mark_notification_as_read, name='mark_notification_as_read'),
     path('customer/notifications/read-all/', mark_all_notifications_as_read, name='mark_all_notifications_as_read'),
     path('api/notifications/unread-count/', get_unread_notifications_count, name='get_unread_notifications_count'),
+    path('api/events/', event_stream, name='event_stream'),
+    path('api/poll/', poll_updates, name='poll_updates'),
     
     # HTMX endpoints for order system
     path('check-stock/', check_stock, name='check_stock'),
@@ -144,6 +146,7 @@ urlpatterns = [
     path('cashier/dashboard/', cashier_personal_dashboard, name='cashier_personal_dashboard'),
     path('cashier/orders/', cashier_order_list, name='cashier_order_list'),
     path('cashier/walkin-order/', cashier_walkin_order, name='cashier_walkin_order'),
+    path('cashier/scan/', cashier_scan_lookup, name='cashier_scan_lookup'),
     path('cashier/reports/daily/', cashier_personal_reports_daily, name='cashier_personal_reports_daily'),
     path('cashier/reports/monthly/', cashier_personal_reports_monthly, name='cashier_personal_reports_monthly'),
     path('cashier/reports/daily/export-pdf/', export_daily_report_pdf, name='export_daily_report_pdf'),
@@ -2,18 +2,27 @@ from django.shortcuts import render, redirect, get_object_or_404
 from django.contrib.auth import login, authenticate, logout
 from django.contrib.auth.decorators import login_required, user_passes_test
 from django.contrib import messages
-from django.http import JsonResponse, HttpResponse
-from django.views.decorators.http import require_http_methods
+from django.core.handlers.asgi import ASGIRequest
+from django.http import Http404, JsonResponse, HttpResponse, StreamingHttpResponse
+from django.views.decorators.cache import cache_control
+from django.views.decorators.http import condition, require_http_methods
 from django.views.decorators.csrf import csrf_protect
 from django.contrib.auth.models import User
-from django.db import transaction
-from django.db.models import Count, Sum, Q, F, Avg
+from django.db.models import Count, Sum, Q, F, Avg, DecimalField
+from django.db.models.functions import Coalesce
 from django.utils import timezone
+from django.utils.cache import get_conditional_response
+from django.utils.functional import SimpleLazyObject
+from django.utils.http import quote_etag
 from django.core.paginator import Paginator
-from datetime import datetime, timedelta
+from datetime import timedelta
 from decimal import Decimal
+import hashlib
 import uuid
-from django.template.loader import get_template
+from collections import namedtuple
+from django.template.loader import get_template, render_to_string
+from django.utils.html import format_html
+from django.utils.safestring import mark_safe
 from xhtml2pdf import pisa
 from reportlab.lib.pagesizes import A4
 from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
@@ -22,6 +31,9 @@ from reportlab.platypus import SimpleDocTemplate, Table, TableStyle, Paragraph,
 from reportlab.lib import colors
 from reportlab.lib.enums import TA_CENTER, TA_LEFT
 from io import BytesIO
+from . import archive, catalogue, dashboard, date_ranges, db_writes, etags, events, notifications, outbox, reporting
+from .caching import ORDERS_SCOPE, REPORTS_SCOPE, cached_report
+from .data_versions import get_version
 from .forms import (
     CustomerRegistrationForm, CustomerLoginForm, CustomerProfileForm,
     UserUpdateForm, OrderForm, DeliveryLogForm, ProductForm,
@@ -208,10 +220,11 @@ def remove_profile_picture(request):
 
 # HTMX Views for enhanced form validation
 @csrf_protect
-def validate_username(request):
+async def validate_username(request):
     """
     Enhanced HTMX endpoint for real-time username validation with security
     Requirements: 10.1, 10.2, 10.3 - Form validation with security measures
+    Async: fires on every keystroke, and only waits on one EXISTS query
     """
     if request.method == 'POST':
         username = request.POST.get('username', '').strip()
@@ -242,7 +255,7 @@ def validate_username(request):
                 })
             
             # Uniqueness validation
-            if User.objects.filter(username__iexact=username).exists():
+            if await User.objects.filter(username__iexact=username).aexists():
                 return JsonResponse({
                     'valid': False,
                     'message': 'This username is already taken.'
@@ -262,10 +275,11 @@ def validate_username(request):
 
 
 @csrf_protect
-def validate_email(request):
+async def validate_email(request):
     """
     Enhanced HTMX endpoint for real-time email validation with security
     Requirements: 10.1, 10.2, 10.3 - Form validation with security measures
+    Async: fires on every keystroke, and only waits on one EXISTS query
     """
     if request.method == 'POST':
         email = request.POST.get('email', '').strip()
@@ -292,7 +306,7 @@ def validate_email(request):
                 except (ValueError, TypeError):
                     pass
             
-            if query.exists():
+            if await query.aexists():
                 return JsonResponse({
                     'valid': False,
                     'message': 'This email is already registered.'
@@ -311,6 +325,41 @@ def validate_email(request):
     return JsonResponse({'valid': False, 'message': 'Invalid request method.'})
 
 
+def customer_order_summary(user):
+    """
+    Recent batches and batch counts for the customer dashboard, computed only when rendered
+    The orders fragment is cached on the customer's orders version, so a poll that hits
+    the fragment cache never runs these queries
+    """
+    def compute():
+        all_orders = Order.objects.filter(customer=user).select_related('product').order_by('-order_date')
+        
+        seen_batches = set()
+        unique_orders = []
+        for order in all_orders:
+            if order.batch_id not in seen_batches:
+                seen_batches.add(order.batch_id)
+                unique_orders.append(order)
+            if len(unique_orders) >= 5:
+                break
+        
+        return {
+            'recent_orders': unique_orders,
+            'total_orders': len(seen_batches),
+            'pending_orders': Order.objects.filter(customer=user, status='pending').values('batch_id').distinct().count(),
+            'delivered_orders': Order.objects.filter(customer=user, status='delivered').values('batch_id').distinct().count(),
+        }
+    
+    summary = SimpleLazyObject(compute)
+    return {
+        'orders_version': get_version(ORDERS_SCOPE, user.pk),
+        'recent_orders': lambda: summary['recent_orders'],
+        'total_orders': lambda: summary['total_orders'],
+        'pending_orders': lambda: summary['pending_orders'],
+        'delivered_orders': lambda: summary['delivered_orders'],
+    }
+
+
 # Customer Dashboard View
 @login_required
 def customer_dashboard(request):
@@ -320,29 +369,7 @@ def customer_dashboard(request):
     Optimized: Added select_related to prevent N+1 queries
     Batch orders are grouped together
     """
-    all_orders = Order.objects.filter(customer=request.user).select_related('product').order_by('-order_date')
-    
-    seen_batches = set()
-    unique_orders = []
-    for order in all_orders:
-        if order.batch_id not in seen_batches:
-            seen_batches.add(order.batch_id)
-            unique_orders.append(order)
-        if len(unique_orders) >= 5:
-            break
-    
-    order_stats = {
-        'total_orders': len(seen_batches),
-        'pending_orders': Order.objects.filter(customer=request.user, status='pending').values('batch_id').distinct().count(),
-        'delivered_orders': Order.objects.filter(customer=request.user, status='delivered').values('batch_id').distinct().count(),
-    }
-    
-    context = {
-        'recent_orders': unique_orders,
-        'total_orders': order_stats['total_orders'],
-        'pending_orders': order_stats['pending_orders'],
-        'delivered_orders': order_stats['delivered_orders'],
-    }
+    context = customer_order_summary(request.user)
     return render(request, 'customer/dashboard.html', context)
 
 
@@ -359,7 +386,7 @@ def place_order(request):
     import traceback
     
     # Restrict access to customers only - NOT cashiers
-    if hasattr(request.user, 'cashier_profile') and request.user.cashier_profile.is_active:
+    if request.roles.is_cashier:
         messages.error(request, 'Cashiers cannot place orders. Use order management to process customer orders.')
         return redirect('core:cashier_order_list')
     
@@ -386,7 +413,7 @@ def place_order(request):
             if delivery_type == 'delivery' and not delivery_address.strip():
                 raise ValueError('Delivery address is required for delivery orders')
             
-            with transaction.atomic():
+            with db_writes.atomic():
                 orders = []
                 total_amount = Decimal('0.00')
                 batch_id = uuid.uuid4()
@@ -417,9 +444,7 @@ def place_order(request):
                         total_amount=order_total
                     )
                     order.save()
-                    
-                    product.current_stock -= quantity
-                    product.save()
+                    order.deduct_stock(created_by=request.user)
                     
                     orders.append(order)
                 
@@ -470,20 +495,22 @@ def place_order(request):
         form = OrderForm(user=request.user)
     
     # Get available products for display
-    products = LPGProduct.objects.filter(is_active=True).order_by('name', 'size')
+    products = catalogue.active_products_with_stock()
     
     context = {
         'form': form,
         'products': products,
+        'catalogue_version': catalogue.get_catalogue().version,
     }
     return render(request, 'customer/place_order.html', context)
 
 
 @login_required
-def check_stock(request):
+async def check_stock(request):
     """
     HTMX endpoint for real-time stock checking
     Requirements: 2.4 - Real-time inventory checking using HTMX
+    Async: the partial needs no context processors, so it is rendered without the request
     """
     product_id = request.GET.get('product')
     quantity = request.GET.get('quantity', 1)
@@ -496,13 +523,13 @@ def check_stock(request):
         quantity = 1
     
     if not product_id:
-        return render(request, 'customer/stock_info.html', {
+        return HttpResponse(render_to_string('customer/stock_info.html', {
             'show_info': False
-        })
+        }))
     
-    try:
-        product = LPGProduct.objects.get(id=product_id, is_active=True)
-        
+    # Price and metadata come from the catalogue snapshot; only the stock columns are queried
+    product = await catalogue.aget_product_with_stock(product_id)
+    if product is not None:
         # Calculate total price
         total_price = product.price * quantity
         
@@ -527,18 +554,17 @@ def check_stock(request):
             'stock_status': stock_status,
             'stock_level': stock_level,
         }
-        
-    except LPGProduct.DoesNotExist:
+    else:
         context = {
             'show_info': False,
             'error': 'Product not found'
         }
     
-    return render(request, 'customer/stock_info.html', context)
+    return HttpResponse(render_to_string('customer/stock_info.html', context))
 
 
 @login_required
-def get_product_details(request):
+async def get_product_details(request):
     """
     API endpoint for getting product details (price, stock) for the cart system
     """
@@ -551,7 +577,12 @@ def get_product_details(request):
         })
     
     try:
-        product = LPGProduct.objects.get(id=product_id, is_active=True)
+        product = await catalogue.aget_product_with_stock(product_id)
+        if product is None:
+            return JsonResponse({
+                'success': False,
+                'message': 'Product not found'
+            }, status=404)
         
         return JsonResponse({
             'success': True,
@@ -561,11 +592,6 @@ def get_product_details(request):
             'current_stock': product.current_stock,
             'can_fulfill': product.can_fulfill_order(1)
         })
-    except LPGProduct.DoesNotExist:
-        return JsonResponse({
-            'success': False,
-            'message': 'Product not found'
-        }, status=404)
     except Exception as e:
         return JsonResponse({
             'success': False,
@@ -816,13 +842,20 @@ def order_detail(request, order_id):
     """
     Customer order detail view with delivery tracking information
     Requirements: 3.3, 3.4 - Order detail view with tracking
-    Shows all products if batch order
+    Shows all products if batch order; orders moved to the archive are shown read-only from there
     """
-    order = get_object_or_404(Order, id=order_id, customer=request.user)
-    
-    batch_items = order.batch_items
-    batch_total = order.batch_total
-    
+    archived = False
+    try:
+        order = Order.objects.get(id=order_id, customer=request.user)
+        batch_items = list(order.batch_items)
+    except Order.DoesNotExist:
+        order = archive.archived_order(order_id, customer=request.user)
+        if order is None:
+            raise Http404("No Order matches the given query.")
+        archived = True
+        batch_items = archive.archived_batch(order.batch_id)
+    batch_total = sum(item.total_amount for item in batch_items)
+
     status_progress = {
         'pending': 25,
         'out_for_delivery': 75,
@@ -834,6 +867,9 @@ def order_detail(request, order_id):
         'order': order,
         'batch_items': batch_items,
         'batch_total': batch_total,
+        'is_batch_order': len(batch_items) > 1,
+        'batch_item_count': len(batch_items),
+        'archived': archived,
         'progress_percentage': status_progress.get(order.status, 0),
     }
     return render(request, 'customer/order_detail.html', context)
@@ -858,8 +894,8 @@ def mark_order_received(request, order_id):
         return redirect('core:order_detail', order_id=order.id)
     
     try:
-        with transaction.atomic():
-            from .models import Cashier, CashierTransaction
+        with db_writes.atomic():
+            from .models import Cashier
             
             delivered_count = 0
             for item in batch_items:
@@ -874,17 +910,8 @@ def mark_order_received(request, order_id):
                 item.save()
                 delivered_count += 1
                 
-                if item.processed_by:
-                    existing = CashierTransaction.objects.filter(order=item).exists()
-                    if not existing:
-                        CashierTransaction.objects.create(
-                            cashier=item.processed_by,
-                            order=item,
-                            transaction_type='order',
-                            amount=item.total_amount,
-                            payment_method='cash',
-                            customer=item.customer
-                        )
+                # The dispatcher skips orders that already have their transaction
+                outbox.record_sale(item)
             
             messages.success(request, f'Order marked as received successfully! {delivered_count} item(s) delivered.')
     except Exception as e:
@@ -934,7 +961,7 @@ def cancel_order(request, order_id):
         return redirect('core:order_detail', order_id=order.id)
     
     try:
-        with transaction.atomic():
+        with db_writes.atomic():
             cancelled_count = 0
             for item in batch_items.filter(status='pending'):
                 item.product.release_stock(item.quantity)
@@ -946,11 +973,8 @@ def cancel_order(request, order_id):
                 item.save()
                 cancelled_count += 1
             
-            from .models import Notification
-            Notification.objects.create(
-                customer=request.user,
-                notification_type='order_cancelled',
-                order=order,
+            outbox.notify_customer(
+                order, 'order_cancelled',
                 title=f'Order #{order.id} Cancelled',
                 message=f'Your order ({cancelled_count} item(s)) has been cancelled.',
                 reason=cancellation_reason
@@ -983,6 +1007,8 @@ def cancel_order(request, order_id):
 
 
 @login_required
+@cache_control(private=True, no_cache=True)
+@condition(etag_func=etags.customer_orders)
 def refresh_order_status(request):
     """
     HTMX endpoint for real-time order status updates
@@ -1018,108 +1044,60 @@ def is_dealer(user):
     return user.is_authenticated and user.is_staff
 
 
+def order_cost_of_goods(prefix=''):
+    """
+    Per-order COGS expression: the FIFO cost stored at sale time, falling back to
+    quantity * product cost price for orders recorded before cost layers existed
+    """
+    return Coalesce(
+        F(f'{prefix}cost_of_goods'),
+        F(f'{prefix}quantity') * F(f'{prefix}product__cost_price'),
+        output_field=DecimalField(max_digits=14, decimal_places=2)
+    )
+
+
+def recent_activity_context():
+    """
+    Recent orders, deliveries and low stock alerts for the dealer dashboard
+    The querysets are lazy, so a cached recent activity fragment never runs them
+    """
+    return {
+        'recent_orders': Order.objects.select_related('customer', 'product').order_by('-order_date')[:10],
+        'recent_deliveries': DeliveryLog.objects.select_related('product', 'logged_by').order_by('-created_at')[:5],
+        'low_stock_alerts': LPGProduct.objects.filter(
+            is_active=True,
+            current_stock__lte=F('minimum_stock')
+        ).order_by('current_stock')[:5],
+        'activity_version': get_version(REPORTS_SCOPE),
+    }
+
+
 # Dealer/Admin Dashboard Views
 @user_passes_test(is_dealer, login_url='core:login')
 def dealer_dashboard(request):
     """
     Main dealer dashboard with order counts, inventory levels, and recent activity
     Requirements: 4.1, 4.2, 4.3, 4.4, 4.5 - Dealer dashboard with overview
-    Optimized: Combined queries and added caching for better performance
+    Statistics come from the incrementally maintained dashboard counters
     """
-    from django.core.cache import cache
-    
-    # Try to get cached dashboard stats first
-    cache_key = 'dealer_dashboard_stats'
-    dashboard_stats = cache.get(cache_key)
-    
-    if not dashboard_stats:
-        # Calculate dashboard statistics with optimized queries
-        today = timezone.now().date()
-        week_ago = today - timedelta(days=7)
-        
-        # Use aggregate queries for better performance
-        order_stats = Order.objects.aggregate(
-            total_orders=Count('id'),
-            pending_orders=Count('id', filter=Q(status='pending')),
-            out_for_delivery=Count('id', filter=Q(status='out_for_delivery')),
-            delivered_today=Count('id', filter=Q(status='delivered', delivery_date__date=today)),
-            weekly_orders=Count('id', filter=Q(order_date__date__gte=week_ago)),
-            weekly_revenue=Sum('total_amount', filter=Q(order_date__date__gte=week_ago, status='delivered'))
-        )
-        
-        # Inventory statistics with single query
-        inventory_stats = LPGProduct.objects.filter(is_active=True).aggregate(
-            total_products=Count('id'),
-            low_stock_products=Count('id', filter=Q(current_stock__lte=F('minimum_stock'))),
-            out_of_stock=Count('id', filter=Q(current_stock=0)),
-            total_stock_value=Sum(F('current_stock') * F('price'))
-        )
-        
-        dashboard_stats = {
-            **order_stats,
-            **inventory_stats,
-            'weekly_revenue': order_stats['weekly_revenue'] or 0,
-            'total_stock_value': inventory_stats['total_stock_value'] or 0,
-        }
-        
-        # Cache for 30 seconds to reduce database load
-        cache.set(cache_key, dashboard_stats, 30)
-    
-    # Recent activity with optimized queries
-    recent_orders = Order.objects.select_related('customer', 'product').order_by('-order_date')[:10]
-    recent_deliveries = DeliveryLog.objects.select_related('product', 'logged_by').order_by('-created_at')[:5]
-    low_stock_alerts = LPGProduct.objects.filter(
-        is_active=True,
-        current_stock__lte=F('minimum_stock')
-    ).order_by('current_stock')[:5]
-    
     context = {
-        'dashboard_stats': dashboard_stats,
-        'recent_orders': recent_orders,
-        'recent_deliveries': recent_deliveries,
-        'low_stock_alerts': low_stock_alerts,
+        'dashboard_stats': dashboard.get_dashboard_stats(),
+        **recent_activity_context(),
     }
     
     return render(request, 'dealer/dashboard.html', context)
 
 
 @user_passes_test(is_dealer, login_url='core:login')
+@cache_control(private=True, no_cache=True)
+@condition(etag_func=etags.dashboard_stats)
 def refresh_dashboard_stats(request):
     """
     HTMX endpoint for refreshing dashboard statistics with real-time updates
     Requirements: 4.4, 4.5 - Real-time dashboard updates using Unpoly
     """
     if request.headers.get('HX-Request') or request.headers.get('X-Up-Target'):
-        today = timezone.now().date()
-        week_ago = today - timedelta(days=7)
-        
-        # Recalculate statistics
-        dashboard_stats = {
-            'total_orders': Order.objects.count(),
-            'pending_orders': Order.objects.filter(status='pending').count(),
-            'out_for_delivery': Order.objects.filter(status='out_for_delivery').count(),
-            'delivered_today': Order.objects.filter(
-                status='delivered',
-                delivery_date__date=today
-            ).count(),
-            'weekly_orders': Order.objects.filter(order_date__date__gte=week_ago).count(),
-            'weekly_revenue': Order.objects.filter(
-                order_date__date__gte=week_ago,
-                status='delivered'
-            ).aggregate(total=Sum('total_amount'))['total'] or 0,
-            'total_products': LPGProduct.objects.filter(is_active=True).count(),
-            'low_stock_products': LPGProduct.objects.filter(
-                is_active=True,
-                current_stock__lte=F('minimum_stock')
-            ).count(),
-            'out_of_stock': LPGProduct.objects.filter(
-                is_active=True,
-                current_stock=0
-            ).count(),
-            'total_stock_value': LPGProduct.objects.filter(is_active=True).aggregate(
-                total=Sum(F('current_stock') * F('price'))
-            )['total'] or 0,
-        }
+        dashboard_stats = dashboard.get_dashboard_stats()
         
         context = {'dashboard_stats': dashboard_stats}
         return render(request, 'dealer/dashboard_stats_partial.html', context)
@@ -1128,25 +1106,15 @@ def refresh_dashboard_stats(request):
 
 
 @user_passes_test(is_dealer, login_url='core:login')
+@cache_control(private=True, no_cache=True)
+@condition(etag_func=etags.recent_activity)
 def refresh_recent_activity(request):
     """
     HTMX endpoint for refreshing recent activity section
     Requirements: 4.4, 4.5 - Real-time activity updates
     """
     if request.headers.get('HX-Request') or request.headers.get('X-Up-Target'):
-        recent_orders = Order.objects.select_related('customer', 'product').order_by('-order_date')[:10]
-        recent_deliveries = DeliveryLog.objects.select_related('product', 'logged_by').order_by('-created_at')[:5]
-        low_stock_alerts = LPGProduct.objects.filter(
-            is_active=True,
-            current_stock__lte=F('minimum_stock')
-        ).order_by('current_stock')[:5]
-        
-        context = {
-            'recent_orders': recent_orders,
-            'recent_deliveries': recent_deliveries,
-            'low_stock_alerts': low_stock_alerts,
-        }
-        return render(request, 'dealer/recent_activity_partial.html', context)
+        return render(request, 'dealer/recent_activity_partial.html', recent_activity_context())
     
     return redirect('core:dealer_dashboard')
 
@@ -1177,18 +1145,9 @@ def order_management(request):
     # Filter by date range
     date_from = request.GET.get('date_from', '')
     date_to = request.GET.get('date_to', '')
-    if date_from:
-        try:
-            from_date = datetime.strptime(date_from, '%Y-%m-%d').date()
-            orders = orders.filter(order_date__date__gte=from_date)
-        except ValueError:
-            pass
-    if date_to:
-        try:
-            to_date = datetime.strptime(date_to, '%Y-%m-%d').date()
-            orders = orders.filter(order_date__date__lte=to_date)
-        except ValueError:
-            pass
+    orders = date_ranges.filter_dates(
+        orders, 'order_date', date_ranges.parse_date(date_from), date_ranges.parse_date(date_to)
+    )
     
     # Search by customer name or order ID
     search_query = request.GET.get('search', '').strip()
@@ -1259,8 +1218,8 @@ def update_order_status(request, order_id):
     Requirements: 5.2, 5.3 - Order status updates without page refresh
     """
     # Check if user is dealer or cashier
-    is_dealer_user = hasattr(request.user, 'dealer_profile') or request.user.is_superuser
-    is_cashier_user = hasattr(request.user, 'cashier_profile') and request.user.cashier_profile.is_active
+    is_dealer_user = request.roles.is_superuser
+    is_cashier_user = request.roles.is_cashier
     
     if not (is_dealer_user or is_cashier_user):
         if request.headers.get('HX-Request'):
@@ -1311,17 +1270,6 @@ def update_order_status(request, order_id):
         order.cancellation_reason = cancellation_reason
         order.cancelled_at = timezone.now()
         order.cancelled_by = request.user
-        
-        # Create notification for the customer if order has a customer
-        if order.customer:
-            Notification.objects.create(
-                customer=order.customer,
-                notification_type='order_cancelled',
-                order=order,
-                title=f'Order #{order.id} Cancelled',
-                message=f'Your order for {order.product.name} (Qty: {order.quantity}) has been cancelled.',
-                reason=cancellation_reason
-            )
     
     # Track which cashier is processing (set on out_for_delivery or delivered)
     if is_cashier_user and not order.processed_by:
@@ -1332,26 +1280,26 @@ def update_order_status(request, order_id):
     if new_status == 'delivered' and not order.delivery_date:
         order.delivery_date = timezone.now()
     
-    order.save()
-    
-    # Create CashierTransaction record when order is delivered
-    if new_status == 'delivered':
-        from .models import CashierTransaction, Cashier
-        # Get the cashier who processed this order
-        cashier = order.processed_by
-        if not cashier and is_cashier_user:
-            cashier = request.user.cashier_profile
+    # The status write and its queued side effects commit together
+    with db_writes.atomic():
+        order.save()
         
-        # Create transaction record if we have a cashier
-        if cashier:
-            CashierTransaction.objects.create(
-                cashier=cashier,
-                order=order,
-                transaction_type='order',
-                amount=order.total_amount,
-                payment_method='cash',
-                customer=order.customer
+        # Queue the customer's notification when the order is cancelled
+        if new_status == 'cancelled':
+            outbox.notify_customer(
+                order, 'order_cancelled',
+                title=f'Order #{order.id} Cancelled',
+                message=f'Your order for {order.product.name} (Qty: {order.quantity}) has been cancelled.',
+                reason=order.cancellation_reason
             )
+        
+        # Queue the CashierTransaction record when order is delivered
+        if new_status == 'delivered':
+            # Get the cashier who processed this order
+            cashier = order.processed_by
+            if not cashier and is_cashier_user:
+                cashier = request.user.cashier_profile
+            outbox.record_sale(order, cashier=cashier)
     
     success_msg = f'Order #{order.id} status updated from {dict(Order.STATUS_CHOICES)[old_status]} to {order.get_status_display()}.'
     
@@ -1494,18 +1442,9 @@ def refresh_order_table(request):
     
     date_from = request.GET.get('date_from', '')
     date_to = request.GET.get('date_to', '')
-    if date_from:
-        try:
-            from_date = datetime.strptime(date_from, '%Y-%m-%d').date()
-            orders = orders.filter(order_date__date__gte=from_date)
-        except ValueError:
-            pass
-    if date_to:
-        try:
-            to_date = datetime.strptime(date_to, '%Y-%m-%d').date()
-            orders = orders.filter(order_date__date__lte=to_date)
-        except ValueError:
-            pass
+    orders = date_ranges.filter_dates(
+        orders, 'order_date', date_ranges.parse_date(date_from), date_ranges.parse_date(date_to)
+    )
     
     search_query = request.GET.get('search', '').strip()
     if search_query:
@@ -1575,14 +1514,12 @@ def bulk_order_operations(request):
     import logging
     logger = logging.getLogger(__name__)
 
-    logger.info(f"Bulk operation request from user: {request.user}")
-    logger.info(f"POST data: {request.POST}")
-    logger.info(f"Headers: {dict(request.headers)}")
+    logger.debug(f"Bulk operation request from user: {request.user}")
 
     operation = request.POST.get('operation')
     order_ids = request.POST.getlist('order_ids')
 
-    logger.info(f"Operation: {operation}, Order IDs: {order_ids}")
+    logger.debug(f"Operation: {operation}, Order IDs: {order_ids}")
 
     if not order_ids:
         logger.warning("No order IDs provided")
@@ -1604,69 +1541,59 @@ def bulk_order_operations(request):
         success_count = 0
         error_messages = []
         
-        if operation == 'mark_out_for_delivery':
-            for order in orders:
-                if order.status == 'pending':
-                    order.status = 'out_for_delivery'
-                    order.save()
-                    success_count += 1
-                else:
-                    error_messages.append(f'Order #{order.id} cannot be marked as out for delivery (current status: {order.get_status_display()})')
-        
-        elif operation == 'mark_delivered':
-            from .models import CashierTransaction, Cashier
-            for order in orders:
-                if order.status == 'out_for_delivery':
-                    order.status = 'delivered'
-                    if not order.delivery_date:
-                        order.delivery_date = timezone.now()
-                    # Set processed_by to current user if cashier
-                    if hasattr(request.user, 'cashier_profile') and not order.processed_by:
-                        order.processed_by = request.user.cashier_profile
-                    order.save()
-                    
-                    # Create CashierTransaction record
-                    if order.processed_by:
-                        CashierTransaction.objects.create(
-                            cashier=order.processed_by,
-                            order=order,
-                            transaction_type='order',
-                            amount=order.total_amount,
-                            payment_method='cash',
-                            customer=order.customer
-                        )
-                    
-                    success_count += 1
-                else:
-                    error_messages.append(f'Order #{order.id} cannot be marked as delivered (current status: {order.get_status_display()})')
-        
-        elif operation == 'cancel_orders':
-            cancellation_reason = request.POST.get('cancellation_reason', 'Order cancelled by staff')
-            for order in orders:
-                if order.status in ['pending', 'out_for_delivery']:
-                    order.status = 'cancelled'
-                    order.cancellation_reason = cancellation_reason
-                    order.cancelled_at = timezone.now()
-                    order.cancelled_by = request.user
-                    order.save()
-                    
-                    # Create notification if order has a customer
-                    if order.customer:
-                        Notification.objects.create(
-                            customer=order.customer,
-                            notification_type='order_cancelled',
-                            order=order,
+        # Status writes and their queued side effects commit together, in one transaction
+        with db_writes.atomic():
+            if operation == 'mark_out_for_delivery':
+                for order in orders:
+                    if order.status == 'pending':
+                        order.status = 'out_for_delivery'
+                        order.save()
+                        success_count += 1
+                    else:
+                        error_messages.append(f'Order #{order.id} cannot be marked as out for delivery (current status: {order.get_status_display()})')
+            
+            elif operation == 'mark_delivered':
+                for order in orders:
+                    if order.status == 'out_for_delivery':
+                        order.status = 'delivered'
+                        if not order.delivery_date:
+                            order.delivery_date = timezone.now()
+                        # Set processed_by to current user if cashier
+                        if request.roles.has_cashier_profile and not order.processed_by:
+                            order.processed_by = request.user.cashier_profile
+                        order.save()
+                        
+                        # Queue the CashierTransaction record
+                        outbox.record_sale(order)
+                        
+                        success_count += 1
+                    else:
+                        error_messages.append(f'Order #{order.id} cannot be marked as delivered (current status: {order.get_status_display()})')
+            
+            elif operation == 'cancel_orders':
+                cancellation_reason = request.POST.get('cancellation_reason', 'Order cancelled by staff')
+                for order in orders.select_related('product'):
+                    if order.status in ['pending', 'out_for_delivery']:
+                        order.status = 'cancelled'
+                        order.cancellation_reason = cancellation_reason
+                        order.cancelled_at = timezone.now()
+                        order.cancelled_by = request.user
+                        order.save()
+                        
+                        # Queue the customer's notification
+                        outbox.notify_customer(
+                            order, 'order_cancelled',
                             title=f'Order #{order.id} Cancelled',
                             message=f'Your order for {order.product.name} (Qty: {order.quantity}) has been cancelled.',
                             reason=cancellation_reason
                         )
-                    
-                    success_count += 1
-                else:
-                    error_messages.append(f'Order #{order.id} cannot be cancelled (current status: {order.get_status_display()})')
-        
-        else:
-            raise ValueError("Invalid operation.")
+                        
+                        success_count += 1
+                    else:
+                        error_messages.append(f'Order #{order.id} cannot be cancelled (current status: {order.get_status_display()})')
+            
+            else:
+                raise ValueError("Invalid operation.")
         
         # Prepare response message
         if success_count > 0:
@@ -1705,6 +1632,8 @@ def bulk_order_operations(request):
 
 
 @user_passes_test(is_dealer, login_url='core:login')
+@cache_control(private=True, no_cache=True)
+@condition(etag_func=etags.dealer_orders)
 def refresh_order_table(request):
     """
     HTMX endpoint for refreshing the order management table
@@ -1725,18 +1654,9 @@ def refresh_order_table(request):
         
         date_from = request.GET.get('date_from', '')
         date_to = request.GET.get('date_to', '')
-        if date_from:
-            try:
-                from_date = datetime.strptime(date_from, '%Y-%m-%d').date()
-                orders = orders.filter(order_date__date__gte=from_date)
-            except ValueError:
-                pass
-        if date_to:
-            try:
-                to_date = datetime.strptime(date_to, '%Y-%m-%d').date()
-                orders = orders.filter(order_date__date__lte=to_date)
-            except ValueError:
-                pass
+        orders = date_ranges.filter_dates(
+            orders, 'order_date', date_ranges.parse_date(date_from), date_ranges.parse_date(date_to)
+        )
         
         search_query = request.GET.get('search', '').strip()
         if search_query:
@@ -1841,47 +1761,36 @@ def update_batch_order_status(request, batch_id):
         success_count = 0
         cancellation_reason = request.POST.get('cancellation_reason', '')
         
-        for order in orders:
-            if new_status == 'out_for_delivery' and order.status == 'pending':
-                order.status = 'out_for_delivery'
-                order.save()
-                success_count += 1
-            elif new_status == 'delivered' and order.status == 'out_for_delivery':
-                order.status = 'delivered'
-                if not order.delivery_date:
-                    order.delivery_date = timezone.now()
-                if hasattr(request.user, 'cashier_profile') and not order.processed_by:
-                    order.processed_by = request.user.cashier_profile
-                order.save()
-                
-                from .models import CashierTransaction
-                if order.processed_by:
-                    CashierTransaction.objects.create(
-                        cashier=order.processed_by,
-                        order=order,
-                        transaction_type='order',
-                        amount=order.total_amount,
-                        payment_method='cash',
-                        customer=order.customer
-                    )
-                success_count += 1
-            elif new_status == 'cancelled' and order.status in ['pending', 'out_for_delivery']:
-                order.status = 'cancelled'
-                order.cancellation_reason = cancellation_reason
-                order.cancelled_at = timezone.now()
-                order.cancelled_by = request.user
-                order.save()
-                
-                if order.customer:
-                    Notification.objects.create(
-                        customer=order.customer,
-                        notification_type='order_cancelled',
-                        order=order,
+        # Status writes and their queued side effects commit together, in one transaction
+        with db_writes.atomic():
+            for order in orders.select_related('product'):
+                if new_status == 'out_for_delivery' and order.status == 'pending':
+                    order.status = 'out_for_delivery'
+                    order.save()
+                    success_count += 1
+                elif new_status == 'delivered' and order.status == 'out_for_delivery':
+                    order.status = 'delivered'
+                    if not order.delivery_date:
+                        order.delivery_date = timezone.now()
+                    if request.roles.has_cashier_profile and not order.processed_by:
+                        order.processed_by = request.user.cashier_profile
+                    order.save()
+                    outbox.record_sale(order)
+                    success_count += 1
+                elif new_status == 'cancelled' and order.status in ['pending', 'out_for_delivery']:
+                    order.status = 'cancelled'
+                    order.cancellation_reason = cancellation_reason
+                    order.cancelled_at = timezone.now()
+                    order.cancelled_by = request.user
+                    order.save()
+                    
+                    outbox.notify_customer(
+                        order, 'order_cancelled',
                         title=f'Order #{order.id} Cancelled',
                         message=f'Your order for {order.product.name} (Qty: {order.quantity}) has been cancelled.',
                         reason=cancellation_reason
                     )
-                success_count += 1
+                    success_count += 1
         
         if success_count > 0:
             return JsonResponse({
@@ -1902,6 +1811,8 @@ def update_batch_order_status(request, batch_id):
 
 
 @login_required
+@cache_control(private=True, no_cache=True)
+@condition(etag_func=etags.customer_orders)
 def refresh_dashboard_orders(request):
     """
     HTMX endpoint for refreshing dashboard order statistics
@@ -1909,23 +1820,7 @@ def refresh_dashboard_orders(request):
     Batch orders are grouped together
     """
     if request.headers.get('HX-Request'):
-        all_orders = Order.objects.filter(customer=request.user).select_related('product').order_by('-order_date')
-        
-        seen_batches = set()
-        unique_orders = []
-        for order in all_orders:
-            if order.batch_id not in seen_batches:
-                seen_batches.add(order.batch_id)
-                unique_orders.append(order)
-            if len(unique_orders) >= 5:
-                break
-        
-        context = {
-            'recent_orders': unique_orders,
-            'total_orders': len(seen_batches),
-            'pending_orders': Order.objects.filter(customer=request.user, status='pending').values('batch_id').distinct().count(),
-            'delivered_orders': Order.objects.filter(customer=request.user, status='delivered').values('batch_id').distinct().count(),
-        }
+        context = customer_order_summary(request.user)
         return render(request, 'customer/dashboard_orders_partial.html', context)
     
     return redirect('core:customer_dashboard')
@@ -1985,7 +1880,7 @@ def log_delivery(request):
         form = DeliveryLogForm(request.POST)
         if form.is_valid():
             try:
-                with transaction.atomic():
+                with db_writes.atomic():
                     delivery_log = form.save(commit=False)
                     delivery_log.logged_by = request.user
                     
@@ -2154,33 +2049,21 @@ def delivery_log(request):
     Requirements: 6.2 - Comprehensive delivery log management
     """
     # Get filter parameters
-    date_from = request.GET.get('date_from', '')
-    date_to = request.GET.get('date_to', '')
     product_filter = request.GET.get('product', '')
     supplier_filter = request.GET.get('supplier', '')
     search = request.GET.get('search', '')
     sort = request.GET.get('sort', '-delivery_date')
 
     # Set default date range (last 30 days)
-    if not date_from or not date_to:
-        end_date = timezone.now().date()
-        start_date = end_date - timedelta(days=30)
-        date_from = date_from or start_date.strftime('%Y-%m-%d')
-        date_to = date_to or end_date.strftime('%Y-%m-%d')
+    from_date, to_date = date_ranges.report_period(request.GET)
+    date_from = from_date.strftime('%Y-%m-%d')
+    date_to = to_date.strftime('%Y-%m-%d')
 
     # Build queryset
     deliveries = DeliveryLog.objects.select_related('product', 'logged_by')
 
     # Apply date filters
-    try:
-        from_date = datetime.strptime(date_from, '%Y-%m-%d').date()
-        to_date = datetime.strptime(date_to, '%Y-%m-%d').date()
-        deliveries = deliveries.filter(
-            delivery_date__date__gte=from_date,
-            delivery_date__date__lte=to_date
-        )
-    except ValueError:
-        pass
+    deliveries = date_ranges.filter_dates(deliveries, 'delivery_date', from_date, to_date)
 
     # Apply other filters
     if product_filter:
@@ -2262,52 +2145,44 @@ def reports_dashboard(request):
     Main reports dashboard with report options and quick stats
     Requirements: 7.1, 7.2, 7.3, 7.4, 7.5 - Report generation system
     """
-    # Calculate quick statistics for the dashboard
-    today = timezone.now().date()
-    current_month = today.replace(day=1)
-    last_month = (current_month - timedelta(days=1)).replace(day=1)
-    
-    # Monthly statistics
-    current_month_orders = Order.objects.filter(
-        order_date__date__gte=current_month,
-        status='delivered'
-    ).count()
-    
-    current_month_revenue = Order.objects.filter(
-        order_date__date__gte=current_month,
-        status='delivered'
-    ).aggregate(total=Sum('total_amount'))['total'] or 0
-    
-    last_month_orders = Order.objects.filter(
-        order_date__date__gte=last_month,
-        order_date__date__lt=current_month,
-        status='delivered'
-    ).count()
-    
-    last_month_revenue = Order.objects.filter(
-        order_date__date__gte=last_month,
-        order_date__date__lt=current_month,
-        status='delivered'
-    ).aggregate(total=Sum('total_amount'))['total'] or 0
-    
-    # Inventory statistics
-    total_stock_value = LPGProduct.objects.filter(is_active=True).aggregate(
-        total=Sum(F('current_stock') * F('price'))
-    )['total'] or 0
-    
-    low_stock_count = LPGProduct.objects.filter(
-        is_active=True,
-        current_stock__lte=F('minimum_stock')
-    ).count()
-    
-    # Recent deliveries value
-    thirty_days_ago = timezone.now() - timedelta(days=30)
-    recent_deliveries_value = DeliveryLog.objects.filter(
-        delivery_date__gte=thirty_days_ago
-    ).aggregate(total=Sum('total_cost'))['total'] or 0
-    
-    context = {
-        'quick_stats': {
+    # Quick statistics are cached; one worker recomputes them while others are served the last copy
+    today = timezone.localdate()
+
+    def compute_quick_stats():
+        current_month = today.replace(day=1)
+        last_month = (current_month - timedelta(days=1)).replace(day=1)
+        delivered = Order.objects.filter(status='delivered')
+        current_month_sales = date_ranges.filter_dates(delivered, 'order_date', current_month)
+        last_month_sales = date_ranges.filter_dates(
+            delivered, 'order_date', last_month, current_month - timedelta(days=1)
+        )
+        
+        # Monthly statistics
+        current_month_orders = current_month_sales.count()
+        
+        current_month_revenue = current_month_sales.aggregate(total=Sum('total_amount'))['total'] or 0
+        
+        last_month_orders = last_month_sales.count()
+        
+        last_month_revenue = last_month_sales.aggregate(total=Sum('total_amount'))['total'] or 0
+        
+        # Inventory statistics
+        total_stock_value = LPGProduct.objects.filter(is_active=True).aggregate(
+            total=Sum(F('current_stock') * F('price'))
+        )['total'] or 0
+        
+        low_stock_count = LPGProduct.objects.filter(
+            is_active=True,
+            current_stock__lte=F('minimum_stock')
+        ).count()
+        
+        # Recent deliveries value
+        thirty_days_ago = timezone.now() - timedelta(days=30)
+        recent_deliveries_value = DeliveryLog.objects.filter(
+            delivery_date__gte=thirty_days_ago
+        ).aggregate(total=Sum('total_cost'))['total'] or 0
+        
+        return {
             'current_month_orders': current_month_orders,
             'current_month_revenue': current_month_revenue,
             'last_month_orders': last_month_orders,
@@ -2315,7 +2190,10 @@ def reports_dashboard(request):
             'total_stock_value': total_stock_value,
             'low_stock_count': low_stock_count,
             'recent_deliveries_value': recent_deliveries_value,
-        },
+        }
+    
+    context = {
+        'quick_stats': cached_report('quick_stats', compute_quick_stats, period=(today.replace(day=1), today)),
         'products': LPGProduct.objects.filter(is_active=True).order_by('name', 'size'),
         'customers': User.objects.filter(orders__isnull=False).distinct().order_by('username'),
     }
@@ -2324,49 +2202,29 @@ def reports_dashboard(request):
 
 
 @user_passes_test(is_dealer, login_url='core:login')
+@reporting.from_snapshot
 def sales_report(request):
     """
     Generate sales report with date range filtering
     Requirements: 7.1, 7.3, 7.4 - Sales report generation with filtering
     """
     # Get filter parameters
-    date_from = request.GET.get('date_from', '')
-    date_to = request.GET.get('date_to', '')
     product_filter = request.GET.get('product', '')
     customer_filter = request.GET.get('customer', '')
     
-    # Default to last 30 days if no dates provided
-    if not date_from or not date_to:
-        end_date = timezone.now().date()
-        start_date = end_date - timedelta(days=30)
-        if not date_from:
-            date_from = start_date.strftime('%Y-%m-%d')
-        if not date_to:
-            date_to = end_date.strftime('%Y-%m-%d')
+    # Default to last 30 days if no dates provided (or they are invalid)
+    from_date, to_date = date_ranges.report_period(request.GET)
+    date_from = from_date.strftime('%Y-%m-%d')
+    date_to = to_date.strftime('%Y-%m-%d')
     
     # Build query for delivered orders
     orders = Order.objects.filter(status='delivered').select_related('customer', 'product')
     
     # Apply date filters
-    try:
-        from_date = datetime.strptime(date_from, '%Y-%m-%d').date()
-        to_date = datetime.strptime(date_to, '%Y-%m-%d').date()
-        orders = orders.filter(
-            delivery_date__date__gte=from_date,
-            delivery_date__date__lte=to_date
-        )
-    except ValueError:
-        # Invalid date format, use default
-        end_date = timezone.now().date()
-        start_date = end_date - timedelta(days=30)
-        orders = orders.filter(
-            delivery_date__date__gte=start_date,
-            delivery_date__date__lte=end_date
-        )
-        date_from = start_date.strftime('%Y-%m-%d')
-        date_to = end_date.strftime('%Y-%m-%d')
+    orders = date_ranges.filter_dates(orders, 'delivery_date', from_date, to_date)
     
     # Apply product filter
+    product_id = customer_id = ''
     if product_filter:
         try:
             product_id = int(product_filter)
@@ -2382,37 +2240,65 @@ def sales_report(request):
         except (ValueError, TypeError):
             pass
     
-    # Calculate summary statistics
-    total_orders = orders.count()
-    total_revenue = orders.aggregate(total=Sum('total_amount'))['total'] or 0
-    total_quantity = orders.aggregate(total=Sum('quantity'))['total'] or 0
-    average_order_value = orders.aggregate(avg=Avg('total_amount'))['avg'] or 0
-    
-    # Product breakdown
-    product_stats = orders.values(
-        'product__name', 'product__size'
-    ).annotate(
-        total_quantity=Sum('quantity'),
-        total_revenue=Sum('total_amount'),
-        order_count=Count('id')
-    ).order_by('-total_revenue')
-    
-    # Customer breakdown
-    customer_stats = orders.values(
-        'customer__username', 'customer__first_name', 'customer__last_name'
-    ).annotate(
-        total_orders=Count('id'),
-        total_spent=Sum('total_amount'),
-        total_quantity=Sum('quantity')
-    ).order_by('-total_spent')
+    def compute_sales_stats():
+        # Calculate summary statistics
+        totals = orders.aggregate(
+            total_orders=Count('id'),
+            total_revenue=Sum('total_amount'),
+            total_quantity=Sum('quantity'),
+            average_order_value=Avg('total_amount'),
+            total_cost_of_goods=Sum(order_cost_of_goods()),
+        )
+        # Periods reaching past the archive horizon include the archived orders' totals
+        totals = archive.with_archived_orders(totals, from_date, to_date, product_id, customer_id)
+        total_revenue = totals['total_revenue'] or 0
+        total_cost_of_goods = totals['total_cost_of_goods'] or 0
+        
+        # Product breakdown
+        product_stats = orders.values(
+            'product__name', 'product__size'
+        ).annotate(
+            total_quantity=Sum('quantity'),
+            total_revenue=Sum('total_amount'),
+            order_count=Count('id')
+        ).order_by('-total_revenue')
+        
+        # Customer breakdown
+        customer_stats = orders.values(
+            'customer__username', 'customer__first_name', 'customer__last_name'
+        ).annotate(
+            total_orders=Count('id'),
+            total_spent=Sum('total_amount'),
+            total_quantity=Sum('quantity')
+        ).order_by('-total_spent')
+        
+        # Daily sales trend
+        daily_sales = orders.extra(
+            select={'day': 'DATE(delivery_date)'}
+        ).values('day').annotate(
+            daily_orders=Count('id'),
+            daily_revenue=Sum('total_amount')
+        ).order_by('day')
+        
+        return {
+            'summary': {
+                'total_orders': totals['total_orders'],
+                'total_revenue': total_revenue,
+                'total_quantity': totals['total_quantity'] or 0,
+                'average_order_value': totals['average_order_value'] or 0,
+                'total_cost_of_goods': total_cost_of_goods,
+                'gross_profit': total_revenue - total_cost_of_goods,
+                'archived_orders': totals['archived_orders'],
+            },
+            'product_stats': list(product_stats),
+            'customer_stats': list(customer_stats),
+            'daily_sales': list(daily_sales),
+        }
     
-    # Daily sales trend
-    daily_sales = orders.extra(
-        select={'day': 'DATE(delivery_date)'}
-    ).values('day').annotate(
-        daily_orders=Count('id'),
-        daily_revenue=Sum('total_amount')
-    ).order_by('day')
+    # Aggregates are cached per filter set; one worker recomputes them while others get the last copy
+    stats = cached_report(
+        'sales', compute_sales_stats, date_from, date_to, product_id, customer_id, period=(from_date, to_date)
+    )
     
     context = {
         'report_type': 'sales',
@@ -2423,16 +2309,8 @@ def sales_report(request):
             'product': product_filter,
             'customer': customer_filter,
         },
-        'summary': {
-            'total_orders': total_orders,
-            'total_revenue': total_revenue,
-            'total_quantity': total_quantity,
-            'average_order_value': average_order_value,
-        },
-        'product_stats': product_stats,
-        'customer_stats': customer_stats,
-        'daily_sales': daily_sales,
-        'products': LPGProduct.objects.filter(is_active=True).order_by('name', 'size'),
+        **stats,
+        'products': catalogue.active_products(),
         'customers': User.objects.filter(orders__isnull=False).distinct().order_by('username'),
     }
     
@@ -2440,36 +2318,20 @@ def sales_report(request):
 
 
 @user_passes_test(is_dealer, login_url='core:login')
+@reporting.from_snapshot
 def export_sales_report_pdf(request):
     """
     Export sales report as PDF using ReportLab
     """
-    date_from = request.GET.get('date_from', '')
-    date_to = request.GET.get('date_to', '')
     product_filter = request.GET.get('product', '')
     customer_filter = request.GET.get('customer', '')
 
-    if not date_from or not date_to:
-        end_date = timezone.now().date()
-        start_date = end_date - timedelta(days=30)
-        if not date_from:
-            date_from = start_date.strftime('%Y-%m-%d')
-        if not date_to:
-            date_to = end_date.strftime('%Y-%m-%d')
+    from_date, to_date = date_ranges.report_period(request.GET)
 
     orders = Order.objects.filter(status='delivered').select_related('customer', 'product')
+    orders = date_ranges.filter_dates(orders, 'delivery_date', from_date, to_date)
 
-    try:
-        from_date = datetime.strptime(date_from, '%Y-%m-%d').date()
-        to_date = datetime.strptime(date_to, '%Y-%m-%d').date()
-        orders = orders.filter(delivery_date__date__gte=from_date, delivery_date__date__lte=to_date)
-    except ValueError:
-        end_date = timezone.now().date()
-        start_date = end_date - timedelta(days=30)
-        orders = orders.filter(delivery_date__date__gte=start_date, delivery_date__date__lte=end_date)
-        from_date = start_date
-        to_date = end_date
-
+    pid = cid = None
     if product_filter:
         try:
             pid = int(product_filter)
@@ -2484,9 +2346,13 @@ def export_sales_report_pdf(request):
         except (ValueError, TypeError):
             pass
 
-    total_orders = orders.count()
-    total_revenue = orders.aggregate(total=Sum('total_amount'))['total'] or 0
-    total_quantity = orders.aggregate(total=Sum('quantity'))['total'] or 0
+    totals = archive.with_archived_orders(
+        orders.aggregate(total_orders=Count('id'), total_revenue=Sum('total_amount'), total_quantity=Sum('quantity')),
+        from_date, to_date, pid, cid,
+    )
+    total_orders = totals['total_orders']
+    total_revenue = totals['total_revenue'] or 0
+    total_quantity = totals['total_quantity'] or 0
 
     product_stats = orders.values('product__name', 'product__size').annotate(
         total_quantity=Sum('quantity'), total_revenue=Sum('total_amount'), order_count=Count('id')
@@ -2605,54 +2471,41 @@ def export_sales_report_pdf(request):
 
 
 @user_passes_test(is_dealer, login_url='core:login')
+@reporting.from_snapshot
 def stock_report(request):
     """
     Generate stock report showing inventory levels and movement
     Requirements: 7.2, 7.3, 7.4 - Stock report with inventory levels and movement
     """
     # Get filter parameters
-    date_from = request.GET.get('date_from', '')
-    date_to = request.GET.get('date_to', '')
     product_filter = request.GET.get('product', '')
     
-    # Default to last 30 days if no dates provided
-    if not date_from or not date_to:
-        end_date = timezone.now().date()
-        start_date = end_date - timedelta(days=30)
-        if not date_from:
-            date_from = start_date.strftime('%Y-%m-%d')
-        if not date_to:
-            date_to = end_date.strftime('%Y-%m-%d')
+    # Default to last 30 days if no dates provided (or they are invalid)
+    from_date, to_date = date_ranges.report_period(request.GET)
+    date_from = from_date.strftime('%Y-%m-%d')
+    date_to = to_date.strftime('%Y-%m-%d')
     
-    # Get all active products
-    products = LPGProduct.objects.filter(is_active=True).order_by('name', 'size')
+    snapshot = reporting.active_snapshot()
+    if snapshot:
+        # Products and their stock from the reporting snapshot, both as of the same moment
+        products = list(LPGProduct.objects.using(snapshot).filter(is_active=True).order_by('name', 'size'))
+    else:
+        # Active products from the catalogue snapshots, with live stock from one stock query
+        products = catalogue.active_products_with_stock()
     
     # Apply product filter
+    product_id = ''
     if product_filter:
         try:
             product_id = int(product_filter)
-            products = products.filter(id=product_id)
+            products = [product for product in products if product.id == product_id]
         except (ValueError, TypeError):
             pass
     
     # Get delivery logs for the period
-    try:
-        from_date = datetime.strptime(date_from, '%Y-%m-%d').date()
-        to_date = datetime.strptime(date_to, '%Y-%m-%d').date()
-        deliveries = DeliveryLog.objects.filter(
-            delivery_date__date__gte=from_date,
-            delivery_date__date__lte=to_date
-        ).select_related('product', 'logged_by')
-    except ValueError:
-        # Invalid date format, use default
-        end_date = timezone.now().date()
-        start_date = end_date - timedelta(days=30)
-        deliveries = DeliveryLog.objects.filter(
-            delivery_date__date__gte=start_date,
-            delivery_date__date__lte=end_date
-        ).select_related('product', 'logged_by')
-        date_from = start_date.strftime('%Y-%m-%d')
-        date_to = end_date.strftime('%Y-%m-%d')
+    deliveries = date_ranges.filter_dates(
+        DeliveryLog.objects.select_related('product', 'logged_by'), 'delivery_date', from_date, to_date
+    )
     
     # Apply product filter to deliveries
     if product_filter:
@@ -2663,22 +2516,10 @@ def stock_report(request):
             pass
     
     # Get sales for the period (delivered orders)
-    try:
-        from_date = datetime.strptime(date_from, '%Y-%m-%d').date()
-        to_date = datetime.strptime(date_to, '%Y-%m-%d').date()
-        sales = Order.objects.filter(
-            status='delivered',
-            delivery_date__date__gte=from_date,
-            delivery_date__date__lte=to_date
-        ).select_related('product', 'customer')
-    except ValueError:
-        end_date = timezone.now().date()
-        start_date = end_date - timedelta(days=30)
-        sales = Order.objects.filter(
-            status='delivered',
-            delivery_date__date__gte=start_date,
-            delivery_date__date__lte=end_date
-        ).select_related('product', 'customer')
+    sales = date_ranges.filter_dates(
+        Order.objects.filter(status='delivered').select_related('product', 'customer'),
+        'delivery_date', from_date, to_date
+    )
     
     # Apply product filter to sales
     if product_filter:
@@ -2689,58 +2530,55 @@ def stock_report(request):
             pass
     
     # Calculate inventory statistics
-    total_stock_value = products.aggregate(
-        total=Sum(F('current_stock') * F('price'))
-    )['total'] or 0
-    
-    total_current_stock = products.aggregate(
-        total=Sum('current_stock')
-    )['total'] or 0
-    
-    low_stock_products = products.filter(
-        current_stock__lte=F('minimum_stock')
-    ).count()
-    
-    out_of_stock_products = products.filter(current_stock=0).count()
+    total_stock_value = sum(product.current_stock * product.price for product in products)
+    total_current_stock = sum(product.current_stock for product in products)
+    low_stock_products = sum(1 for product in products if product.is_low_stock)
+    out_of_stock_products = sum(1 for product in products if product.current_stock == 0)
+    
+    def compute_period_stats():
+        # Delivery and sales totals for the period, one aggregate each
+        delivery_summary = deliveries.aggregate(
+            total_deliveries=Count('id'),
+            total_delivered_quantity=Sum('quantity_received'),
+            total_delivery_cost=Sum('total_cost')
+        )
+        sales_summary = sales.aggregate(
+            total_sales=Count('id'),
+            total_sold_quantity=Sum('quantity'),
+            total_sales_revenue=Sum('total_amount')
+        )
+        
+        # Period totals grouped per product in one query each
+        return {
+            'period_summary': {key: value or 0 for key, value in {**delivery_summary, **sales_summary}.items()},
+            'delivery_totals': {
+                row['product_id']: row for row in deliveries.order_by().values('product_id').annotate(
+                    delivered_qty=Sum('quantity_received'),
+                    delivery_cost=Sum('total_cost')
+                )
+            },
+            'sales_totals': {
+                row['product_id']: row for row in sales.order_by().values('product_id').annotate(
+                    sold_qty=Sum('quantity'),
+                    sales_revenue=Sum('total_amount')
+                )
+            },
+        }
     
-    # Delivery statistics
-    total_deliveries = deliveries.count()
-    total_delivered_quantity = deliveries.aggregate(
-        total=Sum('quantity_received')
-    )['total'] or 0
-    total_delivery_cost = deliveries.aggregate(
-        total=Sum('total_cost')
-    )['total'] or 0
-    
-    # Sales statistics
-    total_sales = sales.count()
-    total_sold_quantity = sales.aggregate(
-        total=Sum('quantity')
-    )['total'] or 0
-    total_sales_revenue = sales.aggregate(
-        total=Sum('total_amount')
-    )['total'] or 0
+    # Period aggregates are cached per filter set; stock levels above are always live
+    period_stats = cached_report('stock', compute_period_stats, date_from, date_to, product_id, period=(from_date, to_date))
+    delivery_totals = period_stats['delivery_totals']
+    sales_totals = period_stats['sales_totals']
     
     # Product-wise inventory details
     product_details = []
     for product in products:
-        # Get deliveries for this product in the period
-        product_deliveries = deliveries.filter(product=product)
-        delivered_qty = product_deliveries.aggregate(
-            total=Sum('quantity_received')
-        )['total'] or 0
-        delivery_cost = product_deliveries.aggregate(
-            total=Sum('total_cost')
-        )['total'] or 0
-        
-        # Get sales for this product in the period
-        product_sales = sales.filter(product=product)
-        sold_qty = product_sales.aggregate(
-            total=Sum('quantity')
-        )['total'] or 0
-        sales_revenue = product_sales.aggregate(
-            total=Sum('total_amount')
-        )['total'] or 0
+        delivered = delivery_totals.get(product.id, {})
+        sold = sales_totals.get(product.id, {})
+        delivered_qty = delivered.get('delivered_qty') or 0
+        delivery_cost = delivered.get('delivery_cost') or 0
+        sold_qty = sold.get('sold_qty') or 0
+        sales_revenue = sold.get('sales_revenue') or 0
         
         # Calculate stock movement
         net_movement = delivered_qty - sold_qty
@@ -2776,39 +2614,24 @@ def stock_report(request):
             'low_stock_products': low_stock_products,
             'out_of_stock_products': out_of_stock_products,
         },
-        'period_summary': {
-            'total_deliveries': total_deliveries,
-            'total_delivered_quantity': total_delivered_quantity,
-            'total_delivery_cost': total_delivery_cost,
-            'total_sales': total_sales,
-            'total_sold_quantity': total_sold_quantity,
-            'total_sales_revenue': total_sales_revenue,
-        },
+        'period_summary': period_stats['period_summary'],
         'product_details': product_details,
         'recent_movements': recent_movements,
-        'products': LPGProduct.objects.filter(is_active=True).order_by('name', 'size'),
+        'products': catalogue.active_products(),
     }
     
     return render(request, 'dealer/stock_report.html', context)
 
 
 @user_passes_test(is_dealer, login_url='core:login')
+@reporting.from_snapshot
 def export_stock_report_pdf(request):
     """
     Export stock report as PDF using ReportLab
     """
     # Get filter parameters (reuse same defaults as stock_report)
-    date_from = request.GET.get('date_from', '')
-    date_to = request.GET.get('date_to', '')
     product_filter = request.GET.get('product', '')
-
-    if not date_from or not date_to:
-        end_date = timezone.now().date()
-        start_date = end_date - timedelta(days=30)
-        if not date_from:
-            date_from = start_date.strftime('%Y-%m-%d')
-        if not date_to:
-            date_to = end_date.strftime('%Y-%m-%d')
+    from_date, to_date = date_ranges.report_period(request.GET)
 
     # Base product queryset
     products = LPGProduct.objects.filter(is_active=True).order_by('name', 'size')
@@ -2819,23 +2642,14 @@ def export_stock_report_pdf(request):
         except (ValueError, TypeError):
             pass
 
-    # Parse dates and fetch deliveries/sales
-    try:
-        from_date = datetime.strptime(date_from, '%Y-%m-%d').date()
-        to_date = datetime.strptime(date_to, '%Y-%m-%d').date()
-    except ValueError:
-        to_date = timezone.now().date()
-        from_date = to_date - timedelta(days=30)
-
-    deliveries = DeliveryLog.objects.filter(
-        delivery_date__date__gte=from_date,
-        delivery_date__date__lte=to_date
-    ).select_related('product', 'logged_by')
-    sales = Order.objects.filter(
-        status='delivered',
-        delivery_date__date__gte=from_date,
-        delivery_date__date__lte=to_date
-    ).select_related('product', 'customer')
+    # Fetch deliveries/sales for the period
+    deliveries = date_ranges.filter_dates(
+        DeliveryLog.objects.select_related('product', 'logged_by'), 'delivery_date', from_date, to_date
+    )
+    sales = date_ranges.filter_dates(
+        Order.objects.filter(status='delivered').select_related('product', 'customer'),
+        'delivery_date', from_date, to_date
+    )
 
     if product_filter:
         try:
@@ -3537,7 +3351,7 @@ def inventory_adjustment(request):
         # Save adjustment inside a transaction and ensure product is refreshed
         try:
             print(f"[DEBUG] Starting database transaction...")
-            with transaction.atomic():
+            with db_writes.atomic():
                 print(f"[DEBUG] Inside transaction - calling adjustment.save()...")
                 adjustment.save()
                 print(f"[DEBUG] Adjustment saved! ID: {adjustment.id}")
@@ -3611,10 +3425,9 @@ def stock_movements(request):
     from_date = request.GET.get('from_date')
     to_date = request.GET.get('to_date')
 
-    if from_date:
-        movements = movements.filter(created_at__date__gte=from_date)
-    if to_date:
-        movements = movements.filter(created_at__date__lte=to_date)
+    movements = date_ranges.filter_dates(
+        movements, 'created_at', date_ranges.parse_date(from_date), date_ranges.parse_date(to_date)
+    )
 
     # Pagination
     from django.core.paginator import Paginator
@@ -3644,30 +3457,18 @@ def stock_in_list(request):
     Stock In List - Display all deliveries received (stock additions)
     Shows delivery logs with filtering capabilities
     """
-    date_from = request.GET.get('date_from', '')
-    date_to = request.GET.get('date_to', '')
     product_filter = request.GET.get('product', '')
     supplier_filter = request.GET.get('supplier', '')
     search = request.GET.get('search', '')
     sort = request.GET.get('sort', '-delivery_date')
 
-    if not date_from or not date_to:
-        end_date = timezone.now().date()
-        start_date = end_date - timedelta(days=30)
-        date_from = date_from or start_date.strftime('%Y-%m-%d')
-        date_to = date_to or end_date.strftime('%Y-%m-%d')
+    from_date, to_date = date_ranges.report_period(request.GET)
+    date_from = from_date.strftime('%Y-%m-%d')
+    date_to = to_date.strftime('%Y-%m-%d')
 
-    stock_in_items = DeliveryLog.objects.select_related('product', 'logged_by')
-
-    try:
-        from_date = datetime.strptime(date_from, '%Y-%m-%d').date()
-        to_date = datetime.strptime(date_to, '%Y-%m-%d').date()
-        stock_in_items = stock_in_items.filter(
-            delivery_date__date__gte=from_date,
-            delivery_date__date__lte=to_date
-        )
-    except ValueError:
-        pass
+    stock_in_items = date_ranges.filter_dates(
+        DeliveryLog.objects.select_related('product', 'logged_by'), 'delivery_date', from_date, to_date
+    )
 
     if product_filter:
         stock_in_items = stock_in_items.filter(product_id=product_filter)
@@ -3745,30 +3546,19 @@ def stock_out_list(request):
     Stock Out List - Display all stock going out (sales, adjustments)
     Shows stock movements with negative quantities and delivered orders
     """
-    date_from = request.GET.get('date_from', '')
-    date_to = request.GET.get('date_to', '')
     product_filter = request.GET.get('product', '')
     movement_type = request.GET.get('type', '')
     search = request.GET.get('search', '')
     sort = request.GET.get('sort', '-created_at')
 
-    if not date_from or not date_to:
-        end_date = timezone.now().date()
-        start_date = end_date - timedelta(days=30)
-        date_from = date_from or start_date.strftime('%Y-%m-%d')
-        date_to = date_to or end_date.strftime('%Y-%m-%d')
+    from_date, to_date = date_ranges.report_period(request.GET)
+    date_from = from_date.strftime('%Y-%m-%d')
+    date_to = to_date.strftime('%Y-%m-%d')
 
-    stock_out_movements = StockMovement.objects.select_related('product', 'created_by').exclude(movement_type='delivery')
-
-    try:
-        from_date = datetime.strptime(date_from, '%Y-%m-%d').date()
-        to_date = datetime.strptime(date_to, '%Y-%m-%d').date()
-        stock_out_movements = stock_out_movements.filter(
-            created_at__date__gte=from_date,
-            created_at__date__lte=to_date
-        )
-    except ValueError:
-        pass
+    stock_out_movements = date_ranges.filter_dates(
+        StockMovement.objects.select_related('product', 'created_by').exclude(movement_type='delivery'),
+        'created_at', from_date, to_date
+    )
 
     if product_filter:
         stock_out_movements = stock_out_movements.filter(product_id=product_filter)
@@ -3789,27 +3579,22 @@ def stock_out_list(request):
     page_number = request.GET.get('page')
     page_obj = paginator.get_page(page_number)
 
-    total_movements = stock_out_movements.count()
-    total_out = stock_out_movements.aggregate(total=Sum('quantity'))['total'] or 0
-    sale_movements = stock_out_movements.filter(movement_type='sale').count()
-    adjustment_movements = stock_out_movements.filter(movement_type='adjustment').count()
-    
-    total_revenue = 0
-    total_cost_of_goods = 0
-    sale_movement_ids = []
-    for movement in stock_out_movements.filter(movement_type='sale'):
-        if movement.reference_id:
-            try:
-                sale_movement_ids.append(int(movement.reference_id))
-            except (ValueError, TypeError):
-                pass
-    
-    if sale_movement_ids:
-        orders = Order.objects.filter(id__in=sale_movement_ids)
-        for order in orders:
-            total_revenue += order.total_amount
-            total_cost_of_goods += order.quantity * order.product.cost_price
-    
+    # Counts, quantities and sale figures in one aggregate joined through the typed order FK
+    sales = Q(movement_type='sale', order__isnull=False)
+    totals = stock_out_movements.order_by().aggregate(
+        total_movements=Count('id'),
+        total_out=Sum('quantity'),
+        sale_movements=Count('id', filter=Q(movement_type='sale')),
+        adjustment_movements=Count('id', filter=Q(movement_type='adjustment')),
+        total_revenue=Sum('order__total_amount', filter=sales),
+        total_cost_of_goods=Sum(order_cost_of_goods('order__'), filter=sales),
+    )
+    total_movements = totals['total_movements']
+    total_out = totals['total_out'] or 0
+    sale_movements = totals['sale_movements']
+    adjustment_movements = totals['adjustment_movements']
+    total_revenue = totals['total_revenue'] or 0
+    total_cost_of_goods = totals['total_cost_of_goods'] or 0
     total_gross_profit = total_revenue - total_cost_of_goods
 
     products = LPGProduct.objects.filter(is_active=True).order_by('name', 'size')
@@ -3871,54 +3656,73 @@ def low_stock_alert(request):
 
 
 @user_passes_test(is_dealer, login_url='core:login')
+@reporting.from_snapshot
 def inventory_reports(request):
     """
     Comprehensive inventory reports and analytics dashboard
     Requirements: 6.5 - Inventory reporting and analytics
     """
     from django.db.models import Sum, Avg, Count, Q
-    from datetime import datetime, timedelta
 
     # Get date range for reports (default to last 30 days)
-    end_date = datetime.now().date()
-    start_date = end_date - timedelta(days=30)
-
-    if request.GET.get('start_date'):
-        start_date = datetime.strptime(request.GET.get('start_date'), '%Y-%m-%d').date()
-    if request.GET.get('end_date'):
-        end_date = datetime.strptime(request.GET.get('end_date'), '%Y-%m-%d').date()
+    start_date, end_date = date_ranges.report_period(request.GET, from_key='start_date', to_key='end_date')
 
-    # Inventory Valuation Report
+    # Inventory Valuation Report (at running weighted-average cost)
     products = LPGProduct.objects.filter(is_active=True)
-    total_inventory_value = sum(product.stock_value for product in products)
-    total_cost_value = sum(product.current_stock * (product.cost_price or 0) for product in products)
-
-    # Stock Movement Analysis
-    movements = StockMovement.objects.filter(
-        created_at__date__range=[start_date, end_date]
+    valuation = products.aggregate(
+        cost_value=Sum(F('current_stock') * F('average_cost'), output_field=DecimalField(max_digits=16, decimal_places=4)),
+        retail_value=Sum(F('current_stock') * F('price'), output_field=DecimalField(max_digits=16, decimal_places=2)),
     )
+    total_inventory_value = valuation['cost_value'] or 0
+    total_cost_value = total_inventory_value
+    total_retail_value = valuation['retail_value'] or 0
+
+    def compute_period_stats():
+        # Realised gross profit for the period from the COGS stored on each sale
+        period_sales = date_ranges.filter_dates(
+            Order.objects.filter(status='delivered'), 'delivery_date', start_date, end_date
+        ).aggregate(
+            revenue=Sum('total_amount'),
+            cost_of_goods=Sum(order_cost_of_goods()),
+        )
 
-    movement_summary = movements.aggregate(
-        total_movements=Count('id'),
-        total_in=Sum('quantity', filter=Q(quantity__gt=0)),
-        total_out=Sum('quantity', filter=Q(quantity__lt=0))
-    )
+        # Stock Movement Analysis
+        movements = date_ranges.filter_dates(StockMovement.objects.all(), 'created_at', start_date, end_date)
+
+        movement_summary = movements.aggregate(
+            total_movements=Count('id'),
+            total_in=Sum('quantity', filter=Q(quantity__gt=0)),
+            total_out=Sum('quantity', filter=Q(quantity__lt=0))
+        )
+
+        # Top Moving Products
+        top_products = movements.values('product__name', 'product__size').annotate(
+            total_movement=Sum('quantity'),
+            movement_count=Count('id')
+        ).order_by('-movement_count')[:10]
+
+        # Supplier Performance (based on deliveries)
+        supplier_performance = date_ranges.filter_dates(
+            DeliveryLog.objects.all(), 'delivery_date', start_date, end_date
+        ).values('supplier_name').annotate(
+            total_deliveries=Count('id'),
+            total_quantity=Sum('quantity_received'),
+            total_cost=Sum('total_cost'),
+            avg_cost_per_unit=Avg('cost_per_unit')
+        ).order_by('-total_deliveries')[:10]
+
+        return {
+            'period_revenue': period_sales['revenue'] or 0,
+            'period_cost_of_goods': period_sales['cost_of_goods'] or 0,
+            'movement_summary': movement_summary,
+            'top_products': list(top_products),
+            'supplier_performance': list(supplier_performance),
+        }
 
-    # Top Moving Products
-    top_products = movements.values('product__name', 'product__size').annotate(
-        total_movement=Sum('quantity'),
-        movement_count=Count('id')
-    ).order_by('-movement_count')[:10]
-
-    # Supplier Performance (based on deliveries)
-    supplier_performance = DeliveryLog.objects.filter(
-        delivery_date__date__range=[start_date, end_date]
-    ).values('supplier_name').annotate(
-        total_deliveries=Count('id'),
-        total_quantity=Sum('quantity_received'),
-        total_cost=Sum('total_cost'),
-        avg_cost_per_unit=Avg('cost_per_unit')
-    ).order_by('-total_deliveries')[:10]
+    # Period analytics are cached per date range; one worker recomputes them while others get the last copy
+    period_stats = cached_report('inventory', compute_period_stats, start_date, end_date, period=(start_date, end_date))
+    period_revenue = period_stats['period_revenue']
+    period_cost_of_goods = period_stats['period_cost_of_goods']
 
     # Low Stock Analysis
     low_stock_products = products.filter(current_stock__lte=F('minimum_stock'))
@@ -3948,10 +3752,13 @@ def inventory_reports(request):
         'end_date': end_date,
         'total_inventory_value': total_inventory_value,
         'total_cost_value': total_cost_value,
-        'potential_profit': total_inventory_value - total_cost_value,
-        'movement_summary': movement_summary,
-        'top_products': top_products,
-        'supplier_performance': supplier_performance,
+        'potential_profit': total_retail_value - total_cost_value,
+        'period_revenue': period_revenue,
+        'period_cost_of_goods': period_cost_of_goods,
+        'period_gross_profit': period_revenue - period_cost_of_goods,
+        'movement_summary': period_stats['movement_summary'],
+        'top_products': period_stats['top_products'],
+        'supplier_performance': period_stats['supplier_performance'],
         'low_stock_count': low_stock_products.count(),
         'reorder_needed_count': reorder_needed.count(),
         'abc_analysis': abc_analysis,
@@ -4022,7 +3829,7 @@ def create_category(request):
 
 
 @require_http_methods(["GET"])
-def get_categories(request):
+async def get_categories(request):
     """
     AJAX endpoint to fetch all active categories as JSON
     """
@@ -4031,7 +3838,7 @@ def get_categories(request):
     categories = ProductCategory.objects.filter(is_active=True).values('id', 'name').order_by('name')
     return JsonResponse({
         'success': True,
-        'categories': list(categories)
+        'categories': [category async for category in categories]
     })
 
 
@@ -4079,13 +3886,12 @@ def mark_all_notifications_as_read(request):
     """
     Mark all unread notifications as read
     """
-    unread = Notification.objects.filter(customer=request.user, is_read=False)
-    unread.update(is_read=True, read_at=timezone.now())
+    marked = notifications.mark_all_as_read(request.user)
     
     if request.headers.get('X-Requested-With') == 'XMLHttpRequest':
         return JsonResponse({
             'success': True,
-            'message': f'Marked {unread.count()} notification(s) as read'
+            'message': f'Marked {marked} notification(s) as read'
         })
     
     return redirect(request.META.get('HTTP_REFERER', 'customer_dashboard'))
@@ -4093,16 +3899,106 @@ def mark_all_notifications_as_read(request):
 
 @login_required
 @require_http_methods(["GET"])
-def get_unread_notifications_count(request):
+@cache_control(private=True, no_cache=True)
+async def get_unread_notifications_count(request):
     """
     AJAX endpoint to get unread notifications count
+    Reads the cached per-user notification summary; an unchanged poll gets a 304 from the
+    notifications version alone
+    """
+    user = await request.auser()
+    etag = quote_etag(await etags.aunread_notifications(request, user))
+    response = get_conditional_response(request, etag=etag)
+    if response is None:
+        summary = await notifications.aget_summary(user, getattr(request, 'roles', None))
+        response = JsonResponse({
+            'success': True,
+            'unread_count': summary['unread_count']
+        })
+    response['ETag'] = etag
+    return response
+
+
+# Page regions the multiplexed poll can refresh: CSS selector of the element(s) to fill,
+# partial, context builder, ETag function and who may ask for it
+PollPart = namedtuple('PollPart', 'target template context etag allowed')
+
+POLL_PARTS = {
+    'dashboard_stats': PollPart(
+        '#dashboard-stats', 'dealer/dashboard_stats_partial.html',
+        lambda request: {'dashboard_stats': dashboard.get_dashboard_stats()},
+        etags.dashboard_stats, is_dealer,
+    ),
+    'recent_activity': PollPart(
+        '#recent-activity', 'dealer/recent_activity_partial.html',
+        lambda request: recent_activity_context(),
+        etags.recent_activity, is_dealer,
+    ),
+    'dashboard_orders': PollPart(
+        '#dashboard-orders', 'customer/dashboard_orders_partial.html',
+        lambda request: customer_order_summary(request.user),
+        etags.customer_orders, lambda user: user.is_authenticated,
+    ),
+    'notifications': PollPart(
+        '.notification-count', 'components/notification_count.html',
+        lambda request: {'unread_notification_count': notifications.get_summary(request.user, request.roles)['unread_count']},
+        etags.unread_notifications, lambda user: user.is_authenticated,
+    ),
+}
+
+
+def requested_poll_parts(request):
+    """Known parts named in ?parts=a,b that the user may see, in order and without repeats"""
+    names = dict.fromkeys(name.strip() for name in request.GET.get('parts', '').split(','))
+    return [
+        (name, POLL_PARTS[name]) for name in names
+        if name in POLL_PARTS and POLL_PARTS[name].allowed(request.user)
+    ]
+
+
+def poll_updates_etag(request):
+    tags = [part.etag(request) for name, part in requested_poll_parts(request)]
+    if not tags or None in tags:
+        return None
+    return hashlib.md5(':'.join(tags).encode()).hexdigest()
+
+
+@login_required
+@require_http_methods(["GET"])
+@cache_control(private=True, no_cache=True)
+@condition(etag_func=poll_updates_etag)
+def poll_updates(request):
+    """
+    One poll refreshing several page regions with HTMX out-of-band swaps
+    The page requests ?parts=dashboard_stats,recent_activity with hx-swap="none"; the response
+    holds a <div hx-swap-oob="innerHTML:<selector>"> per part, whose content htmx swaps into
+    every element matching the selector. Each part's context is built once, and the whole poll
+    shares one pass through the middleware, session and auth.
+    """
+    fragments = [
+        format_html(
+            '<div hx-swap-oob="innerHTML:{}">{}</div>',
+            part.target,
+            mark_safe(render_to_string(part.template, part.context(request), request=request)),
+        )
+        for name, part in requested_poll_parts(request)
+    ]
+    return HttpResponse(''.join(fragments))
+
+
+async def event_stream(request):
     """
-    count = Notification.objects.filter(
-        customer=request.user,
-        is_read=False
-    ).count()
-    
-    return JsonResponse({
-        'success': True,
-        'unread_count': count
-    })
\ No newline at end of file
+    Server-Sent Events stream of order, stock and notification changes for the signed-in user
+    Pages subscribe with hx-ext="sse" and refresh their partials on events instead of polling.
+    Streams need an ASGI server; under WSGI a held-open stream would pin a worker thread, so
+    the browser is told to stop (204) and the pages fall back to polling.
+    """
+    user = await request.auser()
+    if not user.is_authenticated:
+        return HttpResponse(status=401)
+    if not isinstance(request, ASGIRequest):
+        return HttpResponse(status=204)
+    response = StreamingHttpResponse(events.stream(events.topics_for(user)), content_type='text/event-stream')
+    response['Cache-Control'] = 'no-cache'
+    response['X-Accel-Buffering'] = 'no'
+    return response
\ No newline at end of file
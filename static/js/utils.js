@@ -208,7 +208,10 @@ class DealerDashboard {
         }
         
         this.refreshInterval = setInterval(() => {
-            this.refreshDashboardData();
+            // Hidden tabs skip their polls
+            if (!document.hidden) {
+                this.refreshDashboardData();
+            }
         }, interval);
     }
 
@@ -255,6 +258,11 @@ document.addEventListener('DOMContentLoaded', function () {
 document.addEventListener('htmx:responseError', function (event) {
     const target = event.detail.target;
     
+    // Shed polls (429) are retried by LiveUpdates; nothing failed from the user's point of view
+    if (event.detail.xhr && event.detail.xhr.status === 429) {
+        return;
+    }
+    
     // Special handling for dealer dashboard refreshes
     if (target && (target.id === 'dashboard-stats' || target.id === 'recent-activity')) {
         showToast('error', 'Dashboard Update Failed', 'Unable to refresh dashboard data. Please try again.');
@@ -1603,4 +1611,110 @@ window.PrycegasUtils = {
     debounce: (func, delay, key) => window.performanceOptimizer?.debounce(func, delay, key),
     clearCache: () => window.performanceOptimizer?.clearCache(),
     prefetchData: (type, id) => window.queryOptimizer?.prefetchRelatedData(type, id)
-};
\ No newline at end of file
+};
+// Live updates
+// base.html opens one Server-Sent Events stream per tab; elements with hx-trigger="sse:<event>"
+// refresh when that event arrives. If the stream is unavailable (e.g. the site is served over
+// WSGI, which answers 204), fall back to firing those triggers on a timer until it opens.
+// Polled responses carry X-Poll-Interval (or Retry-After on 429) and each element waits that
+// long before its next poll; hidden tabs do not poll and catch up when shown again.
+const LiveUpdates = {
+    defaultInterval: 30000,
+    tickInterval: 5000,
+    fallbackTimer: null,
+    nextPoll: new WeakMap(),
+    retryPending: new WeakSet(),
+
+    elements() {
+        return document.querySelectorAll('[hx-trigger^="sse:"]');
+    },
+
+    fire(element) {
+        htmx.trigger(element, element.getAttribute('hx-trigger'));
+    },
+
+    fireAll() {
+        this.elements().forEach((element) => this.fire(element));
+    },
+
+    schedule(element, seconds) {
+        this.nextPoll.set(element, Date.now() + seconds * 1000);
+    },
+
+    tick() {
+        if (document.hidden) {
+            return;
+        }
+        const now = Date.now();
+        this.elements().forEach((element) => {
+            const due = this.nextPoll.get(element);
+            if (due === undefined) {
+                this.nextPoll.set(element, now + this.defaultInterval);
+            } else if (now >= due) {
+                this.nextPoll.set(element, now + this.defaultInterval);
+                this.fire(element);
+            }
+        });
+    },
+
+    startFallback() {
+        if (!this.fallbackTimer) {
+            this.fallbackTimer = setInterval(() => this.tick(), this.tickInterval);
+        }
+    },
+
+    stopFallback() {
+        if (this.fallbackTimer) {
+            clearInterval(this.fallbackTimer);
+            this.fallbackTimer = null;
+        }
+    },
+
+    // A shed (429) refresh is retried once after Retry-After, however many events arrived meanwhile
+    retryLater(element, seconds) {
+        if (this.retryPending.has(element)) {
+            return;
+        }
+        this.retryPending.add(element);
+        setTimeout(() => {
+            this.retryPending.delete(element);
+            this.fire(element);
+        }, seconds * 1000);
+    }
+};
+
+document.addEventListener('htmx:sseError', function () {
+    LiveUpdates.startFallback();
+});
+
+document.addEventListener('htmx:sseOpen', function () {
+    // Catch up on anything missed while the stream was down
+    if (LiveUpdates.fallbackTimer) {
+        LiveUpdates.stopFallback();
+        LiveUpdates.fireAll();
+    }
+});
+
+document.addEventListener('visibilitychange', function () {
+    if (!document.hidden && LiveUpdates.fallbackTimer) {
+        LiveUpdates.tick();
+    }
+});
+
+document.addEventListener('htmx:afterRequest', function (event) {
+    const element = event.detail.elt;
+    const xhr = event.detail.xhr;
+    if (!element || !xhr || !element.matches('[hx-trigger^="sse:"]')) {
+        return;
+    }
+    if (xhr.status === 429) {
+        const retryAfter = parseInt(xhr.getResponseHeader('Retry-After'), 10) || 30;
+        LiveUpdates.schedule(element, retryAfter);
+        LiveUpdates.retryLater(element, retryAfter);
+        return;
+    }
+    const interval = parseInt(xhr.getResponseHeader('X-Poll-Interval'), 10);
+    if (interval) {
+        LiveUpdates.schedule(element, interval);
+    }
+});